@@ -0,0 +1,138 @@
+# backend/agents/document_ingestion/activity_extractor.py
+"""
+Single-pass activity extraction shared by the chat, PDF and API paths.
+
+Everything the extractor recognises is declared in the two tables below:
+UNITS (unit spellings -> dimension and conversion factor) and RULES (one per
+ACTIVITY_MAP key: the dimension it measures and the context keywords that
+select it). Both are compiled into one regex at import time, and
+`extract_activities` walks its matches once, left to right, so the cost is
+linear in the length of the text.
+
+A quantity belongs to the activity whose keyword is nearest before it on the
+same line (or, failing that, after it), falling back to the dimension's
+default rule. A mass (pallets, tonnes) followed by a distance on the same
+line becomes tonne-kilometres. The first value found for each activity wins.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+import re
+
+from backend.instrumentation import timed
+
+
+@dataclass(frozen=True)
+class Unit:
+    dimension: str      # "energy", "tkm", "mass" or "distance"
+    factor: float       # multiplier to the canonical unit (kWh, tkm, tonnes, km)
+
+
+@dataclass(frozen=True)
+class Rule:
+    key: str                    # payload key, as in ACTIVITY_MAP
+    dimension: str              # "energy" or "tkm"
+    keywords: tuple[str, ...]   # context words that select this rule
+    default: bool = False       # used when no keyword is in context
+
+
+# Unit spellings (regex fragments) -> dimension / factor
+UNITS = {
+    r"kwh": Unit("energy", 1.0),
+    r"mwh": Unit("energy", 1_000.0),
+    r"gwh": Unit("energy", 1_000_000.0),
+    r"therms?": Unit("energy", 29.3071),
+    r"tonne[- ]?km|tonne[- ]kilomet(?:re|er)s?|t-?km": Unit("tkm", 1.0),
+    # One pallet counts as one tonne, as the original chat/PDF parsers assumed
+    r"pallets?": Unit("mass", 1.0),
+    r"tonnes?|tons?": Unit("mass", 1.0),
+    r"kg": Unit("mass", 0.001),
+    r"km|kilomet(?:re|er)s?": Unit("distance", 1.0),
+    r"miles?": Unit("distance", 1.609344),
+}
+
+RULES = (
+    Rule("electricity_kwh", "energy", ("electricity", "electric", "power", "grid"), default=True),
+    Rule("natural_gas_kwh", "energy", ("natural gas", "gas", "heating fuel")),
+    Rule("road_freight_tkm", "tkm", ("road freight", "road", "truck", "trucks", "lorry", "hgv", "shipped"), default=True),
+    Rule("air_freight_tkm", "tkm", ("air freight", "airfreight", "air cargo", "by air", "flown", "flight", "flights")),
+)
+
+
+def _compile():
+    keywords = {kw: rule for rule in RULES for kw in rule.keywords}
+    # Longest alternatives first so e.g. "natural gas" beats "gas"
+    kw_alt = "|".join(re.escape(k).replace(r"\ ", r"[ \t]+") for k in sorted(keywords, key=len, reverse=True))
+    unit_alt = "|".join(f"(?P<u{i}>{p})" for i, p in enumerate(UNITS))
+    # The leading character class lets the regex engine skip every position
+    # that can't start a keyword or a number without trying the alternation.
+    # Patterns are lowercase and run over lowercased text (cheaper than re.I).
+    first = re.escape("".join(sorted({k[0] for k in keywords})))
+    pattern = re.compile(
+        rf"(?=[\d{first}])(?:"
+        rf"\b(?P<kw>{kw_alt})\b"
+        rf"|(?<![\w.,])(?P<num>\d[\d,]*(?:\.\d+)?)\s*(?:{unit_alt})\b"
+        rf")"
+    )
+    # A quantity match always ends in its unit group, so match.lastgroup names the unit
+    units = {f"u{i}": unit for i, unit in enumerate(UNITS.values())}
+    return pattern, units, keywords
+
+
+_PATTERN, _UNIT_BY_GROUP, _KEYWORD_RULES = _compile()
+_DEFAULTS = {rule.dimension: rule for rule in RULES if rule.default}
+
+
+def _resolve_line(payload: dict, keywords: list, quantities: list) -> None:
+    """Assign one line's quantities: nearest preceding keyword of the same
+    dimension, else the next one after it, else the dimension's default."""
+    by_dim: dict[str, tuple[list[int], list[Rule]]] = {}
+    for kpos, rule in keywords:
+        positions, rules = by_dim.setdefault(rule.dimension, ([], []))
+        positions.append(kpos)
+        rules.append(rule)
+
+    for pos, dimension, amount in quantities:
+        rule = _DEFAULTS[dimension]
+        if dimension in by_dim:
+            positions, rules = by_dim[dimension]
+            i = bisect_left(positions, pos)
+            rule = rules[i - 1] if i else rules[0]
+        payload.setdefault(rule.key, amount)
+
+
+@timed("extractor.activities")
+def extract_activities(text: str) -> dict[str, float]:
+    """Return {activity_key: amount} for every ACTIVITY_MAP key found in `text`."""
+    payload: dict[str, float] = {}
+    keywords: list = []         # (position, rule) on the current line
+    quantities: list = []       # (position, dimension, amount) on the current line
+    pending_mass = None         # tonnes waiting for a distance on this line
+
+    text = text.lower()
+    line_end = text.find("\n")
+    for m in _PATTERN.finditer(text):
+        if 0 <= line_end < m.start():
+            # Crossed one or more line breaks since the last match
+            _resolve_line(payload, keywords, quantities)
+            keywords, quantities, pending_mass = [], [], None
+            line_end = text.find("\n", m.start())
+
+        group = m.lastgroup
+        if group == "kw":
+            keywords.append((m.start(), _KEYWORD_RULES[" ".join(m.group("kw").split())]))
+            continue
+
+        unit = _UNIT_BY_GROUP[group]
+        amount = float(m.group("num").replace(",", "")) * unit.factor
+
+        if unit.dimension == "mass":
+            pending_mass = amount
+        elif unit.dimension == "distance":
+            if pending_mass is not None:
+                quantities.append((m.start(), "tkm", pending_mass * amount))
+                pending_mass = None
+        else:
+            quantities.append((m.start(), unit.dimension, amount))
+
+    _resolve_line(payload, keywords, quantities)
+    return payload
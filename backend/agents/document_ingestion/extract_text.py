@@ -1,53 +1,94 @@
 # agents/document_ingestion/extract_text.py
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import os
+import sys
 import fitz  # PyMuPDF
 
-def extract_text_from_pdf(pdf_path: Path) -> str:
-    """Extract all text from a PDF file using PyMuPDF."""
-    text = ""
+ROOT_DIR = Path(__file__).resolve().parents[3]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.document_ingestion.activity_extractor import extract_activities
+from backend.instrumentation import timed
+from backend.agents.estimator.estimator_client import EstimatorError, get_estimator_client
+
+# Below this many pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 64
+
+
+def iter_page_texts(pdf_path: Path, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page in [start, stop) without holding the whole document's text."""
     with fitz.open(pdf_path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text.strip()
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for number in range(start, stop):
+            yield doc.load_page(number).get_text()
 
-import re
 
-def extract_payload_from_text(text: str) -> dict:
+@timed("extractor.pdf_text")
+def extract_text_from_pdf_bytes(data: bytes) -> str:
+    """Extract all text from an in-memory PDF (e.g. an HTTP upload)."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc).strip()
+
+
+def _extract_page_range(args: tuple[str, int, int]) -> str:
+    pdf_path, start, stop = args
+    return "".join(iter_page_texts(Path(pdf_path), start, stop))
+
+
+@timed("extractor.pdf_text")
+def extract_text_from_pdf(pdf_path: Path, workers: Optional[int] = None) -> str:
     """
-    Extract activity data from invoice-like text.
-    Looks for electricity and freight info.
+    Extract all text from a PDF file using PyMuPDF.
+
+    With `workers` > 1, documents of at least PARALLEL_MIN_PAGES pages are
+    split into contiguous page ranges extracted on a process pool.
     """
-    payload = {}
+    if workers and workers > 1:
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+        if page_count >= PARALLEL_MIN_PAGES:
+            step = -(-page_count // workers)
+            ranges = [(str(pdf_path), start, start + step) for start in range(0, page_count, step)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return "".join(pool.map(_extract_page_range, ranges)).strip()
+    return "".join(iter_page_texts(pdf_path)).strip()
+
 
-    elec_match = re.search(r"electricity.*?(\d[\d,\.]*)\s*kwh", text, re.I)
-    if elec_match:
-        kwh_str = elec_match.group(1).replace(",", "")
-        payload["electricity_kwh"] = float(kwh_str)
+def extract_texts_from_pdfs(pdf_paths: Iterable[Path], workers: Optional[int] = None) -> dict[Path, str]:
+    """Extract many PDFs concurrently, one document per worker process."""
+    paths = list(pdf_paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return {path: extract_text_from_pdf(path) for path in paths}
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return dict(zip(paths, pool.map(extract_text_from_pdf, paths, chunksize=4)))
 
-    freight_match = re.search(r"(\d+)\s*pallets.*?(\d+)\s*km", text, re.I)
-    if freight_match:
-        pallets = int(freight_match.group(1))
-        km = int(freight_match.group(2))
-        payload["road_freight_tkm"] = pallets * km
 
-    return payload
+def extract_texts_from_dir(directory: Path, workers: Optional[int] = None) -> dict[Path, str]:
+    """Extract every *.pdf in `directory` (see extract_texts_from_pdfs)."""
+    return extract_texts_from_pdfs(sorted(Path(directory).glob("*.pdf")), workers)
 
-import requests
+def extract_payload_from_text(text: str) -> dict:
+    """
+    Extract activity data from invoice-like text.
+    Recognises every ACTIVITY_MAP key and its unit variants
+    (see activity_extractor.py).
+    """
+    return extract_activities(text)
 
 def estimate_emissions_from_payload(payload: dict) -> dict:
     """
-    Send the extracted payload to the FastAPI backend and return emissions.
+    Estimate emissions for the extracted payload through the configured
+    estimator client (in-process by default, see estimator_client.py).
     """
     try:
-        response = requests.post("http://localhost:8000/api/estimate", json={"activities": payload})
-        if response.status_code == 200:
-            return response.json()["emissions"]
-        else:
-            print("⚠️ API error:", response.text)
-            return {}
-    except Exception as e:
-        print("❌ Failed to reach API:", e)
+        return get_estimator_client().estimate(payload)
+    except EstimatorError as e:
+        print("❌ Emission estimation failed:", e)
         return {}
 
 
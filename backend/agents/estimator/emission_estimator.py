@@ -1,10 +1,22 @@
 from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Sequence, Union
+import sys
+import time
+
+import numpy as np
 import pandas as pd
 
+from backend.instrumentation import timed
+
 # ---------- Load DEFRA factors once ----------
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 DEFRA_CSV = DATA_DIR / "defra_factors.csv"
 
+# How often (seconds) the CSV mtime is checked for hot reload
+RELOAD_CHECK_INTERVAL = 5.0
+
 def _load_factors() -> pd.DataFrame:
     """Read the factors CSV into memory (runs only at first import)."""
     df = pd.read_csv(DEFRA_CSV)
@@ -14,8 +26,6 @@ def _load_factors() -> pd.DataFrame:
         Activity=df["Activity"].str.lower()
     )
 
-FACTORS = _load_factors()
-
 # Mapping incoming payload keys to (Category, Activity) in the DEFRA table
 ACTIVITY_MAP = {
     "electricity_kwh":    ("energy",    "electricity grid average"),
@@ -25,7 +35,74 @@ ACTIVITY_MAP = {
 }
 
 
+class FactorSnapshot(NamedTuple):
+    """Immutable view of one load of the DEFRA table."""
+    frame: pd.DataFrame
+    table: Mapping[tuple[str, str], float]    # (category, activity) -> kgCO2e/unit
+    activities: Mapping[str, float]           # payload key -> kgCO2e/unit
+    mtime_ns: int
+
+
+def _build_snapshot() -> FactorSnapshot:
+    """Load the CSV and precompute both lookup tables."""
+    mtime_ns = DEFRA_CSV.stat().st_mtime_ns
+    df = _load_factors()
+
+    # First row wins, matching the old `.iloc[0]` behaviour on duplicates
+    table: dict[tuple[str, str], float] = {}
+    for cat, act, ef in zip(df["Category"], df["Activity"], df["kgCO2e_per_unit"]):
+        table.setdefault((cat, act), float(ef))
+
+    activities: dict[str, float] = {}
+    for key, (cat, act) in ACTIVITY_MAP.items():
+        if (cat, act) not in table:
+            raise KeyError(f"Emission factor not found for {cat} / {act}")
+        activities[key] = table[(cat, act)]
 
+    return FactorSnapshot(
+        frame=df,
+        table=MappingProxyType(table),
+        activities=MappingProxyType(activities),
+        mtime_ns=mtime_ns,
+    )
+
+
+_SNAPSHOT = _build_snapshot()
+_RELOAD_LOCK = Lock()
+_last_check = time.monotonic()
+
+FACTORS = _SNAPSHOT.frame
+
+
+def reload_factors(force: bool = False) -> bool:
+    """
+    Re-read defra_factors.csv if it changed on disk (or if `force` is set).
+    The new tables are swapped in atomically; readers never see a half-built
+    table. Returns True when a reload happened.
+    """
+    global _SNAPSHOT, FACTORS, _last_check
+
+    with _RELOAD_LOCK:
+        _last_check = time.monotonic()
+        try:
+            if not force and DEFRA_CSV.stat().st_mtime_ns == _SNAPSHOT.mtime_ns:
+                return False
+            snapshot = _build_snapshot()
+        except Exception as e:
+            # Keep serving the last good table if the file is missing or broken
+            print(f"⚠️  Failed to reload emission factors, keeping previous set: {e}", file=sys.stderr)
+            return False
+        _SNAPSHOT = snapshot
+        FACTORS = snapshot.frame
+        return True
+
+
+def get_snapshot() -> FactorSnapshot:
+    """Return the current factor tables, checking the CSV for changes at most
+    once every RELOAD_CHECK_INTERVAL seconds."""
+    if time.monotonic() - _last_check >= RELOAD_CHECK_INTERVAL:
+        reload_factors()
+    return _SNAPSHOT
 
 
 def get_factor(category: str, activity: str) -> float:
@@ -33,32 +110,38 @@ def get_factor(category: str, activity: str) -> float:
     Return kgCO₂e per unit for a given category + activity.
     Strings are matched case‑insensitively.
     """
-    cat = category.lower()
-    act = activity.lower()
-    row = FACTORS.query("Category == @cat and Activity == @act")
-    if row.empty:
+    ef = get_snapshot().table.get((category.lower(), activity.lower()))
+    if ef is None:
         raise KeyError(f"Emission factor not found for {category} / {activity}")
-    return float(row["kgCO2e_per_unit"].iloc[0])
+    return ef
 
 
 
-def estimate_emissions(payload: dict) -> dict:
+@timed("estimator.estimate")
+def estimate_emissions(payload: dict, region: Optional[str] = None, date=None) -> dict:
     """
     Convert a payload of activities into a dict of emissions.
     Example payload:
         {"electricity_kwh": 5000, "road_freight_tkm": 6240}
+
+    With a `region` and/or `date` ("YYYY-MM-DD", "YYYY-MM" or a year) the
+    factors come from that region's vintage (see factor_sets.py); without
+    them, from defra_factors.csv.
     """
+    if region is not None or date is not None:
+        return estimate_emissions_batch([payload], regions=[region], dates=[date])[0]
+
     results: dict[str, float] = {}
     total = 0.0
+    factors = get_snapshot().activities
 
     # ---------- ONE single loop ----------
     for key, amount in payload.items():
-        if key not in ACTIVITY_MAP:
-            print(f"⚠️  Unknown activity key skipped: {key}")
+        ef = factors.get(key)
+        if ef is None:
+            print(f"⚠️  Unknown activity key skipped: {key}", file=sys.stderr)
             continue
 
-        cat, act = ACTIVITY_MAP[key]
-        ef = get_factor(cat, act)
         co2 = amount * ef
         results[key] = co2
         total += co2
@@ -66,6 +149,92 @@ def estimate_emissions(payload: dict) -> dict:
     results["total"] = total
     return results
 
+
+# Columnar batches map each activity key to one amount per supplier
+ColumnarPayload = Mapping[str, Sequence[Optional[float]]]
+
+
+def _flatten_rows(payloads: Sequence[dict]) -> tuple[np.ndarray, list[str], list[float]]:
+    """Long-format (supplier row, activity key, amount) in payload key order."""
+    rows = [i for i, p in enumerate(payloads) for _ in p]
+    keys = [k for p in payloads for k in p]
+    amounts = [a for p in payloads for a in p.values()]
+    return np.asarray(rows, dtype=np.int64), keys, amounts
+
+
+def _flatten_columns(columns: ColumnarPayload) -> tuple[int, np.ndarray, list[str], np.ndarray]:
+    """Long-format rows from a columnar batch; None / NaN cells are absent."""
+    names = list(columns)
+    wide = pd.DataFrame({k: columns[k] for k in names}, dtype="float64").to_numpy()
+    # np.nonzero walks row-major, i.e. supplier by supplier in column order
+    rows, cols = np.nonzero(~np.isnan(wide))
+    keys = [names[c] for c in cols]
+    return wide.shape[0], rows, keys, wide[rows, cols]
+
+
+@timed("estimator.estimate_batch")
+def estimate_emissions_batch(
+    payloads: Union[Sequence[dict], ColumnarPayload],
+    regions: Optional[Sequence[Optional[str]]] = None,
+    dates: Optional[Sequence] = None,
+) -> list[dict]:
+    """
+    Estimate many payloads in one vectorised pass against the factor table.
+
+    Accepts either a list of payload dicts (as taken by `estimate_emissions`)
+    or a columnar mapping such as
+        {"electricity_kwh": [5000, 1200], "road_freight_tkm": [6240, None]}
+    and returns one emissions dict per supplier, identical to calling
+    `estimate_emissions` on each payload in turn.
+
+    `regions` and `dates` (one entry per supplier, None allowed) select a
+    factor set per supplier from factor_sets.py instead of the DEFRA table.
+    A date only picks a vintage together with a region.
+    """
+    if isinstance(payloads, Mapping):
+        n, rows, keys, amounts = _flatten_columns(payloads)
+    else:
+        n = len(payloads)
+        rows, keys, amounts = _flatten_rows(payloads)
+        amounts = np.asarray(amounts, dtype="float64")
+
+    if regions is None and dates is None:
+        factors = pd.Series(get_snapshot().activities, dtype="float64")
+        ef = pd.Index(keys, dtype=object).map(factors).to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        from backend.agents.estimator.factor_sets import FactorEngine, get_engine
+
+        for name, column in (("regions", regions), ("dates", dates)):
+            if column is not None and len(column) != n:
+                raise ValueError(f"{name} must have one entry per supplier")
+        undated = FactorEngine.undated_rows(regions, dates)
+        if undated.size:
+            print(f"⚠️  Date ignored for {undated.size} supplier(s) without a region", file=sys.stderr)
+        unparseable = FactorEngine.unparseable_dates(dates)
+        if unparseable.size:
+            print(f"⚠️  Unrecognised date for {unparseable.size} supplier(s); using the latest vintage", file=sys.stderr)
+        engine = get_engine()
+        set_ids = engine.set_ids(regions if regions is not None else [None] * n, dates)
+        ef = engine.resolve(keys, set_ids[rows])
+
+    known = ~np.isnan(ef)
+    for key in sorted({k for k, ok in zip(keys, known) if not ok}):
+        print(f"⚠️  Unknown activity key skipped: {key}", file=sys.stderr)
+
+    rows, amounts, ef = rows[known], amounts[known], ef[known]
+    keys = [k for k, ok in zip(keys, known) if ok]
+    co2 = amounts * ef
+
+    # bincount accumulates in input order, so totals match the scalar loop bit for bit
+    totals = np.bincount(rows, weights=co2, minlength=n)
+
+    results: list[dict] = [{} for _ in range(n)]
+    for row, key, value in zip(rows.tolist(), keys, co2.tolist()):
+        results[row][key] = value
+    for res, total in zip(results, totals.tolist()):
+        res["total"] = total
+    return results
+
 if __name__ == "__main__":
     demo_payload = {
         "electricity_kwh": 5000,
@@ -0,0 +1,275 @@
+# backend/agents/estimator/emission_store.py
+"""
+Persistent store for emission estimates with incrementally maintained rollups.
+
+Every recorded estimate lands in SQLite (STORE_PATH, override with
+SPARKSCOPE_EMISSION_STORE) as one `estimates` row per activity line, with a
+NULL supplier_id when it is anonymous. In the same transaction, the batch's
+per-dimension sums are upserted into `rollups`; anonymous estimates count
+towards every dimension except supplier:
+
+    dimension   supplier | category | activity | total
+    key         supplier id / category / activity key ("*" for total)
+    month       "YYYY-MM", or "*" for all time
+
+Totals and top-N queries only read `rollups`, which stays small
+(keys x months), so they answer in milliseconds no matter how many
+estimate rows have been stored. `suppliers` holds each supplier's latest
+sector, for population-relative badges (see supplier_totals).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional, Union
+import os
+import re
+import sqlite3
+
+from backend.agents.estimator.emission_estimator import ACTIVITY_MAP
+
+STORE_PATH = Path(os.getenv(
+    "SPARKSCOPE_EMISSION_STORE",
+    Path(__file__).resolve().parents[2] / "store" / "emissions.sqlite3",
+))
+
+DIMENSIONS = ("supplier", "category", "activity", "total")
+ALL = "*"
+_MONTH = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+_ESTIMATES = """
+CREATE TABLE IF NOT EXISTS estimates (
+    supplier_id TEXT,
+    month       TEXT NOT NULL,
+    activity    TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    amount      REAL,
+    kg_co2e     REAL NOT NULL
+)"""
+
+_SCHEMA = _ESTIMATES + """;
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    month     TEXT NOT NULL,
+    kg_co2e   REAL NOT NULL,
+    rows      INTEGER NOT NULL,
+    PRIMARY KEY (dimension, month, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_rank ON rollups (dimension, month, kg_co2e DESC);
+CREATE TABLE IF NOT EXISTS suppliers (
+    supplier_id TEXT PRIMARY KEY,
+    sector      TEXT
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO rollups (dimension, key, month, kg_co2e, rows) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (dimension, month, key) DO UPDATE SET
+    kg_co2e = kg_co2e + excluded.kg_co2e,
+    rows = rows + excluded.rows
+"""
+
+_UPSERT_SUPPLIER = """
+INSERT INTO suppliers (supplier_id, sector) VALUES (?, ?)
+ON CONFLICT (supplier_id) DO UPDATE SET sector = COALESCE(excluded.sector, sector)
+"""
+
+
+class EstimateRecord(NamedTuple):
+    """One supplier's estimate for one month."""
+    supplier_id: Optional[str]
+    emissions: dict                 # as returned by estimate_emissions
+    payload: Optional[dict] = None  # activity amounts, stored alongside when given
+    month: Union[str, date, None] = None
+    sector: Optional[str] = None    # kept per supplier; the latest non-empty one wins
+
+
+def to_month(value: Union[str, date, None] = None) -> str:
+    """Normalise a date / datetime / "YYYY-MM[-DD...]" string to "YYYY-MM" (default: now, UTC)."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    month = value.isoformat()[:7] if isinstance(value, date) else str(value)[:7]
+    if not _MONTH.match(month):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+    return month
+
+
+class EmissionStore:
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = Lock()
+        self._migrate()
+
+    def _supplier_not_null(self) -> bool:
+        columns = self._conn.execute("PRAGMA table_info(estimates)").fetchall()
+        return any(name == "supplier_id" and notnull for _, name, _, notnull, *_ in columns)
+
+    def _migrate(self) -> None:
+        """Stores written before anonymous estimates were NULL used "" as their supplier."""
+        if not self._supplier_not_null():
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._supplier_not_null():  # another process may have migrated first
+                    self._conn.execute("ALTER TABLE estimates RENAME TO estimates_old")
+                    self._conn.execute(_ESTIMATES)
+                    self._conn.execute(
+                        "INSERT INTO estimates SELECT NULLIF(supplier_id, ''), month, activity, category, amount, kg_co2e "
+                        "FROM estimates_old"
+                    )
+                    self._conn.execute("DROP TABLE estimates_old")
+                    self._conn.execute("DELETE FROM rollups WHERE dimension = 'supplier' AND key = ''")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---------- writes ----------
+
+    def record(self, records: Iterable[EstimateRecord]) -> int:
+        """Store estimates and fold them into the rollups; returns rows written."""
+        facts = []
+        deltas: dict[tuple[str, str, str], list] = defaultdict(lambda: [0.0, 0])
+        sectors: dict[str, Optional[str]] = {}
+        for rec in records:
+            supplier = rec.supplier_id or None
+            if supplier:
+                sectors[supplier] = rec.sector or sectors.get(supplier)
+            month = to_month(rec.month)
+            payload = rec.payload or {}
+            for activity, kg in rec.emissions.items():
+                if activity == "total" or activity not in ACTIVITY_MAP:
+                    continue
+                category = ACTIVITY_MAP[activity][0]
+                facts.append((supplier, month, activity, category, payload.get(activity), kg))
+                for dimension, key in (("supplier", supplier), ("category", category), ("activity", activity), ("total", ALL)):
+                    if key is None:
+                        continue
+                    for m in (month, ALL):
+                        delta = deltas[(dimension, key, m)]
+                        delta[0] += kg
+                        delta[1] += 1
+
+        if not facts:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO estimates VALUES (?, ?, ?, ?, ?, ?)", facts)
+                self._conn.executemany(_UPSERT, [(d, k, m, kg, n) for (d, k, m), (kg, n) in deltas.items()])
+                self._conn.executemany(_UPSERT_SUPPLIER, list(sectors.items()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(facts)
+
+    def rebuild_rollups(self) -> None:
+        """Recompute every rollup from the stored estimates."""
+        selects = " UNION ALL ".join(
+            f"SELECT '{dim}', {col}, {month}, SUM(kg_co2e), COUNT(*) FROM estimates WHERE {col} IS NOT NULL "
+            f"GROUP BY {col}{', month' if month == 'month' else ''}"
+            for dim, col in (("supplier", "supplier_id"), ("category", "category"), ("activity", "activity"), ("total", f"'{ALL}'"))
+            for month in ("month", f"'{ALL}'")
+        )
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM rollups")
+                self._conn.execute(f"INSERT INTO rollups (dimension, key, month, kg_co2e, rows) {selects}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---------- reads ----------
+
+    def _query(self, sql: str, params: tuple) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{"key": key, "kg_co2e": kg, "rows": n} for key, kg, n in rows]
+
+    @staticmethod
+    def _check(by: str) -> None:
+        if by not in DIMENSIONS and by != "month":
+            raise ValueError(f"Unknown dimension '{by}'. Use one of {DIMENSIONS + ('month',)}")
+
+    def totals(
+        self,
+        by: str = "total",
+        key: Optional[str] = None,
+        month: Optional[str] = None,
+        month_from: Optional[str] = None,
+        month_to: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        kg CO2e per key of `by` (supplier / category / activity / total), for
+        one month, a month range, or all time. by="month" gives the monthly
+        series of the grand total instead.
+        """
+        self._check(by)
+        if by == "month":
+            sql = "SELECT month, kg_co2e, rows FROM rollups WHERE dimension = 'total' AND month != ?"
+            params = [ALL]
+            if month_from:
+                sql += " AND month >= ?"
+                params.append(to_month(month_from))
+            if month_to:
+                sql += " AND month <= ?"
+                params.append(to_month(month_to))
+            return self._query(sql + " ORDER BY month", tuple(params))
+
+        key_filter = " AND key = ?" if key is not None else ""
+        key_params = (key,) if key is not None else ()
+        if month_from or month_to:
+            sql = (
+                "SELECT key, SUM(kg_co2e), SUM(rows) FROM rollups "
+                f"WHERE dimension = ? AND month != ? AND month BETWEEN ? AND ?{key_filter} GROUP BY key ORDER BY key"
+            )
+            lo = to_month(month_from) if month_from else "0000-01"
+            hi = to_month(month_to) if month_to else "9999-12"
+            return self._query(sql, (by, ALL, lo, hi) + key_params)
+
+        sql = f"SELECT key, kg_co2e, rows FROM rollups WHERE dimension = ? AND month = ?{key_filter} ORDER BY key"
+        return self._query(sql, (by, to_month(month) if month else ALL) + key_params)
+
+    def top(self, by: str = "supplier", n: int = 10, month: Optional[str] = None) -> list[dict]:
+        """The `n` largest emitters along `by`, for one month or all time."""
+        if by not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{by}'. Use one of {DIMENSIONS}")
+        sql = "SELECT key, kg_co2e, rows FROM rollups WHERE dimension = ? AND month = ? ORDER BY kg_co2e DESC LIMIT ?"
+        return self._query(sql, (by, to_month(month) if month else ALL, n))
+
+    def supplier_totals(self) -> tuple[list[float], list[Optional[str]]]:
+        """All-time kg CO2e of every stored supplier, with its sector (None if unknown)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.kg_co2e, s.sector FROM rollups r LEFT JOIN suppliers s ON s.supplier_id = r.key "
+                "WHERE r.dimension = 'supplier' AND r.month = ?",
+                (ALL,),
+            ).fetchall()
+        return [kg for kg, _ in rows], [sector for _, sector in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_store: Optional[EmissionStore] = None
+_store_lock = Lock()
+
+
+def get_store() -> EmissionStore:
+    """The process-wide store at STORE_PATH, opened on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmissionStore()
+    return _store
@@ -0,0 +1,100 @@
+# backend/agents/estimator/estimator_client.py
+"""
+Pluggable access to the emission estimator.
+
+    inprocess  call estimate_emissions directly (default)
+    remote     POST to the FastAPI service over a pooled keep-alive session
+
+Choose with SPARKSCOPE_ESTIMATOR_BACKEND; the remote backend also reads
+SPARKSCOPE_API_URL, SPARKSCOPE_API_TIMEOUT and SPARKSCOPE_API_RETRIES.
+"""
+from functools import lru_cache
+import os
+
+BACKENDS = ("inprocess", "remote")
+
+
+class EstimatorError(RuntimeError):
+    """The estimator could not produce a result."""
+
+
+class InProcessEstimator:
+    def __init__(self):
+        from backend.agents.estimator.emission_estimator import estimate_emissions, estimate_emissions_batch
+
+        self._estimate = estimate_emissions
+        self._estimate_batch = estimate_emissions_batch
+
+    def estimate(self, payload: dict) -> dict:
+        try:
+            return self._estimate(payload)
+        except Exception as e:
+            raise EstimatorError(str(e)) from e
+
+    def estimate_batch(self, payloads: list[dict]) -> list[dict]:
+        try:
+            return self._estimate_batch(payloads)
+        except Exception as e:
+            raise EstimatorError(str(e)) from e
+
+
+class RemoteEstimator:
+    def __init__(self, base_url: str, timeout: float = 10.0, retries: int = 3, pool_size: int = 10):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.2,
+                # 429 is the API's backpressure answer; wait as long as its Retry-After asks
+                status_forcelist=(429, 502, 503, 504),
+                respect_retry_after_header=True,
+                allowed_methods=frozenset({"POST"}),  # estimation is idempotent
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, body, extract):
+        """POST `body` and return `extract(json)`; every failure is an EstimatorError."""
+        import requests
+
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise EstimatorError(f"Failed to reach API: {e}") from e
+        if response.status_code != 200:
+            raise EstimatorError(f"API error: {response.text}")
+        try:
+            return extract(response.json())
+        except (ValueError, KeyError, TypeError) as e:
+            raise EstimatorError(f"Unexpected API response: {e!r}") from e
+
+    def estimate(self, payload: dict) -> dict:
+        return self._post("/api/estimate", {"activities": payload}, lambda data: data["emissions"])
+
+    def estimate_batch(self, payloads: list[dict]) -> list[dict]:
+        body = [{"activities": p} for p in payloads]
+        return self._post("/api/estimate/batch", body, lambda data: [s["emissions"] for s in data["suppliers"]])
+
+
+@lru_cache(maxsize=1)
+def get_estimator_client():
+    """Return the configured estimator client (one per process)."""
+    backend = os.getenv("SPARKSCOPE_ESTIMATOR_BACKEND", "inprocess")
+    if backend == "inprocess":
+        return InProcessEstimator()
+    if backend == "remote":
+        return RemoteEstimator(
+            base_url=os.getenv("SPARKSCOPE_API_URL", "http://localhost:8000"),
+            timeout=float(os.getenv("SPARKSCOPE_API_TIMEOUT", "10")),
+            retries=int(os.getenv("SPARKSCOPE_API_RETRIES", "3")),
+        )
+    raise ValueError(f"Unknown estimator backend '{backend}'. Use one of {BACKENDS}")
@@ -0,0 +1,371 @@
+# backend/agents/estimator/factor_sets.py
+"""
+Region- and year-specific emission factor sets.
+
+factor_sets.csv lists factors per (Region, Year, Source) using the DEFRA
+Category / Activity names. A FactorEngine holds them all as two arrays:
+
+    factors    float64 [set, activity]   kgCO2e per unit, ACTIVITY_MAP order
+    vintages   int32   [region, year]    set row to use for a region in a year
+
+Row 0 is the default set (defra_factors.csv, i.e. what emission_estimator
+uses without a region). A region resolves to its latest vintage at or
+before the requested year, or its earliest one for older dates. Activities
+a vintage doesn't list carry over from the region's previous vintage, then
+from the default set. Unknown regions resolve to the default set, and so
+does a date without a region, since the default set has no vintages
+(`undated_rows` finds those so callers can report them). When two sources
+publish the same region and year, the first one listed wins.
+
+The arrays are saved to factor_sets.bin and memory-mapped by every worker,
+so all processes share one copy of the pages. The file is rebuilt whenever
+the default factors in use or factor_sets.csv change.
+
+CLI:
+    python backend/agents/estimator/factor_sets.py build
+    python backend/agents/estimator/factor_sets.py resolve GB 2023-06
+"""
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, Optional, Sequence
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.estimator.emission_estimator import (
+    ACTIVITY_MAP,
+    DATA_DIR,
+    FactorSnapshot,
+    get_snapshot,
+)
+
+FACTOR_SETS_CSV = DATA_DIR / "factor_sets.csv"
+FACTOR_SETS_BIN = Path(os.getenv("SPARKSCOPE_FACTOR_SETS_BIN", str(DATA_DIR / "factor_sets.bin")))
+
+_MAGIC = b"SPKFACT1"
+_ALIGN = 64
+
+
+class FactorSetKey(NamedTuple):
+    region: str
+    year: int
+    source: str
+
+
+DEFAULT_SET = FactorSetKey("*", 0, "defra")
+
+
+def _digest(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _sources(snapshot: FactorSnapshot, sets_csv: Path = FACTOR_SETS_CSV) -> dict:
+    """
+    What a built engine depends on. Row 0 comes from `snapshot`, so the
+    defaults are keyed on its factors rather than on the CSV, which may have
+    changed on disk since the snapshot was loaded.
+    """
+    defaults = json.dumps(sorted(snapshot.activities.items())).encode("utf-8")
+    return {"defaults": hashlib.sha256(defaults).hexdigest(), "sets": _digest(sets_csv)}
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def _years(dates: Sequence) -> np.ndarray:
+    """Leading year of each date; NaN where it's missing or not a number."""
+    return pd.to_numeric(pd.Series(dates, dtype="string").str.slice(0, 4), errors="coerce").to_numpy(
+        dtype="float64", na_value=np.nan
+    )
+
+
+class FactorEngine:
+    """All factor sets in two arrays, with vectorised per-row resolution."""
+
+    def __init__(
+        self,
+        activities: Sequence[str],
+        regions: Sequence[str],
+        sets: Sequence[FactorSetKey],
+        factors: np.ndarray,
+        vintages: np.ndarray,
+        first_year: int,
+        sources: dict = None,
+    ):
+        self.activities = tuple(activities)
+        self.regions = tuple(regions)
+        self.sets = tuple(FactorSetKey(*s) for s in sets)
+        self.factors = factors
+        self.vintages = vintages
+        self.first_year = first_year
+        self.sources = sources or {}
+        self._activity_index = pd.Index(self.activities)
+        self._region_index = pd.Index(self.regions)
+        self.defaults_mtime_ns = 0  # mtime of the DEFRA table row 0 came from
+
+    # ---------- Building ----------
+
+    @classmethod
+    def from_frame(cls, defaults: dict[str, float], frame: pd.DataFrame, sources: dict = None) -> "FactorEngine":
+        """
+        Build from the default activity factors and a long frame with
+        Region, Year, Source, Category, Activity, kgCO2e_per_unit columns.
+        """
+        activities = list(ACTIVITY_MAP)
+        by_name = {(cat, act): key for key, (cat, act) in ACTIVITY_MAP.items()}
+
+        frame = frame.assign(
+            Region=frame["Region"].str.upper().str.strip(),
+            Year=frame["Year"].astype(int),
+            Key=[by_name.get((c.lower(), a.lower())) for c, a in zip(frame["Category"], frame["Activity"])],
+        )
+        frame = frame[frame["Key"].notna()]
+
+        # One row per (region, year, source), in file order
+        sets = [DEFAULT_SET] + [
+            FactorSetKey(r, int(y), s) for r, y, s in frame[["Region", "Year", "Source"]].drop_duplicates().itertuples(index=False)
+        ]
+        set_row = {key: i for i, key in enumerate(sets)}
+        factors = np.full((len(sets), len(activities)), np.nan)
+        factors[0] = [defaults[k] for k in activities]
+        rows = [set_row[FactorSetKey(r, y, s)] for r, y, s in zip(frame["Region"], frame["Year"], frame["Source"])]
+        cols = pd.Index(activities).get_indexer(frame["Key"])
+        factors[rows, cols] = frame["kgCO2e_per_unit"].to_numpy(dtype="float64")
+
+        regions = sorted({s.region for s in sets[1:]})
+        years = [s.year for s in sets[1:]]
+        first_year = min(years, default=0)
+        n_years = max(years, default=-1) - first_year + 1
+        vintages = np.zeros((len(regions), max(n_years, 0)), dtype=np.int32)
+
+        for r, region in enumerate(regions):
+            # First source listed per year; fill gaps from the previous vintage, then the default set
+            by_year: dict[int, int] = {}
+            for i, s in enumerate(sets):
+                if s.region == region:
+                    by_year.setdefault(s.year, i)
+            previous = 0
+            for year in sorted(by_year):
+                row = by_year[year]
+                missing = np.isnan(factors[row])
+                factors[row, missing] = factors[previous, missing]
+                previous = row
+            # Later duplicate sources are filled from the region's chosen vintage too
+            for i, s in enumerate(sets):
+                if s.region == region and np.isnan(factors[i]).any():
+                    missing = np.isnan(factors[i])
+                    factors[i, missing] = factors[by_year[s.year], missing]
+
+            vintage_years = np.array(sorted(by_year))
+            vintage_rows = np.array([by_year[y] for y in vintage_years], dtype=np.int32)
+            span = np.arange(first_year, first_year + n_years)
+            # Latest vintage <= year; years before the first vintage use the first
+            pos = np.searchsorted(vintage_years, span, side="right") - 1
+            vintages[r] = vintage_rows[np.maximum(pos, 0)]
+
+        return cls(activities, regions, sets, factors, vintages, first_year, sources)
+
+    @classmethod
+    def from_csv(cls, snapshot: FactorSnapshot = None, sets_csv: Path = FACTOR_SETS_CSV) -> "FactorEngine":
+        snapshot = snapshot or get_snapshot()
+        if sets_csv.exists():
+            frame = pd.read_csv(sets_csv)
+        else:
+            frame = pd.DataFrame(columns=["Region", "Year", "Source", "Category", "Activity", "kgCO2e_per_unit"])
+        engine = cls.from_frame(dict(snapshot.activities), frame, _sources(snapshot, sets_csv))
+        engine.defaults_mtime_ns = snapshot.mtime_ns
+        return engine
+
+    # ---------- Binary file ----------
+
+    def save(self, path: Path = FACTOR_SETS_BIN) -> Path:
+        """
+        Layout: magic, uint32 header length, JSON header, then the factors
+        and vintages arrays, each aligned to 64 bytes. Written to a temp file
+        and renamed, so readers never map a half-written file.
+        """
+        factors = np.ascontiguousarray(self.factors, dtype="<f8")
+        vintages = np.ascontiguousarray(self.vintages, dtype="<i4")
+        header = {
+            "activities": self.activities,
+            "regions": self.regions,
+            "sets": self.sets,
+            "first_year": self.first_year,
+            "sources": self.sources,
+            "factors": list(factors.shape),
+            "vintages": list(vintages.shape),
+        }
+        blob = json.dumps(header).encode("utf-8")
+        prefix = _MAGIC + struct.pack("<I", len(blob)) + blob
+        prefix += b"\0" * _pad(len(prefix))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(prefix)
+            f.write(factors.tobytes())
+            f.write(b"\0" * _pad(factors.nbytes))
+            f.write(vintages.tobytes())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def open(cls, path: Path = FACTOR_SETS_BIN) -> "FactorEngine":
+        """Memory-map a file written by `save`; the arrays are read-only."""
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a factor set file")
+            (size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size))
+
+        offset = len(_MAGIC) + 4 + size
+        offset += _pad(offset)
+        arrays = []
+        for name, dtype in (("factors", "<f8"), ("vintages", "<i4")):
+            shape = tuple(header[name])
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if nbytes:
+                arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+            else:
+                arrays.append(np.zeros(shape, dtype=dtype))
+            offset += nbytes + _pad(nbytes)
+
+        return cls(
+            header["activities"], header["regions"], header["sets"], *arrays,
+            first_year=header["first_year"], sources=header["sources"],
+        )
+
+    # ---------- Resolution ----------
+
+    def set_ids(self, regions: Sequence[Optional[str]], dates: Sequence = None) -> np.ndarray:
+        """
+        Set row per input row. `dates` may be ISO dates, "YYYY-MM", years or
+        None; a missing or unparseable date resolves to the region's latest
+        vintage (`unparseable_dates` finds the latter).
+        """
+        n = len(regions)
+        codes = self._region_index.get_indexer(pd.Series(regions, dtype=object).str.upper().str.strip())
+        if not self.vintages.size:
+            return np.zeros(n, dtype=np.int32)
+
+        n_years = self.vintages.shape[1]
+        if dates is None:
+            cols = np.full(n, n_years - 1)
+        else:
+            years = _years(dates)
+            cols = np.where(np.isnan(years), n_years - 1, np.clip(years - self.first_year, 0, n_years - 1)).astype(np.int64)
+        return np.where(codes >= 0, self.vintages[np.maximum(codes, 0), cols], 0).astype(np.int32)
+
+    @staticmethod
+    def undated_rows(regions: Optional[Sequence[Optional[str]]], dates: Optional[Sequence]) -> np.ndarray:
+        """Indices of rows whose date is ignored because they have no region."""
+        if dates is None:
+            return np.zeros(0, dtype=np.int64)
+        if regions is None:
+            regions = [None] * len(dates)
+        return np.flatnonzero([d is not None and not r for r, d in zip(regions, dates)])
+
+    @staticmethod
+    def unparseable_dates(dates: Optional[Sequence]) -> np.ndarray:
+        """Indices of rows whose date doesn't start with a year (e.g.
+        "05/01/2023"); set_ids treats those like a missing date."""
+        if dates is None:
+            return np.zeros(0, dtype=np.int64)
+        given = np.array([d is not None for d in dates], dtype=bool)
+        return np.flatnonzero(given & np.isnan(_years(dates)))
+
+    def resolve(self, keys: Sequence[str], set_ids: np.ndarray) -> np.ndarray:
+        """Factor per (activity key, set row) pair; NaN for unknown keys."""
+        cols = self._activity_index.get_indexer(pd.Index(keys, dtype=object))
+        ef = self.factors[set_ids, np.maximum(cols, 0)]
+        ef[cols < 0] = np.nan
+        return ef
+
+    def factor(self, key: str, region: Optional[str] = None, date=None) -> float:
+        """Scalar lookup: kgCO2e per unit of payload key `key`."""
+        ef = self.resolve([key], self.set_ids([region], [date]))[0]
+        if np.isnan(ef):
+            raise KeyError(f"Unknown activity key: {key}")
+        return float(ef)
+
+    def describe(self, set_id: int) -> dict:
+        return dict(self.sets[set_id]._asdict(), factors=dict(zip(self.activities, self.factors[set_id].tolist())))
+
+
+# ---------- Process-wide engine ----------
+
+_ENGINE: Optional[FactorEngine] = None
+_ENGINE_LOCK = Lock()
+
+
+def load_engine(
+    snapshot: FactorSnapshot = None,
+    path: Path = FACTOR_SETS_BIN,
+    sets_csv: Path = FACTOR_SETS_CSV,
+) -> FactorEngine:
+    """
+    Map the prebuilt binary file when it was built from the current CSVs,
+    otherwise build from the CSVs and (re)write it.
+    """
+    snapshot = snapshot or get_snapshot()
+    sources = _sources(snapshot, sets_csv)
+    try:
+        engine = FactorEngine.open(path)
+        if engine.sources == sources:
+            engine.defaults_mtime_ns = snapshot.mtime_ns
+            return engine
+    except (OSError, ValueError):
+        pass
+
+    engine = FactorEngine.from_csv(snapshot, sets_csv)
+    try:
+        engine.save(path)
+    except OSError as e:
+        print(f"⚠️  Could not write {path}, using in-memory factor sets: {e}", file=sys.stderr)
+    return engine
+
+
+def get_engine() -> FactorEngine:
+    """The shared engine, rebuilt when the default DEFRA table reloads."""
+    global _ENGINE
+    snapshot = get_snapshot()
+    engine = _ENGINE
+    if engine is None or engine.defaults_mtime_ns != snapshot.mtime_ns:
+        with _ENGINE_LOCK:
+            if _ENGINE is None or _ENGINE.defaults_mtime_ns != snapshot.mtime_ns:
+                _ENGINE = load_engine(snapshot)
+            engine = _ENGINE
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the multi-region factor sets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build", help="Write the binary factor file from the CSVs")
+    build_p.add_argument("-o", "--output", type=Path, default=FACTOR_SETS_BIN)
+    resolve_p = sub.add_parser("resolve", help="Show the factor set used for a region and date")
+    resolve_p.add_argument("region")
+    resolve_p.add_argument("date", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        engine = FactorEngine.from_csv()
+        path = engine.save(args.output)
+        print(f"✅ {len(engine.sets)} factor sets, {len(engine.regions)} regions -> {path} ({path.stat().st_size:,} bytes)")
+    else:
+        engine = get_engine()
+        print(json.dumps(engine.describe(int(engine.set_ids([args.region], [args.date])[0])), indent=2))
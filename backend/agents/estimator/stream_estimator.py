@@ -0,0 +1,308 @@
+# backend/agents/estimator/stream_estimator.py
+"""
+Bounded-memory bulk estimation over NDJSON or CSV activity exports.
+
+Rows are read lazily, grouped into fixed-size chunks, estimated with
+`estimate_emissions_batch`, checked column-wise by the verification rule engine, and written back
+out one result per row. Only one chunk is ever held in memory.
+
+NDJSON rows look like either of
+    {"supplier_id": "S1", "electricity_kwh": 5000, "road_freight_tkm": 6240}
+    {"supplier_id": "S1", "region": "GB", "date": 2023, "activities": {"electricity_kwh": 5000}}
+CSV files need a header row; `supplier_id`, `region` and `date` columns are
+optional, empty cells are treated as missing activities and quoted cells
+may span lines. A region and date pick a regional factor set (see
+factor_sets.py); a date that doesn't start with a year falls back to the
+latest vintage with a warning.
+Cells or lines that can't be parsed are skipped and listed in that row's
+warnings instead of stopping the stream.
+
+CLI:
+    python backend/agents/estimator/stream_estimator.py activities.ndjson -o results.ndjson
+    cat activities.csv | python backend/agents/estimator/stream_estimator.py - --format csv
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, TextIO, Union
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.estimator.emission_estimator import ACTIVITY_MAP, estimate_emissions_batch
+from backend.agents.verification.rule_engine import verify_rows
+
+DEFAULT_CHUNK_SIZE = 5_000
+FORMATS = ("ndjson", "csv")
+
+class Row(NamedTuple):
+    supplier_id: Optional[str]
+    payload: dict
+    problems: tuple[str, ...] = ()     # cells or lines that could not be used
+    region: Optional[str] = None
+    date: Union[str, int, None] = None
+
+
+RowParser = Callable[[str], Optional[Row]]
+
+
+@dataclass
+class StreamStats:
+    """Running throughput counters for one stream."""
+    rows: int = 0
+    chunks: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "elapsed_s": round(self.elapsed, 3),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+        }
+
+
+def _to_payload(record: dict) -> tuple[dict, list[str]]:
+    """Numeric cells become the payload; anything else is reported, not fatal."""
+    payload, problems = {}, []
+    for key, value in record.items():
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        try:
+            payload[key] = float(value)
+        except (TypeError, ValueError):
+            problems.append(f"Non-numeric value for '{key}' skipped: {value!r}")
+    return payload, problems
+
+
+def _parse_ndjson_line(line: str) -> Optional[Row]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return Row(None, {}, (f"Invalid JSON line skipped: {e}",))
+    if not isinstance(record, dict):
+        return Row(None, {}, ("JSON line is not an object, skipped",))
+    supplier_id = record.pop("supplier_id", None)
+    region, date = record.pop("region", None), record.pop("date", None)
+    payload = record.pop("activities", record)
+    if not isinstance(payload, dict):
+        return Row(supplier_id, {}, ("'activities' is not an object, skipped",), region, date)
+    payload, problems = _to_payload(payload)
+    return Row(supplier_id, payload, tuple(problems), region, date)
+
+
+class _CsvLineParser:
+    """
+    Parses CSV one physical line at a time; the first record is the header.
+    Lines are buffered until their quotes balance, so quoted fields may
+    contain newlines.
+    """
+
+    def __init__(self):
+        self.header: Optional[list[str]] = None
+        self._pending = ""
+
+    def __call__(self, line: str) -> Optional[Row]:
+        text = self._pending + line
+        # A complete record has an even number of quote characters ("" escapes one)
+        if text.count('"') % 2:
+            self._pending = text if text.endswith("\n") else text + "\n"
+            return None
+        self._pending = ""
+        if not text.strip():
+            return None
+        cells = next(csv.reader([text]))
+        if self.header is None:
+            self.header = [c.strip() for c in cells]
+            return None
+        record = dict(zip(self.header, cells))
+        supplier_id = record.pop("supplier_id", None) or None
+        region = (record.pop("region", None) or "").strip() or None
+        date = (record.pop("date", None) or "").strip() or None
+        problems = [f"Row has {len(cells)} cells, header has {len(self.header)}"] if len(cells) != len(self.header) else []
+        payload, bad_cells = _to_payload(record)
+        return Row(supplier_id, payload, tuple(problems + bad_cells), region, date)
+
+    def flush(self) -> Optional[Row]:
+        """Parse whatever is left (an unterminated quoted field) at end of input."""
+        text, self._pending = self._pending, ""
+        return self(text + '"') if text else None
+
+
+def make_row_parser(fmt: str) -> RowParser:
+    """Return a stateful line -> Row parser for `fmt`."""
+    if fmt == "ndjson":
+        return _parse_ndjson_line
+    if fmt == "csv":
+        return _CsvLineParser()
+    raise ValueError(f"Unsupported format '{fmt}'. Use one of {FORMATS}")
+
+
+def estimate_chunk(rows: list[Row]) -> list[dict]:
+    """Estimate and verify one chunk of rows."""
+    payloads = [row.payload for row in rows]
+    # Only chunks with a region or date need the factor-set engine
+    unparseable = set()
+    if any(row.region or row.date is not None for row in rows):
+        from backend.agents.estimator.factor_sets import FactorEngine
+
+        dates = [row.date for row in rows]
+        unparseable = set(FactorEngine.unparseable_dates(dates).tolist())
+        emissions = estimate_emissions_batch(payloads, [row.region for row in rows], dates)
+    else:
+        emissions = estimate_emissions_batch(payloads)
+    warnings = verify_rows(payloads)
+    return [
+        {
+            "supplier_id": row.supplier_id,
+            "emissions": result,
+            "warnings": list(row.problems) + _date_warnings(row, i in unparseable) + row_warnings,
+        }
+        for i, (row, result, row_warnings) in enumerate(zip(rows, emissions, warnings))
+    ]
+
+
+def _date_warnings(row: Row, unparseable: bool) -> list[str]:
+    if row.date is None:
+        return []
+    if not row.region:
+        return ["Date ignored without a region"]
+    if unparseable:
+        return [f"Unrecognised date '{row.date}', latest factor vintage used"]
+    return []
+
+
+class RowChunker:
+    """
+    Turns input lines into chunks of up to `chunk_size` rows. The CLI and
+    the async API endpoint both drive one, so they chunk identically.
+    """
+
+    def __init__(self, fmt: str = "ndjson", chunk_size: int = DEFAULT_CHUNK_SIZE, stats: Optional[StreamStats] = None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.parse = make_row_parser(fmt)
+        self.chunk_size = chunk_size
+        self.stats = stats if stats is not None else StreamStats()
+        self._chunk: list[Row] = []
+
+    def _take(self) -> list[Row]:
+        chunk, self._chunk = self._chunk, []
+        self.stats.rows += len(chunk)
+        self.stats.chunks += 1
+        return chunk
+
+    def feed(self, line: str) -> Optional[list[Row]]:
+        """Add one line; returns a full chunk when one is ready."""
+        row = self.parse(line)
+        if row is not None:
+            self._chunk.append(row)
+            if len(self._chunk) >= self.chunk_size:
+                return self._take()
+        return None
+
+    def close(self) -> Optional[list[Row]]:
+        """End of input; returns the last partial chunk, if any."""
+        flush = getattr(self.parse, "flush", None)
+        row = flush() if flush else None
+        if row is not None:
+            self._chunk.append(row)
+        return self._take() if self._chunk else None
+
+
+def iter_rows(lines: Iterable[str], fmt: str = "ndjson") -> Iterator[Row]:
+    chunker = RowChunker(fmt, chunk_size=1)
+    for line in lines:
+        yield from chunker.feed(line) or ()
+    yield from chunker.close() or ()
+
+
+def stream_estimates(
+    lines: Iterable[str],
+    fmt: str = "ndjson",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[StreamStats] = None,
+) -> Iterator[dict]:
+    """
+    Lazily estimate every row in `lines`, `chunk_size` rows at a time.
+    Pass a StreamStats to collect throughput numbers as the stream runs.
+    """
+    chunker = RowChunker(fmt, chunk_size, stats)
+    for line in lines:
+        chunk = chunker.feed(line)
+        if chunk:
+            yield from estimate_chunk(chunk)
+    chunk = chunker.close()
+    if chunk:
+        yield from estimate_chunk(chunk)
+
+
+def to_ndjson(result: dict) -> str:
+    return json.dumps(result, ensure_ascii=False) + "\n"
+
+
+CSV_COLUMNS = ["supplier_id", *ACTIVITY_MAP, "total", "warnings"]
+
+
+def write_csv(results: Iterable[dict], out: TextIO) -> None:
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for res in results:
+        emissions = res["emissions"]
+        writer.writerow(
+            [res["supplier_id"] or ""]
+            + [emissions.get(k, "") for k in ACTIVITY_MAP]
+            + [emissions["total"], "; ".join(res["warnings"])]
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream bulk emission estimates.")
+    parser.add_argument("input", help="NDJSON/CSV activity file, or '-' for stdin")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from file extension)")
+    parser.add_argument("--output-format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "ndjson")
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    dst = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+
+    stats = StreamStats()
+    try:
+        results = stream_estimates(src, fmt, args.chunk_size, stats)
+        if args.output_format == "csv":
+            write_csv(results, dst)
+        else:
+            for res in results:
+                dst.write(to_ndjson(res))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    s = stats.as_dict()
+    print(f"✅ {s['rows']} rows in {s['elapsed_s']}s ({s['rows_per_sec']:,} rows/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# backend/agents/pipeline.py
+"""
+DAG execution of registered agents.
+
+A Pipeline is a list of Stages. Each stage names an agent from AGENTS (or
+gives a callable) and the earlier outputs it consumes. Stages whose inputs
+are ready run concurrently. In document_pipeline() that means verification and
+estimation of a payload run side by side:
+
+    document -> text -> payload -> warnings
+                                -> emissions -> badge
+
+`run_stream` runs many documents through the DAG with a bounded number in
+flight and yields results in input order, so a directory of invoices is
+processed as a stream. Every stage execution is reported to a metrics hook:
+PrintMetrics logs each one, and StageMetrics keeps Prometheus-style counters
+and latency histograms (backend/instrumentation.py) that `render()` returns
+as text.
+
+CLI:
+    python backend/agents/pipeline.py invoices/ --workers 8
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterable, Iterator, Optional, Protocol, Sequence, Union
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.agent_router import get_agent
+from backend.instrumentation import LatencyHistogram
+
+
+# ---------- Metrics hooks ----------
+
+class MetricsHook(Protocol):
+    def observe(self, stage: str, seconds: float, ok: bool) -> None: ...
+
+
+class PrintMetrics:
+    """Print one line per stage execution to stderr, keeping stdout for results."""
+
+    def observe(self, stage: str, seconds: float, ok: bool) -> None:
+        print(f"⏱️  {stage:<12} {seconds * 1000:9.2f} ms {'ok' if ok else 'FAILED'}", file=sys.stderr)
+
+
+class StageMetrics:
+    """Per-stage latency histograms, failure counts and throughput."""
+
+    def __init__(self, prefix: str = "sparkscope_pipeline"):
+        self.prefix = prefix
+        self.latency = LatencyHistogram(f"{prefix}_stage_seconds", "Agent stage latency.", "stage")
+        self.started = time.perf_counter()
+        self._lock = Lock()
+        self._failures: dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float, ok: bool) -> None:
+        self.latency.observe(stage, seconds)
+        if not ok:
+            with self._lock:
+                self._failures[stage] = self._failures.get(stage, 0) + 1
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            failures = dict(self._failures)
+        return {
+            stage: dict(
+                stats,
+                failures=failures.get(stage, 0),
+                per_sec=stats["count"] / elapsed if elapsed > 0 else 0.0,
+            )
+            for stage, stats in self.latency.summary().items()
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        name = f"{self.prefix}_stage_failures_total"
+        with self._lock:
+            failures = dict(self._failures)
+        lines = [f"# HELP {name} Agent stage failures.", f"# TYPE {name} counter"]
+        lines += [f'{name}{{stage="{stage}"}} {n}' for stage, n in failures.items()]
+        return self.latency.render() + "\n".join(lines) + "\n"
+
+
+# Process-wide metrics, used when a pipeline is given no hook
+PIPELINE_METRICS = StageMetrics()
+
+
+# ---------- Pipelines ----------
+
+@dataclass(frozen=True)
+class Stage:
+    name: str                              # output key in the result dict
+    agent: Union[str, Callable]            # AGENTS key or a callable
+    inputs: tuple[str, ...]                # pipeline input / earlier stage names
+
+    def resolve(self) -> Callable:
+        return get_agent(self.agent) if isinstance(self.agent, str) else self.agent
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        input_name: str = "input",
+        metrics: Optional[MetricsHook] = None,
+        workers: int = 4,
+    ):
+        self.input_name = input_name
+        self.metrics = metrics or PIPELINE_METRICS
+        self.workers = workers
+        names = [input_name] + [s.name for s in stages]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Pipeline stage names must be unique: {duplicates}")
+        self.stages = {s.name: s for s in stages}
+        self._fns = {s.name: s.resolve() for s in stages}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._validate()
+
+    def _validate(self) -> None:
+        known = {self.input_name}
+        pending = list(self.stages.values())
+        # Repeatedly peel off stages whose inputs are all known
+        while pending:
+            ready = [s for s in pending if set(s.inputs) <= known]
+            if not ready:
+                missing = {i for s in pending for i in s.inputs} - known - {s.name for s in pending}
+                raise ValueError(f"Pipeline has a cycle or unknown inputs: {sorted(missing) or [s.name for s in pending]}")
+            known.update(s.name for s in ready)
+            pending = [s for s in pending if s not in ready]
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline-stage")
+        return self._pool
+
+    def _call(self, stage: Stage, args: list):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            result = self._fns[stage.name](*args)
+            ok = True
+            return result
+        finally:
+            self.metrics.observe(stage.name, time.perf_counter() - t0, ok)
+
+    def run(self, value) -> dict:
+        """
+        Run the DAG on one input. Returns every stage output by name plus the
+        input itself; failed stages are listed under "errors" and stages
+        depending on them are skipped.
+        """
+        results = {self.input_name: value}
+        errors: dict[str, str] = {}
+        remaining = dict(self.stages)
+        running: dict[Future, Stage] = {}
+
+        while remaining or running:
+            for name, stage in list(remaining.items()):
+                if any(i in errors or i in remaining or i in {s.name for s in running.values()} for i in stage.inputs):
+                    if any(i in errors for i in stage.inputs):
+                        errors[name] = "skipped: upstream stage failed"
+                        del remaining[name]
+                    continue
+                running[self.pool.submit(self._call, stage, [results[i] for i in stage.inputs])] = stage
+                del remaining[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception as e:
+                    errors[stage.name] = str(e)
+
+        if errors:
+            results["errors"] = errors
+        return results
+
+    def run_stream(self, values: Iterable, max_in_flight: int = None) -> Iterator[dict]:
+        """
+        Run many inputs through the DAG, up to `max_in_flight` at once, and
+        yield their results lazily in input order.
+        """
+        max_in_flight = max_in_flight or self.workers
+        window: deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pipeline-doc") as docs:
+            for value in values:
+                window.append(docs.submit(self.run, value))
+                if len(window) >= max_in_flight:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def _badge(emissions: dict) -> Optional[str]:
+    return get_agent("badge")(emissions["total"]) if emissions else None
+
+
+# Raw payload -> warnings + emissions -> badge
+PAYLOAD_STAGES = (
+    Stage("warnings", "verify", ("payload",)),
+    Stage("emissions", "estimate", ("payload",)),
+    Stage("badge", _badge, ("emissions",)),
+)
+
+# PDF path -> text -> payload -> warnings + emissions -> badge
+DOCUMENT_STAGES = (
+    Stage("text", "extract_text", ("document",)),
+    Stage("payload", "extract_payload", ("text",)),
+) + PAYLOAD_STAGES
+
+
+def payload_pipeline(**kwargs) -> Pipeline:
+    return Pipeline(PAYLOAD_STAGES, input_name="payload", **kwargs)
+
+
+def document_pipeline(**kwargs) -> Pipeline:
+    return Pipeline(DOCUMENT_STAGES, input_name="document", **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract, verify, estimate and badge a folder of invoice PDFs.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Documents in flight")
+    parser.add_argument("--log-stages", action="store_true", help="Print every stage timing to stderr")
+    args = parser.parse_args()
+
+    metrics = PrintMetrics() if args.log_stages else PIPELINE_METRICS
+    pipeline = document_pipeline(metrics=metrics, workers=args.workers)
+    t0 = time.perf_counter()
+    count = 0
+    for result in pipeline.run_stream(sorted(args.directory.glob("*.pdf")), max_in_flight=args.workers):
+        result.pop("text", None)
+        print(json.dumps(result, default=str, ensure_ascii=False))
+        count += 1
+    pipeline.shutdown()
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {count} documents in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} docs/s)", file=sys.stderr)
+    if metrics is PIPELINE_METRICS:
+        print(json.dumps(PIPELINE_METRICS.summary(), indent=2), file=sys.stderr)
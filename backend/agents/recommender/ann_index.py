@@ -0,0 +1,169 @@
+# backend/agents/recommender/ann_index.py
+"""
+FAISS index construction and loading for the recommender vector store.
+
+Supported index types (SPARKSCOPE_INDEX_TYPE):
+    flat      exact search (default; what FAISS.from_documents builds)
+    ivf_flat  inverted lists over full vectors; search width set by nprobe
+    hnsw      graph index; search width set by efSearch; no deletes
+    ivf_pq    inverted lists over product-quantised codes; smallest in RAM
+
+Build parameters are read when the index is built, and search parameters
+are applied when it is loaded. Indexes are opened with FAISS's mmap flag
+by default (SPARKSCOPE_INDEX_MMAP), but FAISS only memory-maps the inverted
+lists of IVF indexes. ivf_flat and ivf_pq therefore share their vector pages
+across processes. flat and hnsw are still read fully into each process's
+heap, so use an IVF type when several workers serve a large index.
+
+A corpus too small to train the configured type is built as a flat index
+instead. A message is printed at build time and again whenever such an
+index is loaded.
+"""
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import os
+import pickle
+import sys
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    index_type: str = "flat"
+    # build-time
+    nlist: int = 1024           # IVF coarse clusters
+    pq_m: int = 48              # PQ sub-quantisers (must divide the embedding width)
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    # search-time
+    nprobe: int = 16
+    ef_search: int = 64
+    mmap: bool = True
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Use one of {INDEX_TYPES}")
+
+    @classmethod
+    def from_env(cls, **overrides) -> "IndexConfig":
+        env = {
+            "index_type": os.getenv("SPARKSCOPE_INDEX_TYPE", cls.index_type),
+            "nlist": int(os.getenv("SPARKSCOPE_IVF_NLIST", cls.nlist)),
+            "pq_m": int(os.getenv("SPARKSCOPE_PQ_M", cls.pq_m)),
+            "pq_nbits": int(os.getenv("SPARKSCOPE_PQ_NBITS", cls.pq_nbits)),
+            "hnsw_m": int(os.getenv("SPARKSCOPE_HNSW_M", cls.hnsw_m)),
+            "ef_construction": int(os.getenv("SPARKSCOPE_HNSW_EF_CONSTRUCTION", cls.ef_construction)),
+            "nprobe": int(os.getenv("SPARKSCOPE_NPROBE", cls.nprobe)),
+            "ef_search": int(os.getenv("SPARKSCOPE_EF_SEARCH", cls.ef_search)),
+            "mmap": os.getenv("SPARKSCOPE_INDEX_MMAP", "1") == "1",
+        }
+        env.update(overrides)
+        return cls(**env)
+
+    def build_settings(self) -> dict:
+        """Parameters that change what gets written to disk."""
+        keys = ("index_type", "nlist", "pq_m", "pq_nbits", "hnsw_m", "ef_construction")
+        return {k: v for k, v in asdict(self).items() if k in keys}
+
+
+def index_kind(index: faiss.Index) -> str:
+    """The INDEX_TYPES name of a built index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return type(index).__name__
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """
+    Whether LangChain's FAISS.delete can remove vectors in place. Only flat
+    indexes qualify: their remove_ids compacts positions the same way
+    delete renumbers index_to_docstore_id. IVF remove_ids keeps the old ids,
+    so the next add would reuse a live one, and HNSW can't delete at all.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+
+def make_index(dim: int, config: IndexConfig, training_vectors: np.ndarray) -> faiss.Index:
+    """
+    Create an empty index of `config.index_type`, trained on
+    `training_vectors` where the type needs it. Falls back to a flat index
+    when there are too few vectors to train the requested one.
+    """
+    n = len(training_vectors)
+    x = np.ascontiguousarray(training_vectors, dtype="float32")
+
+    if config.index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+    elif config.index_type in ("ivf_flat", "ivf_pq"):
+        # k-means needs at least one point per cluster; PQ needs 2**nbits per codebook
+        nlist = min(config.nlist, n)
+        min_points = 2 ** config.pq_nbits if config.index_type == "ivf_pq" else 1
+        if nlist < 1 or n < min_points:
+            print(f"⚠️  {n} vectors is too few to train {config.index_type}; using a flat index instead", file=sys.stderr)
+            return faiss.IndexFlatL2(dim)
+        quantizer = faiss.IndexFlatL2(dim)
+        if config.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, config.pq_m, config.pq_nbits)
+        index.train(x)
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index: faiss.Index, config: IndexConfig) -> None:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(config.nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.ef_search
+
+
+def reconstruct(index: faiss.Index, positions: list[int]) -> np.ndarray:
+    """Stored vectors at `positions` (approximate for ivf_pq)."""
+    ivf = faiss.downcast_index(index)
+    if isinstance(ivf, faiss.IndexIVF) and ivf.direct_map.no():
+        # IVF lists need a direct map to look vectors up by id
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    if not positions:
+        return np.empty((0, index.d), dtype="float32")
+    return np.stack([index.reconstruct(int(pos)) for pos in positions])
+
+
+def load_vectorstore(path: Path, embeddings, config: IndexConfig = None, writable: bool = False):
+    """
+    Load a LangChain FAISS store saved with `save_local`, then apply the
+    configured search parameters. With `config.mmap` set (and `writable`
+    not), IVF inverted lists are memory-mapped; other types are read into
+    memory either way.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    config = config or IndexConfig.from_env()
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if config.mmap and not writable else 0
+    index = faiss.read_index(str(path / "index.faiss"), flags)
+    apply_search_params(index, config)
+    kind = index_kind(index)
+    if kind != config.index_type:
+        reason = " (the corpus was too small to train it)" if kind == "flat" else ""
+        print(f"⚠️  {path} holds a {kind} index, not the configured {config.index_type}{reason}", file=sys.stderr)
+
+    with open(path / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
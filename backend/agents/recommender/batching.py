@@ -0,0 +1,99 @@
+# backend/agents/recommender/batching.py
+"""
+Micro-batching for LLM generation.
+
+Concurrent callers `submit` one prompt each. A single background thread
+collects prompts until `max_batch` are waiting or `max_wait_ms` has passed
+since the first one arrived, runs them through the model as one batch, and
+resolves each caller's future with its own output.
+"""
+from concurrent.futures import Future, TimeoutError
+from threading import Lock, Thread
+from typing import Callable, Sequence
+import os
+import queue
+import time
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[list], Sequence], max_batch: int = 8, max_wait_ms: float = 10.0):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple[object, Future]]" = queue.Queue()
+        self._lock = Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self) -> None:
+        # Threads don't survive fork; (re)start in whichever process submits
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = Thread(target=self._loop, name="llm-micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, item) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout: float = None):
+        """
+        Submit one item and wait for its result. On timeout the item is
+        cancelled, so it is dropped if it has not reached the model yet.
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            if len(results) != len(batch):
+                error = RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results")
+                for _, fut in batch:
+                    fut.set_exception(error)
+                continue
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
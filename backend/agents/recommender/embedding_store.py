@@ -0,0 +1,199 @@
+# backend/agents/recommender/embedding_store.py
+"""
+Content-addressed on-disk cache of document (chunk) embeddings.
+
+Each (model, backend) pair gets its own directory under EMBEDDING_CACHE_DIR:
+
+    vectors.f32   float32 matrix, one row per cached text, memory-mapped
+    keys.txt      "<sha256> <row>" per line
+    dim           vector width
+
+Keys hash the model namespace, the embedding kind and the text, so identical
+chunks are embedded once across index rebuilds and processes. Appends are
+serialised with a file lock and vectors are written before their keys, so
+every key on disk points at a full row.
+
+Only documents go to disk: they come from the guide corpus, so the store
+grows with the corpus rather than with traffic. User queries are unbounded,
+so they are kept in a per-process LRU of SPARKSCOPE_QUERY_CACHE_SIZE entries.
+
+Set SPARKSCOPE_EMBEDDING_CACHE=0 to bypass both caches.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+import hashlib
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single writer only
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = Path(__file__).resolve().parents[2] / "embedding_cache"
+QUERY_CACHE_SIZE = int(os.getenv("SPARKSCOPE_QUERY_CACHE_SIZE", "1024"))
+
+
+class EmbeddingStore:
+    def __init__(self, namespace: str, root: Path = EMBEDDING_CACHE_DIR):
+        self.namespace = namespace
+        self.dir = root / namespace.replace("/", "--").replace(":", "__")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / "vectors.f32"
+        self.keys_path = self.dir / "keys.txt"
+        self.dim_path = self.dir / "dim"
+        self._lock = Lock()
+        self._rows: dict[str, int] = {}
+        self._keys_size = 0
+        self._matrix = None
+        self.dim = int(self.dim_path.read_text()) if self.dim_path.exists() else None
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    def key(self, text: str, kind: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _refresh(self) -> None:
+        """Pick up keys appended since the last read, possibly by another process."""
+        if not self.keys_path.exists():
+            return
+        size = self.keys_path.stat().st_size
+        if size == self._keys_size:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_size)
+            tail = f.read(size - self._keys_size)
+        # A partial last line is picked up on a later refresh
+        complete = tail[: tail.rfind(b"\n") + 1]
+        for line in complete.decode("ascii").splitlines():
+            key, row = line.split()
+            self._rows[key] = int(row)
+        self._keys_size += len(complete)
+        self._matrix = None
+
+    def _vectors(self) -> np.ndarray:
+        if self._matrix is None and self._rows:
+            if self.dim is None:
+                self.dim = int(self.dim_path.read_text())
+            n = self.vectors_path.stat().st_size // (4 * self.dim)
+            self._matrix = np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(n, self.dim))
+        return self._matrix
+
+    def get_many(self, keys: list[str]) -> list:
+        """Cached vectors for `keys`, None where missing."""
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._refresh()
+            matrix = self._vectors()
+            rows = [self._rows.get(k) for k in keys]
+            out = [None if row is None else np.array(matrix[row]) for row in rows]
+            found = sum(row is not None for row in rows)
+            self.hits += found
+            self.misses += len(keys) - found
+            return out
+
+    def put_many(self, keys: list[str], vectors) -> None:
+        if not len(keys):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        with self._lock, open(self.dir / ".lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            # Keep the first vector for each new key
+            fresh = {}
+            for k, v in zip(keys, vectors):
+                if k not in self._rows and k not in fresh:
+                    fresh[k] = v
+            if not fresh:
+                return
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.dim_path.write_text(str(self.dim))
+
+            size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+            first = -(-size // (4 * self.dim))  # skip any torn row left by a crash
+            with open(self.vectors_path, "r+b" if size else "wb") as f:
+                f.seek(first * 4 * self.dim)
+                f.write(np.stack(list(fresh.values())).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.keys_path, "ab") as f:
+                f.write("".join(f"{k} {first + i}\n" for i, k in enumerate(fresh)).encode("ascii"))
+            self._refresh()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only sends uncached texts to the encoder:
+    documents are looked up in the on-disk store, queries in an in-memory LRU.
+    """
+
+    def __init__(self, inner: Embeddings, store: EmbeddingStore, max_queries: int = QUERY_CACHE_SIZE):
+        self.inner = inner
+        self.store = store
+        self.max_queries = max_queries
+        self._queries: "OrderedDict[str, list[float]]" = OrderedDict()
+        self._queries_lock = Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        texts = list(texts)
+        keys = [self.store.key(t, "doc") for t in texts]
+        vectors = self.store.get_many(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self.inner.embed_documents([texts[i] for i in missing])
+            self.store.put_many([keys[i] for i in missing], fresh)
+            for i, vec in zip(missing, fresh):
+                vectors[i] = vec
+        return [np.asarray(v, dtype="float32").tolist() for v in vectors]
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                self.query_hits += 1
+                return list(vector)
+            self.query_misses += 1
+        vector = np.asarray(self.inner.embed_query(text), dtype="float32").tolist()
+        with self._queries_lock:
+            self._queries[text] = vector
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return list(vector)
+
+    def stats(self) -> dict:
+        lookups = self.query_hits + self.query_misses
+        return {
+            "documents": self.store.stats(),
+            "queries": {
+                "entries": len(self._queries),
+                "hits": self.query_hits,
+                "misses": self.query_misses,
+                "hit_rate": self.query_hits / lookups if lookups else 0.0,
+            },
+        }
+
+
+def with_cache(inner: Embeddings, model: str, backend: str) -> Embeddings:
+    """Wrap `inner` in the persistent cache unless SPARKSCOPE_EMBEDDING_CACHE=0."""
+    if os.getenv("SPARKSCOPE_EMBEDDING_CACHE", "1") == "0":
+        return inner
+    return CachedEmbeddings(inner, EmbeddingStore(f"{model}:{backend}"))
@@ -0,0 +1,241 @@
+# backend/agents/recommender/inference_backend.py
+"""
+CPU inference backends for the recommender's two models
+(all-MiniLM-L6-v2 embeddings and flan-t5-base generation).
+
+    torch   full-precision PyTorch (default)
+    int8    PyTorch with dynamic int8 quantisation of every nn.Linear
+    onnx    ONNX Runtime via optimum
+
+Pick one with SPARKSCOPE_INFERENCE_BACKEND. Converted models are cached
+under MODEL_CACHE_DIR. They are built on first use, or ahead of time with
+
+    python backend/agents/recommender/inference_backend.py export --backend onnx
+
+If a backend's dependencies or artifacts are unavailable, loading falls
+back to the torch path with a warning.
+"""
+from pathlib import Path
+import argparse
+import os
+import sys
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LLM_MODEL = "google/flan-t5-base"
+BACKENDS = ("torch", "int8", "onnx")
+MODEL_CACHE_DIR = Path(__file__).resolve().parents[2] / "model_cache"
+
+# Generation settings shared by every backend
+GENERATION_KWARGS = {"max_length": 256, "temperature": 0.3}
+
+
+def configured_backend() -> str:
+    backend = os.getenv("SPARKSCOPE_INFERENCE_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Use one of {BACKENDS}")
+    return backend
+
+
+def _artifact_dir(backend: str, model: str) -> Path:
+    return MODEL_CACHE_DIR / backend / model.replace("/", "--")
+
+
+# ---------- torch ----------
+
+def _torch_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def _torch_generator():
+    from transformers import pipeline
+    return pipeline(task="text2text-generation", model=LLM_MODEL, **GENERATION_KWARGS)
+
+
+# ---------- int8 (dynamic quantisation) ----------
+
+def _quantized(name: str, build_fp32, build_empty=None):
+    """
+    Int8 copy of a model with its Linear layers quantised. The quantised
+    weights are cached on disk as a state_dict. On a cache hit the
+    full-precision weights are not loaded: `build_empty` makes the bare
+    architecture and the cached weights are loaded into it.
+    """
+    import torch
+
+    def quantize(model):
+        return torch.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+    path = _artifact_dir("int8", name) / "state_dict.pt"
+    if path.exists():
+        qmodel = quantize((build_empty or build_fp32)())
+        qmodel.load_state_dict(torch.load(path, weights_only=True))
+        return qmodel
+    qmodel = quantize(build_fp32())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save(qmodel.state_dict(), path)
+    return qmodel
+
+
+def _int8_embeddings():
+    embeddings = _torch_embeddings()
+    # HuggingFaceEmbeddings.client is the SentenceTransformer it encodes with
+    embeddings.client = _quantized(EMBEDDING_MODEL, lambda: embeddings.client)
+    return embeddings
+
+
+def _int8_generator():
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    model = _quantized(
+        LLM_MODEL,
+        lambda: AutoModelForSeq2SeqLM.from_pretrained(LLM_MODEL),
+        lambda: AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(LLM_MODEL)),
+    )
+    tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
+    return pipeline(task="text2text-generation", model=model, tokenizer=tokenizer, **GENERATION_KWARGS)
+
+
+# ---------- onnx ----------
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain-compatible embeddings over an ONNX export of MiniLM:
+    mean pooling + L2 normalisation, as the sentence-transformers model does."""
+
+    def __init__(self, model_dir: Path, batch_size: int = 32):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.batch_size = batch_size
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True, truncation=True, max_length=256, return_tensors="np",
+            )
+            hidden = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.astype("float32").tolist())
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._encode(list(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._encode([text])[0]
+
+
+def _export_onnx_embeddings() -> Path:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+
+    path = _artifact_dir("onnx", EMBEDDING_MODEL)
+    if not (path / "model.onnx").exists():
+        source = f"sentence-transformers/{EMBEDDING_MODEL}"
+        ORTModelForFeatureExtraction.from_pretrained(source, export=True).save_pretrained(path)
+        AutoTokenizer.from_pretrained(source).save_pretrained(path)
+    return path
+
+
+def _export_onnx_generator() -> Path:
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    path = _artifact_dir("onnx", LLM_MODEL)
+    if not (path / "encoder_model.onnx").exists():
+        ORTModelForSeq2SeqLM.from_pretrained(LLM_MODEL, export=True).save_pretrained(path)
+        AutoTokenizer.from_pretrained(LLM_MODEL).save_pretrained(path)
+    return path
+
+
+def _onnx_embeddings():
+    return OnnxEmbeddings(_export_onnx_embeddings())
+
+
+def _onnx_generator():
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from optimum.pipelines import pipeline
+    from transformers import AutoTokenizer
+
+    path = _export_onnx_generator()
+    return pipeline(
+        task="text2text-generation",
+        model=ORTModelForSeq2SeqLM.from_pretrained(path),
+        tokenizer=AutoTokenizer.from_pretrained(path),
+        accelerator="ort",
+        **GENERATION_KWARGS,
+    )
+
+
+_LOADERS = {
+    "torch": (_torch_embeddings, _torch_generator),
+    "int8": (_int8_embeddings, _int8_generator),
+    "onnx": (_onnx_embeddings, _onnx_generator),
+}
+
+
+def _load(backend: str, which: int):
+    """(loaded object, backend actually used)."""
+    backend = backend or configured_backend()
+    try:
+        return _LOADERS[backend][which](), backend
+    except Exception as e:
+        if backend == "torch":
+            raise
+        print(f"⚠️  {backend} inference backend unavailable ({e}); falling back to torch", file=sys.stderr)
+        return _LOADERS["torch"][which](), "torch"
+
+
+def load_embeddings(backend: str = None, cached: bool = False):
+    """
+    Embeddings object with embed_query / embed_documents for `backend`.
+    With `cached`, it is wrapped in the persistent embedding cache
+    (see embedding_store.py), namespaced by model and the backend that loaded.
+    """
+    return load_embeddings_and_backend(backend, cached)[0]
+
+
+def load_embeddings_and_backend(backend: str = None, cached: bool = False):
+    """Like load_embeddings, plus the backend actually used after any fallback."""
+    embeddings, backend = _load(backend, 0)
+    if cached:
+        from .embedding_store import with_cache
+        embeddings = with_cache(embeddings, EMBEDDING_MODEL, backend)
+    return embeddings, backend
+
+
+def load_generator(backend: str = None):
+    """text2text-generation pipeline for `backend`."""
+    return _load(backend, 1)[0]
+
+
+def export(backend: str) -> None:
+    """Build and cache the converted artifacts for `backend` ahead of time."""
+    if backend == "onnx":
+        print(f"📦 {_export_onnx_embeddings()}")
+        print(f"📦 {_export_onnx_generator()}")
+    elif backend == "int8":
+        _int8_embeddings()
+        _int8_generator()
+        print(f"📦 {MODEL_CACHE_DIR / 'int8'}")
+    else:
+        print("ℹ️  The torch backend needs no conversion")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert recommender models for CPU inference.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Convert and cache model artifacts")
+    exp.add_argument("--backend", choices=BACKENDS, default=configured_backend())
+    args = parser.parse_args()
+    export(args.backend)
@@ -1,44 +1,278 @@
 from pathlib import Path
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.document_loaders import TextLoader
 
+ROOT_DIR = Path(__file__).resolve().parents[3]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.recommender.ann_index import (
+    INDEX_TYPES,
+    IndexConfig,
+    load_vectorstore,
+    make_index,
+    reconstruct,
+    supports_removal,
+)
+from backend.agents.recommender.inference_backend import EMBEDDING_MODEL, load_embeddings_and_backend
+
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 DATA_DIR = Path(__file__).resolve().parents[3] / "recommender_data"
 INDEX_DIR = Path(__file__).resolve().parents[2] / "faiss_index"
+# One sub-index per topic, so topic queries only search their own chunks
+TOPIC_INDEX_DIR = INDEX_DIR / "topics"
+# Per-file and per-chunk content hashes of what is currently indexed
+MANIFEST_PATH = INDEX_DIR / "manifest.json"
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+DEFAULT_BATCH_SIZE = 64
+
+
+
+def _build_settings(config: IndexConfig, backend: str) -> dict:
+    """
+    A manifest built with different settings can't be updated in place.
+    `backend` is the inference backend that actually loaded, which differs
+    from the configured one after a fallback to torch.
+    """
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "inference_backend": backend,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "index": config.build_settings(),
+    }
+
+
+def topic_for_file(file: Path) -> str:
+    """Topic tag for a guide file: the first word of its name,
+    e.g. "transport_emissions.txt" -> "transport"."""
+    return file.stem.lower().split("_")[0]
+
+
+def _sha256(data: str | bytes) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _load_manifest(config: IndexConfig, backend: str) -> dict:
+    if not MANIFEST_PATH.exists():
+        return {}
+    manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    if manifest.get("settings") != _build_settings(config, backend):
+        return {}
+    return manifest
+
+
+def _load_store(path: Path, embeddings, config: IndexConfig):
+    if not (path / "index.faiss").exists():
+        return None
+    return load_vectorstore(path, embeddings, config, writable=True)
+
 
-def build_faiss_index():
+def _store_ids(store) -> set[str]:
+    return set(store.index_to_docstore_id.values()) if store is not None else set()
+
+
+def _split_file(file: Path, splitter) -> dict[str, object]:
+    """Chunk one file; returns {chunk_id: Document}. Chunk ids hash the file
+    name and chunk text, so identical chunks in one file collapse to one."""
+    topic = topic_for_file(file)
+    docs = TextLoader(str(file), encoding="utf-8").load()
+    for doc in docs:
+        doc.metadata["topic"] = topic
+    chunks = {}
+    for chunk in splitter.split_documents(docs):
+        chunks.setdefault(_sha256(f"{file.name}\0{chunk.page_content}"), chunk)
+    return chunks
+
+
+def _embed_in_batches(embeddings, texts: list[str], batch_size: int) -> list[list[float]]:
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        vectors.extend(embeddings.embed_documents(batch))
+        print(f"🧠 Embedded {min(start + batch_size, len(texts))}/{len(texts)} chunks")
+    return vectors
+
+
+def _apply(store, embeddings, config: IndexConfig, added: list[tuple[str, object, list[float]]], removed: list[str]):
+    """Delete `removed` ids and add (id, Document, vector) rows; builds (and
+    trains) the store on first add. Returns the (possibly new) store, or None
+    if empty."""
+    if store is not None and removed and not supports_removal(store.index):
+        # IVF/HNSW: rebuild from the vectors we keep instead of deleting
+        keep = _store_ids(store) - set(removed)
+        kept = [(cid, store.docstore.search(cid), vec) for cid, vec in _vectors_from(store, keep).items()]
+        store, removed, added = None, [], kept + added
+    if store is not None and removed:
+        store.delete(removed)
+    if added:
+        text_embeddings = [(doc.page_content, vec) for _, doc, vec in added]
+        metadatas = [doc.metadata for _, doc, _ in added]
+        ids = [cid for cid, _, _ in added]
+        if store is None:
+            vectors = np.asarray([vec for _, _, vec in added], dtype="float32")
+            index = make_index(vectors.shape[1], config, vectors)
+            store = FAISS(embeddings, index, InMemoryDocstore(), {})
+        store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    if store is not None and store.index.ntotal == 0:
+        return None
+    return store
+
+
+def _vectors_from(store, ids: set[str]) -> dict[str, list[float]]:
+    """Recover stored vectors by docstore id, so rebuilt partitions need no re-embedding."""
+    wanted = [(pos, cid) for pos, cid in store.index_to_docstore_id.items() if cid in ids]
+    vectors = reconstruct(store.index, [pos for pos, _ in wanted])
+    return {cid: vec.tolist() for (_, cid), vec in zip(wanted, vectors)}
+
+
+def _save(store, path: Path) -> None:
+    """Write to a temp folder and rename into place, so processes that have
+    the old index memory-mapped keep reading the old file untouched."""
+    tmp = path.parent / f".{path.name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    store.save_local(str(tmp))
+    path.mkdir(parents=True, exist_ok=True)
+    # index.faiss last: its mtime is what rag_query watches
+    for name in ("index.pkl", "index.faiss"):
+        os.replace(tmp / name, path / name)
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def build_faiss_index(incremental: bool = True, batch_size: int = DEFAULT_BATCH_SIZE, config: IndexConfig = None):
+    """
+    Build or update the FAISS index from DATA_DIR. The index type and its
+    build parameters come from `config` (default: SPARKSCOPE_* env vars,
+    see ann_index.py); changing them forces a full rebuild.
+
+    In incremental mode only chunks whose content hash is not already in the
+    manifest are embedded, chunks that disappeared are deleted, and the
+    existing global and per-topic indexes are updated in place. A full
+    rebuild happens when no usable manifest/index exists or `incremental`
+    is False.
+    """
     print(f"📂 Loading text files from: {DATA_DIR}")
+    # Chunks seen by any earlier build (even a --full one) skip the encoder
+    embeddings, backend = load_embeddings_and_backend(cached=True)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    config = config or IndexConfig.from_env()
+    manifest = _load_manifest(config, backend) if incremental else {}
+    store = _load_store(INDEX_DIR, embeddings, config) if manifest else None
+    old_files: dict = manifest.get("files", {})
+    old_ids = {cid for entry in old_files.values() for cid in entry["chunks"]}
+    if old_ids != _store_ids(store):
+        # Manifest and index disagree (e.g. an interrupted build): start over
+        print("♻️  No usable manifest for the current index, doing a full build")
+        store, old_files, old_ids = None, {}, set()
+    if store is None and TOPIC_INDEX_DIR.exists():
+        shutil.rmtree(TOPIC_INDEX_DIR)
 
-    documents = []
+    # 1. Hash files; only re-chunk the ones whose bytes changed
+    new_files: dict[str, dict] = {}
+    new_chunks: dict[str, object] = {}
+    for file in sorted(DATA_DIR.glob("*.txt")):
+        file_hash = _sha256(file.read_bytes())
+        previous = old_files.get(file.name)
+        topic = topic_for_file(file)
+        if previous and previous["sha256"] == file_hash and previous["topic"] == topic:
+            new_files[file.name] = previous
+            continue
+        chunks = _split_file(file, splitter)
+        new_chunks.update(chunks)
+        new_files[file.name] = {"sha256": file_hash, "topic": topic, "chunks": list(chunks)}
 
-    # 1. Load and tag each file with topic metadata
-    for file in DATA_DIR.glob("*.txt"):
-        topic = file.stem.lower()  # e.g., "electricity", "transport", etc.
-        loader = TextLoader(str(file), encoding="utf-8")
-        docs = loader.load()
-        for doc in docs:
-            doc.metadata["topic"] = topic
-        documents.extend(docs)
+    kept_ids = {cid for entry in new_files.values() for cid in entry["chunks"]}
+    removed = sorted(old_ids - kept_ids)
+    to_add = [cid for cid in new_chunks if cid not in old_ids]
+    print(f"📄 {len(new_files)} files | 🧩 {len(kept_ids)} chunks | ➕ {len(to_add)} new | ➖ {len(removed)} removed")
 
-    print(f"📄 Loaded {len(documents)} documents")
+    # 2. Embed only new chunks, in batches
+    vectors = _embed_in_batches(embeddings, [new_chunks[cid].page_content for cid in to_add], batch_size)
+    added = [(cid, new_chunks[cid], vec) for cid, vec in zip(to_add, vectors)]
 
-    # 2. Split into chunks
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_documents(documents)
-    print(f"🧩 Split into {len(chunks)} chunks")
+    # 3. Update topic partitions first; the top-level index is written after
+    #    them so its mtime marks a complete build for rag_query's reload check
+    topic_of = {
+        cid: entry["topic"]
+        for files in (old_files, new_files)
+        for entry in files.values()
+        for cid in entry["chunks"]
+    }
+    topics = {entry["topic"] for entry in new_files.values()}
+    stale_topics = {entry["topic"] for entry in old_files.values()} - topics
+    for topic in sorted(topics):
+        path = TOPIC_INDEX_DIR / topic
+        topic_ids = {cid for cid in kept_ids if topic_of[cid] == topic}
+        old_topic_ids = {cid for cid in old_ids if topic_of[cid] == topic}
+        topic_store = _load_store(path, embeddings, config)
+        t_added = [row for row in added if topic_of[row[0]] == topic]
+        t_removed = [cid for cid in removed if topic_of[cid] == topic]
+        if _store_ids(topic_store) != old_topic_ids:
+            # Missing or out of sync: rebuild the partition from stored vectors
+            existing = _vectors_from(store, topic_ids) if store is not None else {}
+            docs = {cid: store.docstore.search(cid) for cid in existing}
+            topic_store, t_removed = None, []
+            t_added = [(cid, docs[cid], vec) for cid, vec in existing.items()] + t_added
+        if not t_added and not t_removed:
+            continue
+        topic_store = _apply(topic_store, embeddings, config, t_added, t_removed)
+        if topic_store is None:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            _save(topic_store, path)
+            print(f"🏷️  Topic '{topic}': {topic_store.index.ntotal} chunks")
+    for topic in stale_topics:
+        shutil.rmtree(TOPIC_INDEX_DIR / topic, ignore_errors=True)
 
-    # 3. Embed + index
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+    # 4. Update and save the global index, then the manifest
+    if added or removed or store is None:
+        store = _apply(store, embeddings, config, added, removed)
+        if store is None:
+            print("⚠️  No chunks to index")
+            return
+        _save(store, INDEX_DIR)
+        print(f"✅ FAISS index saved to: {INDEX_DIR}")
+    else:
+        print("✅ FAISS index already up to date")
 
-    # 4. Save index
-    vectorstore.save_local(str(INDEX_DIR))
-    print(f"✅ FAISS index saved to: {INDEX_DIR}")
+    MANIFEST_PATH.write_text(
+        json.dumps({"settings": _build_settings(config, backend), "files": new_files}, indent=2),
+        encoding="utf-8",
+    )
 
 if __name__ == "__main__":
-    build_faiss_index()
+    parser = argparse.ArgumentParser(description="Build the recommender FAISS index.")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch instead of updating in place")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="Overrides SPARKSCOPE_INDEX_TYPE")
+    parser.add_argument("--nlist", type=int, help="IVF clusters (ivf_flat / ivf_pq)")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantisers (ivf_pq)")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree (hnsw)")
+    args = parser.parse_args()
+
+    overrides = {
+        key: value
+        for key, value in (("index_type", args.index_type), ("nlist", args.nlist), ("pq_m", args.pq_m), ("hnsw_m", args.hnsw_m))
+        if value is not None
+    }
+    build_faiss_index(
+        incremental=not args.full,
+        batch_size=args.batch_size,
+        config=IndexConfig.from_env(**overrides),
+    )
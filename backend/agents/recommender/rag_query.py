@@ -1,43 +1,181 @@
 from pathlib import Path
+from threading import Lock
+import os
+import re
+import sys
+import time
+
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.llms import HuggingFacePipeline
-from langchain.prompts import PromptTemplate
-from langchain.chains.question_answering import load_qa_chain
-from langchain.chains import RetrievalQA
+from backend.instrumentation import stage
 
-from transformers import pipeline
+from .batching import MicroBatcher
+from .response_cache import SemanticCache
 
-# Load FAISS vectorstore
+# The FAISS index, embeddings and flan-t5 pipeline are loaded lazily on first
+# use (or by an explicit `warm_up()`), so importing this module is cheap for
+# processes that only need the estimator or verifier.
 INDEX_DIR = Path(__file__).resolve().parents[2] / "faiss_index"
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-vectorstore = FAISS.load_local(
-    str(INDEX_DIR),
-    embeddings,
-    allow_dangerous_deserialization=True
-)
+TOPIC_INDEX_DIR = INDEX_DIR / "topics"
+_TOPIC_NAME = re.compile(r"[a-z0-9_-]+")
+# Search parameters (nprobe / efSearch) and mmap loading; None reads the
+# SPARKSCOPE_* env vars, see ann_index.py
+INDEX_CONFIG = None
+
+# Concurrent generations are grouped into one batched forward pass (see batching.py)
+LLM_MAX_BATCH = int(os.getenv("SPARKSCOPE_LLM_MAX_BATCH", "8"))
+LLM_MAX_WAIT_MS = float(os.getenv("SPARKSCOPE_LLM_MAX_WAIT_MS", "10"))
+# Give up on a generation that has not finished after this many seconds
+LLM_TIMEOUT_S = float(os.getenv("SPARKSCOPE_LLM_TIMEOUT_S", "120"))
 
-# Load local model pipeline
-local_pipeline = pipeline(
-    task="text2text-generation",
-    model="google/flan-t5-base",
-    max_length=256,
-    temperature=0.3
+# Response cache settings (see response_cache.py)
+RESPONSE_CACHE = SemanticCache(
+    max_entries=int(os.getenv("SPARKSCOPE_RAG_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("SPARKSCOPE_RAG_CACHE_TTL", "3600")),
+    similarity_threshold=float(os.getenv("SPARKSCOPE_RAG_CACHE_THRESHOLD", "0.92")),
 )
-llm = HuggingFacePipeline(pipeline=local_pipeline)
 
-def get_recommendations(user_query: str, topic: str = None) -> list:
-    retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 5}
-    )
 
-    prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template="""
+def _index_version() -> int:
+    """Modification time of the saved index; changes whenever it is rebuilt."""
+    try:
+        return (INDEX_DIR / "index.faiss").stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+class _Recommender:
+    """Holds the loaded vector store and LLM for one process."""
+
+    def __init__(self):
+        from .inference_backend import load_embeddings, load_generator
+
+        # torch / int8 / onnx, per SPARKSCOPE_INFERENCE_BACKEND; repeated
+        # queries are served from the on-disk embedding cache
+        self.embeddings = load_embeddings(cached=True)
+        self.load_index()
+
+        # Load local model pipeline
+        self.local_pipeline = load_generator()
+        self.batcher = MicroBatcher(self.generate_batch, LLM_MAX_BATCH, LLM_MAX_WAIT_MS)
+
+    def generate_batch(self, prompts: list[str]) -> list[str]:
+        """Run several prompts through flan-t5 in one batched generate."""
+        outputs = self.local_pipeline(prompts, batch_size=len(prompts))
+        # A single output per prompt may or may not come wrapped in a list
+        return [(out[0] if isinstance(out, list) else out)["generated_text"] for out in outputs]
+
+    def load_index(self) -> None:
+        """(Re)load the FAISS vectorstore from INDEX_DIR."""
+        from .ann_index import load_vectorstore
+
+        self.index_version = _index_version()
+        self.vectorstore = load_vectorstore(INDEX_DIR, self.embeddings, INDEX_CONFIG)
+        self.topic_stores = {}
+        self._topic_lock = Lock()
+        if not TOPIC_INDEX_DIR.is_dir():
+            # An index from before topic partitions: every topic query would
+            # quietly search everything
+            print(
+                f"⚠️  No topic partitions under {TOPIC_INDEX_DIR}; topic queries search the full index. "
+                "Rebuild with: python backend/agents/recommender/rag_build_index.py",
+                file=sys.stderr,
+            )
+
+    def store_for(self, topic: str = None):
+        """
+        Vectorstore to search for `topic`: its own partition when
+        rag_build_index wrote one, otherwise the full index.
+        """
+        if not topic:
+            return self.vectorstore
+        topic = topic.lower().strip()
+        store = self.topic_stores.get(topic)
+        if store is None:
+            path = TOPIC_INDEX_DIR / topic
+            # Only plain names, so a query's topic can never point outside TOPIC_INDEX_DIR
+            if not _TOPIC_NAME.fullmatch(topic) or not (path / "index.faiss").exists():
+                return self.vectorstore
+            with self._topic_lock:
+                store = self.topic_stores.get(topic)
+                if store is None:
+                    store = self._load_topic(path)
+                    self.topic_stores[topic] = store
+        return store
+
+    def _load_topic(self, path: Path):
+        from .ann_index import load_vectorstore
+
+        return load_vectorstore(path, self.embeddings, INDEX_CONFIG)
+
+
+_instance = None
+_instance_lock = Lock()
+
+
+def get_recommender() -> _Recommender:
+    """Return the process-wide recommender, loading it on first call."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = _Recommender()
+    return _instance
+
+
+def warm_up() -> None:
+    """
+    Preload the index and models before taking traffic.
+
+    To share one loaded copy across workers, call it at import time of the
+    app module under a preforking server (`gunicorn --preload -k
+    uvicorn.workers.UvicornWorker`): the master loads once and the forked
+    workers inherit the weights as copy-on-write pages. Startup hooks run
+    inside each worker after the fork, so calling it there loads one copy
+    per worker.
+    """
+    get_recommender()
+
+
+def is_loaded() -> bool:
+    return _instance is not None
+
+
+def refresh_index() -> bool:
+    """
+    Reload the vectorstore if rag_build_index has written a new index since
+    it was loaded, dropping cached responses built on the old one.
+    Returns True when a reload happened.
+    """
+    rec = get_recommender()
+    if _index_version() == rec.index_version:
+        return False
+    with _instance_lock:
+        if _index_version() == rec.index_version:
+            return False
+        rec.load_index()
+        RESPONSE_CACHE.clear()
+    return True
+
+
+def cache_stats() -> dict:
+    stats = RESPONSE_CACHE.stats()
+    if is_loaded() and hasattr(get_recommender().embeddings, "stats"):
+        stats["embeddings"] = get_recommender().embeddings.stats()
+    return stats
+
+
+def __getattr__(name):
+    # Backwards compatibility for callers that used the old module globals
+    if name in ("embeddings", "vectorstore", "local_pipeline"):
+        return getattr(get_recommender(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Prompt variants selectable per call
+PROMPTS = {
+    "tips": """
 You are a sustainability expert. Based on the following context, give 3 clear and actionable tips to reduce emissions.
 
 Context:
@@ -49,17 +187,65 @@ Tips:
 - 
 - 
 - 
-"""
-    )
+""",
+}
+
+DEFAULT_K = 5
+DEFAULT_PROMPT = "tips"
+
+
+def get_recommendations(
+    user_query: str,
+    topic: str = None,
+    k: int = DEFAULT_K,
+    prompt_variant: str = DEFAULT_PROMPT,
+    timings: dict = None,
+) -> list:
+    """
+    Return up to 3 tips for `user_query`, served from RESPONSE_CACHE when the
+    same or a semantically similar query was answered recently. When `topic`
+    is given, only that topic's chunks are searched.
+
+    Pass a dict as `timings` to get the cache outcome (`cache`), the
+    embedding and retrieval time (`setup_ms`) and generation time (`run_ms`).
+    """
+    t0 = time.perf_counter()
+    refresh_index()
+    topic = topic.lower().strip() if topic else None
+    scope = (topic, k, prompt_variant)
+
+    cached = RESPONSE_CACHE.get_exact(user_query, scope)
+    if cached is not None:
+        if timings is not None:
+            timings.update(cache="exact", setup_ms=(time.perf_counter() - t0) * 1000, run_ms=0.0)
+        return cached
+
+    # Embed once: the vector serves both the similarity lookup and retrieval
+    rec = get_recommender()
+    with stage("recommender.embed"):
+        query_vector = rec.embeddings.embed_query(user_query)
+    cached = RESPONSE_CACHE.get_similar(query_vector, scope)
+    if cached is not None:
+        if timings is not None:
+            timings.update(cache="semantic", setup_ms=(time.perf_counter() - t0) * 1000, run_ms=0.0)
+        return cached
 
-    qa_chain = load_qa_chain(llm, chain_type="stuff", prompt=prompt)
+    if prompt_variant not in PROMPTS:
+        raise ValueError(f"Unknown prompt variant '{prompt_variant}'. Available: {list(PROMPTS)}")
+    with stage("recommender.retrieve"):
+        docs = rec.store_for(topic).similarity_search_by_vector(query_vector, k=k)
+    # "Stuff" the retrieved chunks into the prompt and generate through the micro-batcher
+    context = "\n\n".join(doc.page_content for doc in docs)
+    prompt = PROMPTS[prompt_variant].format(context=context, question=user_query)
+    t1 = time.perf_counter()
+    with stage("recommender.generate"):
+        response = rec.batcher(prompt, timeout=LLM_TIMEOUT_S)
+    t2 = time.perf_counter()
 
-    chain = RetrievalQA(
-        retriever=retriever,
-        combine_documents_chain=qa_chain,
-        return_source_documents=False
-    )
+    if timings is not None:
+        timings.update(cache="miss", setup_ms=(t1 - t0) * 1000, run_ms=(t2 - t1) * 1000)
 
-    response = chain.run({"query": user_query})
     suggestions = [s.strip("-• ") for s in response.strip().split("\n") if s.strip()]
-    return suggestions[:3]
\ No newline at end of file
+    suggestions = suggestions[:3]
+    RESPONSE_CACHE.put(user_query, query_vector, suggestions, scope)
+    return suggestions
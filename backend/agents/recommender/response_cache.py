@@ -0,0 +1,111 @@
+# backend/agents/recommender/response_cache.py
+"""
+Response cache for the RAG recommender.
+
+Lookups try an exact match on the normalised query first, then fall back to
+cosine similarity against the query embeddings of cached entries. Entries are
+evicted least-recently-used once `max_entries` is reached, and expire after
+`ttl_seconds`. `clear()` is called by rag_query whenever the FAISS index on
+disk changes.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Hashable, Optional, Sequence
+import time
+
+import numpy as np
+
+
+@dataclass
+class _Entry:
+    scope: Hashable
+    vector: np.ndarray      # unit-normalised query embedding
+    value: list
+    created: float
+
+
+def normalise_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SemanticCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.92):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created > self.ttl_seconds
+
+    def get_exact(self, query: str, scope: Hashable = None) -> Optional[list]:
+        """Return the cached value for this exact (normalised) query, if any."""
+        key = (scope, normalise_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.monotonic()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return list(entry.value)
+
+    def get_similar(self, vector: Sequence[float], scope: Hashable = None) -> Optional[list]:
+        """
+        Return the value of the most similar cached query in `scope` if its
+        cosine similarity reaches the threshold. Counts a miss otherwise.
+        """
+        q = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                del self._entries[key]
+
+            candidates = [(k, e) for k, e in self._entries.items() if e.scope == scope]
+            if candidates:
+                sims = np.stack([e.vector for _, e in candidates]) @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.similarity_threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return list(entry.value)
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector: Sequence[float], value: list, scope: Hashable = None) -> None:
+        key = (scope, normalise_query(query))
+        with self._lock:
+            self._entries[key] = _Entry(scope, _unit(vector), list(value), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
@@ -1,9 +1,197 @@
 # backend/agents/verification/badge_logic.py
+"""
+Supplier emission badges.
+
+    get_supplier_badge   one supplier, fixed thresholds (500 / 1000 kg CO2e)
+    assign_badges        many suppliers, fixed thresholds, one searchsorted
+    percentile_badges    tiers relative to the population (optionally per
+                         sector), from exact quantiles of the given totals
+    PercentileTiers      the same tiers from running quantile sketches, so a
+                         growing population never has to be re-sorted
+
+Lower emissions earn the better badge. A missing (NaN) total earns the
+worst one, and tiers fall back to CUT_POINTS while a population is empty.
+"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Optional, Sequence
+import math
+
+import numpy as np
+
+BADGES = ("🥇 Gold", "🥈 Silver", "🟤 Bronze")
+
+# Upper bounds (inclusive) of the Gold and Silver tiers
+CUT_POINTS = (500.0, 1000.0)
+
+# Population fractions separating Gold / Silver / Bronze
+PERCENTILE_TIERS = (1 / 3, 2 / 3)
+
 
 def get_supplier_badge(total_emissions: float) -> str:
-    if total_emissions > 1000:
-        return "🟤 Bronze"
-    elif total_emissions > 500:
-        return "🥈 Silver"
-    else:
-        return "🥇 Gold"
+    """Badge for one total; a NaN (unknown) total gets the lowest badge, as in assign_badges."""
+    if math.isnan(total_emissions):
+        return BADGES[-1]
+    return BADGES[bisect_left(CUT_POINTS, total_emissions)]
+
+
+def _tier_labels(tiers: np.ndarray, labels: Sequence[str]) -> np.ndarray:
+    return np.asarray(labels, dtype=object)[tiers]
+
+
+def assign_badges(totals, cut_points: Sequence[float] = CUT_POINTS, labels: Sequence[str] = BADGES) -> np.ndarray:
+    """Badge for every total; `cut_points` must be sorted ascending."""
+    totals = np.asarray(totals, dtype="float64")
+    return _tier_labels(np.searchsorted(cut_points, totals, side="left"), labels)
+
+
+def _by_sector(totals: np.ndarray, sectors: Optional[Sequence]):
+    """Yield (sector, row indices) groups; a single group when sectors is None."""
+    if sectors is None:
+        yield None, np.arange(totals.size)
+        return
+    names, inverse = np.unique(np.asarray(sectors, dtype=object).astype(str), return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(names.size + 1))
+    for i, name in enumerate(names):
+        yield name, order[bounds[i]:bounds[i + 1]]
+
+
+def percentile_badges(
+    totals,
+    sectors: Optional[Sequence] = None,
+    tiers: Sequence[float] = PERCENTILE_TIERS,
+    labels: Sequence[str] = BADGES,
+) -> np.ndarray:
+    """
+    Badges from each supplier's position within its sector (or the whole
+    population when `sectors` is None): totals up to the first tier quantile
+    are Gold, up to the second Silver, the rest Bronze.
+    """
+    totals = np.asarray(totals, dtype="float64")
+    tier_idx = np.empty(totals.size, dtype=np.int64)
+    for _, rows in _by_sector(totals, sectors):
+        known = totals[rows][~np.isnan(totals[rows])]
+        cuts = np.quantile(known, tiers) if known.size else np.asarray(CUT_POINTS)
+        tier_idx[rows] = np.searchsorted(cuts, totals[rows], side="left")
+    return _tier_labels(tier_idx, labels)
+
+
+class QuantileSketch:
+    """
+    Mergeable log-bucketed quantile sketch (DDSketch-style). Every quantile
+    it returns is within relative error `alpha` of the exact one, memory
+    grows with the log of the value range, and adding values never re-sorts.
+    Values <= 0 are counted in a single zero bucket.
+    """
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._offset = 0  # bucket key of _counts[0]
+        self.zero_count = 0
+        self.count = 0
+
+    def _grow(self, lo: int, hi: int) -> None:
+        if not self._counts.size:
+            self._offset, self._counts = lo, np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo = min(lo, self._offset)
+        new_hi = max(hi, self._offset + self._counts.size - 1)
+        if new_lo == self._offset and new_hi - new_lo + 1 == self._counts.size:
+            return
+        counts = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+        start = self._offset - new_lo
+        counts[start:start + self._counts.size] = self._counts
+        self._offset, self._counts = new_lo, counts
+
+    def add(self, values) -> None:
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.count += values.size
+        self.zero_count += values.size - positive.size
+        if not positive.size:
+            return
+        keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+        self._grow(int(keys.min()), int(keys.max()))
+        self._counts += np.bincount(keys - self._offset, minlength=self._counts.size)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        if other._counts.size:
+            self._grow(other._offset, other._offset + other._counts.size - 1)
+            start = other._offset - self._offset
+            self._counts[start:start + other._counts.size] += other._counts
+        self.count += other.count
+        self.zero_count += other.zero_count
+
+    def quantiles(self, qs) -> np.ndarray:
+        if not self.count:
+            raise ValueError("Quantiles of an empty sketch")
+        ranks = np.asarray(qs, dtype="float64") * (self.count - 1)
+        cumulative = np.cumsum(self._counts) + self.zero_count
+        bucket = np.minimum(np.searchsorted(cumulative, ranks, side="right"), max(self._counts.size - 1, 0))
+        estimates = 2 * self.gamma ** (bucket + self._offset) / (self.gamma + 1)
+        return np.where(ranks < self.zero_count, 0.0, estimates)
+
+
+class PercentileTiers:
+    """
+    Percentile badges over a population that grows over time. `update` folds
+    new totals into one sketch per sector plus a population-wide sketch;
+    `assign` badges totals against the current cut-points, using the
+    population-wide ones for sectors not seen yet and `fallback` while the
+    population is empty.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[float] = PERCENTILE_TIERS,
+        labels: Sequence[str] = BADGES,
+        alpha: float = 0.01,
+        fallback: Sequence[float] = CUT_POINTS,
+    ):
+        self.tiers = tuple(tiers)
+        self.labels = tuple(labels)
+        self.fallback = np.asarray(fallback, dtype="float64")
+        self.alpha = alpha
+        self._overall = QuantileSketch(alpha)
+        self._sectors: dict[str, QuantileSketch] = {}
+        self._lock = Lock()
+
+    def update(self, totals, sectors: Optional[Sequence] = None) -> None:
+        """Add totals; a None sector counts towards the population only."""
+        totals = np.asarray(totals, dtype="float64")
+        with self._lock:
+            self._overall.add(totals)
+            if sectors is None:
+                return
+            sectors = np.asarray(sectors, dtype=object)
+            known = np.array([sector is not None for sector in sectors], dtype=bool)
+            for sector, rows in _by_sector(totals[known], sectors[known]):
+                self._sectors.setdefault(sector, QuantileSketch(self.alpha)).add(totals[known][rows])
+
+    def cut_points(self, sector: Optional[str] = None) -> np.ndarray:
+        with self._lock:
+            sketch = self._sectors.get(sector, self._overall) if sector is not None else self._overall
+            if not sketch.count:
+                return self.fallback
+            return sketch.quantiles(self.tiers)
+
+    def assign(self, totals, sectors: Optional[Sequence] = None) -> np.ndarray:
+        totals = np.asarray(totals, dtype="float64")
+        tier_idx = np.empty(totals.size, dtype=np.int64)
+        for sector, rows in _by_sector(totals, sectors):
+            tier_idx[rows] = np.searchsorted(self.cut_points(sector), totals[rows], side="left")
+        return _tier_labels(tier_idx, self.labels)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "suppliers": self._overall.count,
+                "sectors": {name: sketch.count for name, sketch in self._sectors.items()},
+            }
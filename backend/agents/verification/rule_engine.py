@@ -0,0 +1,199 @@
+# backend/agents/verification/rule_engine.py
+"""
+Column-wise verification of activity data.
+
+Rules are read once from RULES_PATH (JSON; override the path with
+SPARKSCOPE_VERIFICATION_RULES):
+
+    activities  label and min / max bounds per activity key
+    sectors     per-sector upper limits, checked when rows carry a sector
+    outliers    z-score threshold against each supplier's own history
+
+Each rule is one NumPy comparison over a whole column. Results come back as
+Findings, parallel arrays of (row, activity, code, value, detail), where
+`detail` is the limit that was crossed (or the z-score for OUTLIER).
+`render` turns a finding into the message verify_payload has always shown.
+"""
+from pathlib import Path
+from typing import Mapping, NamedTuple, Optional, Sequence
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = Path(os.getenv(
+    "SPARKSCOPE_VERIFICATION_RULES",
+    Path(__file__).resolve().parents[2] / "data" / "verification_rules.json",
+))
+
+# code -> (severity, message template)
+CODES = {
+    "NEGATIVE": ("error", "❌ {label} cannot be negative."),
+    "ZERO": ("warning", "⚠️ {label} is zero — is that intended?"),
+    "BELOW_MIN": ("warning", "⚠️ {label} seems unusually low ({value})."),
+    "ABOVE_MAX": ("warning", "⚠️ {label} seems unusually high ({value})."),
+    "SECTOR_LIMIT": ("warning", "⚠️ {label} is above the sector limit of {detail:g} ({value})."),
+    "OUTLIER": ("warning", "⚠️ {label} is far outside this supplier's history (z = {detail:.1f})."),
+}
+
+
+class ActivityRule(NamedTuple):
+    label: str
+    min: float
+    max: float
+
+
+class RuleSet(NamedTuple):
+    activities: dict[str, ActivityRule]
+    sectors: dict[str, dict[str, float]]
+    z_threshold: float
+    min_history: int
+
+
+class Findings(NamedTuple):
+    row: np.ndarray       # int64 row index into the evaluated batch
+    activity: np.ndarray  # object: activity key
+    code: np.ndarray      # object: key of CODES
+    value: np.ndarray     # float64: offending value
+    detail: np.ndarray    # float64: limit crossed, or z-score
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self._asdict())
+        frame["severity"] = frame["code"].map({code: sev for code, (sev, _) in CODES.items()})
+        return frame
+
+
+def load_rules(path: Path = RULES_PATH) -> RuleSet:
+    config = json.loads(Path(path).read_text(encoding="utf-8"))
+    outliers = config.get("outliers", {})
+    return RuleSet(
+        activities={
+            key: ActivityRule(rule["label"], float(rule.get("min", 0)), float(rule.get("max", np.inf)))
+            for key, rule in config["activities"].items()
+        },
+        sectors={name: {k: float(v) for k, v in limits.items()} for name, limits in config.get("sectors", {}).items()},
+        z_threshold=float(outliers.get("z_threshold", 3.0)),
+        min_history=int(outliers.get("min_history", 4)),
+    )
+
+
+RULES = load_rules()
+
+
+def history_stats(history: pd.DataFrame, rules: RuleSet = None) -> pd.DataFrame:
+    """
+    Per-supplier mean / std / count of each activity from past rows
+    (a `supplier_id` column plus activity columns), indexed by supplier_id.
+    """
+    rules = rules or RULES
+    keys = [k for k in rules.activities if k in history.columns]
+    return history.groupby("supplier_id")[keys].agg(["mean", "std", "count"])
+
+
+def render(code: str, label: str, value, detail: float = float("nan")) -> str:
+    return CODES[code][1].format(label=label, value=value, detail=detail)
+
+
+def evaluate(
+    columns: Mapping[str, Sequence],
+    sectors: Optional[Sequence] = None,
+    supplier_ids: Optional[Sequence] = None,
+    history: Optional[pd.DataFrame] = None,
+    rules: RuleSet = None,
+) -> Findings:
+    """
+    Check every row of a columnar batch, e.g.
+        {"electricity_kwh": [5000, -1], "road_freight_tkm": [0, None]}
+    Missing cells (None / NaN) are skipped. `sectors` enables the sector
+    limits; `supplier_ids` plus `history` (from history_stats) enable the
+    z-score outlier rule. Findings are ordered by row, then rule.
+    """
+    rules = rules or RULES
+    parts = []
+
+    def add(key, code, mask, values, detail):
+        rows = np.flatnonzero(mask)
+        if rows.size:
+            detail = np.broadcast_to(np.asarray(detail, dtype="float64"), values.shape)
+            parts.append((rows, key, code, values[rows], detail[rows]))
+
+    if sectors is not None:
+        sector_names, sector_idx = np.unique(np.asarray(sectors, dtype=object).astype(str), return_inverse=True)
+    use_history = supplier_ids is not None and history is not None and len(history) > 0
+    if use_history:
+        supplier_pos = history.index.get_indexer(pd.Index(supplier_ids))
+        known = supplier_pos >= 0
+
+    for key, rule in rules.activities.items():
+        if key not in columns:
+            continue
+        values = np.asarray(columns[key], dtype="float64")
+
+        add(key, "NEGATIVE", values < 0, values, 0.0)
+        add(key, "ZERO", values == 0, values, 0.0)
+        if rule.min > 0:
+            add(key, "BELOW_MIN", (values > 0) & (values < rule.min), values, rule.min)
+        add(key, "ABOVE_MAX", values > rule.max, values, rule.max)
+
+        if sectors is not None:
+            limits = np.array([rules.sectors.get(s, {}).get(key, np.nan) for s in sector_names])[sector_idx]
+            add(key, "SECTOR_LIMIT", values > limits, values, limits)
+
+        if use_history and key in history.columns.get_level_values(0):
+            stats = history[key].to_numpy()[supplier_pos]  # mean, std, count per row
+            stats[~known] = np.nan
+            mean, std, count = stats[:, 0].astype("float64"), stats[:, 1].astype("float64"), stats[:, 2]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = (values - mean) / std
+            mask = (count >= rules.min_history) & (std > 0) & (np.abs(z) > rules.z_threshold)
+            add(key, "OUTLIER", mask, values, z)
+
+    if not parts:
+        empty = np.array([], dtype=object)
+        return Findings(np.array([], dtype=np.int64), empty, empty, np.array([]), np.array([]))
+
+    rows = np.concatenate([p[0] for p in parts])
+    order = np.argsort(rows, kind="stable")
+    return Findings(
+        row=rows[order],
+        activity=np.concatenate([np.full(p[0].size, p[1], dtype=object) for p in parts])[order],
+        code=np.concatenate([np.full(p[0].size, p[2], dtype=object) for p in parts])[order],
+        value=np.concatenate([p[3] for p in parts])[order],
+        detail=np.concatenate([p[4] for p in parts])[order],
+    )
+
+
+def verify_frame(frame: pd.DataFrame, history: Optional[pd.DataFrame] = None, rules: RuleSet = None) -> pd.DataFrame:
+    """
+    Verify a wide DataFrame (one row per supplier period, one column per
+    activity, optional `sector` / `supplier_id` columns). `history` holds
+    past rows in the same layout. Returns one row per finding.
+    """
+    rules = rules or RULES
+    findings = evaluate(
+        {k: frame[k].to_numpy() for k in rules.activities if k in frame.columns},
+        sectors=frame["sector"].to_numpy() if "sector" in frame.columns else None,
+        supplier_ids=frame["supplier_id"].to_numpy() if "supplier_id" in frame.columns else None,
+        history=history_stats(history, rules) if history is not None else None,
+        rules=rules,
+    )
+    return findings.to_frame()
+
+
+def verify_rows(payloads: Sequence[dict], rules: RuleSet = None) -> list[list[str]]:
+    """Human-readable warnings per payload, in each payload's key order."""
+    rules = rules or RULES
+    columns = {
+        key: [p.get(key) for p in payloads]
+        for key in rules.activities
+        if any(key in p for p in payloads)
+    }
+    findings = evaluate(columns, rules=rules)
+
+    messages: list[list[tuple[int, str]]] = [[] for _ in payloads]
+    for row, key, code, detail in zip(findings.row, findings.activity, findings.code, findings.detail):
+        payload = payloads[row]
+        position = list(payload).index(key)
+        messages[row].append((position, render(code, rules.activities[key].label, payload[key], detail)))
+    return [[msg for _, msg in sorted(row, key=lambda m: m[0])] for row in messages]
@@ -0,0 +1,125 @@
+# backend/api/concurrency.py
+"""
+Bounded worker pools for the API's CPU-heavy work.
+
+Each pool caps both how many jobs run at once (`workers`) and how many may
+wait for a worker (`max_pending`). When a pool is full, `run` raises
+PoolSaturated, which the API turns into a 429 so clients back off instead of
+piling up behind a blocked event loop.
+
+    estimate   thread pool   estimator / extractor (NumPy releases the GIL)
+    pdf        process pool  PyMuPDF text extraction
+    recommend  thread pool   RAG retrieval + flan-t5 generation; threads share
+                             the one loaded model and feed its micro-batcher,
+                             so size it to at least SPARKSCOPE_LLM_MAX_BATCH
+
+Sizes come from SPARKSCOPE_<POOL>_WORKERS and SPARKSCOPE_<POOL>_MAX_PENDING.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import asyncio
+import os
+
+
+class PoolSaturated(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+class BoundedPool:
+    def __init__(self, name: str, workers: int, max_pending: int, processes: bool = False):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.processes = processes
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._slot_freed: asyncio.Condition | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            cls = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = cls(max_workers=self.workers)
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, fn, *args, block: bool = False, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on the pool. Raises PoolSaturated when the
+        pool is full, unless `block` is set (used mid-stream, where a 429 can
+        no longer be sent), in which case it waits for a free slot.
+        """
+        limit = self.workers + self.max_pending
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        if self._in_flight >= limit:
+            if not block:
+                raise PoolSaturated(f"'{self.name}' pool is saturated ({self._in_flight} jobs)")
+            async with self._slot_freed:
+                await self._slot_freed.wait_for(lambda: self._in_flight < limit)
+                self._in_flight += 1
+        else:
+            self._in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            await self._release()
+            raise
+        # Free the slot when the job ends, not when the caller stops waiting:
+        # a cancelled await leaves an already running job on the executor
+        future.add_done_callback(lambda _: self._release_from(loop))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release_from(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Done-callback; runs on the executor's thread."""
+        try:
+            asyncio.run_coroutine_threadsafe(self._release(), loop)
+        except RuntimeError:
+            # The loop is gone, so nobody can be waiting for the slot
+            self._in_flight -= 1
+
+    async def _release(self) -> None:
+        self._in_flight -= 1
+        async with self._slot_freed:
+            self._slot_freed.notify()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _make_pool(name: str, workers: int, max_pending: int, processes: bool = False) -> BoundedPool:
+    key = name.upper()
+    return BoundedPool(
+        name,
+        workers=_env_int(f"SPARKSCOPE_{key}_WORKERS", workers),
+        max_pending=_env_int(f"SPARKSCOPE_{key}_MAX_PENDING", max_pending),
+        processes=processes,
+    )
+
+
+_CPUS = os.cpu_count() or 1
+
+POOLS = {
+    "estimate": _make_pool("estimate", workers=min(8, _CPUS), max_pending=256),
+    "pdf": _make_pool("pdf", workers=max(1, _CPUS - 1), max_pending=32, processes=True),
+    "recommend": _make_pool("recommend", workers=8, max_pending=32),
+}
+
+# Request-level cap across all endpoints (checked by the API middleware)
+MAX_CONCURRENT_REQUESTS = _env_int("SPARKSCOPE_MAX_CONCURRENT_REQUESTS", 512)
+
+
+def shutdown_pools() -> None:
+    for pool in POOLS.values():
+        pool.shutdown()
@@ -6,29 +6,384 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import threading
+import time
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional, Union
 
 # Import your estimator
-from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.agents.estimator.emission_estimator import estimate_emissions, estimate_emissions_batch
+from backend.agents.estimator.emission_store import DIMENSIONS, EstimateRecord, get_store
+from backend.agents.estimator.factor_sets import FactorEngine
+from backend.agents.estimator.stream_estimator import (
+    DEFAULT_CHUNK_SIZE,
+    FORMATS,
+    RowChunker,
+    estimate_chunk,
+    to_ndjson,
+)
+from backend.agents.document_ingestion.activity_extractor import extract_activities
+from backend.agents.document_ingestion.extract_text import extract_text_from_pdf_bytes
+from backend.agents.verification.badge_logic import PercentileTiers, assign_badges, percentile_badges
+from backend.agents.pipeline import PIPELINE_METRICS
+from backend.api.concurrency import MAX_CONCURRENT_REQUESTS, POOLS, PoolSaturated, shutdown_pools
+from backend.instrumentation import STAGE_SECONDS, LatencyHistogram, SamplingProfiler, write_folded
 
 app = FastAPI(title="SparkScope API", version="0.1")
 
+# Set SPARKSCOPE_WARM_RECOMMENDER=1 to load the RAG index and models while
+# this module is imported instead of on the first recommendation call. Under
+# `gunicorn --preload` the import happens once in the master before it forks,
+# so every worker shares the weights copy-on-write; a plain uvicorn process
+# simply loads them before serving. (Startup events run in each forked worker,
+# so warming there would load one copy per worker.)
+WARM_RECOMMENDER = os.getenv("SPARKSCOPE_WARM_RECOMMENDER", "0") == "1"
+if WARM_RECOMMENDER:
+    from backend.agents.recommender.rag_query import warm_up
+    warm_up()
+
+@app.on_event("shutdown")
+def stop_pools():
+    shutdown_pools()
+
+# ---------- Backpressure ----------
+def _busy(detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=429, headers={"Retry-After": "1"})
+
+class ConcurrencyLimit:
+    """
+    Plain ASGI middleware, so a request holds its slot until the whole
+    response has been sent, streamed bodies (/api/estimate/stream) included.
+    """
+
+    def __init__(self, app, limit: int = MAX_CONCURRENT_REQUESTS):
+        self.app = app
+        self.limit = limit
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.active >= self.limit:
+            return await _busy("Too many concurrent requests, retry later")(scope, receive, send)
+        self.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active -= 1
+
+app.add_middleware(ConcurrencyLimit)
+
+# ---------- Instrumentation ----------
+HTTP_SECONDS = LatencyHistogram("sparkscope_http_request_seconds", "API latency per endpoint.", "endpoint")
+
+# Opt-in: profile every request and keep a folded-stack profile (flamegraph.pl /
+# speedscope input) for those slower than SPARKSCOPE_PROFILE_SLOW_MS
+PROFILE_SLOW_MS = float(os.getenv("SPARKSCOPE_PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("SPARKSCOPE_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("SPARKSCOPE_PROFILE_DIR", ROOT_DIR / "backend" / "profiles"))
+PROFILER = SamplingProfiler(PROFILE_INTERVAL_MS / 1000)
+
+# Registered after ConcurrencyLimit, so it wraps it and also times 429s.
+# For streaming responses this measures time to the first byte.
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    profiler = PROFILER.record() if PROFILE_SLOW_MS > 0 else None
+    t0 = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - t0
+        route = request.scope.get("route")
+        endpoint = f"{request.method} {route.path if route else 'unmatched'}"
+        HTTP_SECONDS.observe(endpoint, elapsed)
+        if profiler is not None:
+            samples = profiler.stop()
+            if elapsed * 1000 >= PROFILE_SLOW_MS and samples:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}_{endpoint.replace(' ', '_').replace('/', '-')}_{elapsed * 1000:.0f}ms.folded"
+                await asyncio.to_thread(write_folded, samples, PROFILE_DIR / name)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated(request: Request, exc: PoolSaturated):
+    return _busy(str(exc))
+
+async def _offload(pool: str, fn, *args, status_code: int = 400):
+    """Run blocking work on a bounded pool, mapping failures to HTTP errors."""
+    try:
+        return await POOLS[pool].run(fn, *args)
+    except PoolSaturated:
+        raise
+    except TimeoutError as e:
+        # e.g. the LLM micro-batcher gave up waiting for generation
+        raise HTTPException(status_code=504, detail=str(e) or f"Timed out waiting for the '{pool}' job")
+    except Exception as e:
+        raise HTTPException(status_code=status_code, detail=str(e))
+
 # Define the expected request schema
 class EmissionPayload(BaseModel):
     activities: Dict[str, float]  # example: {"electricity_kwh": 5000, "road_freight_tkm": 6240}
+    supplier_id: Optional[str] = None
+    month: Optional[str] = None  # "YYYY-MM" reporting month when stored; defaults to now
+    region: Optional[str] = None  # e.g. "GB"; picks a regional factor set (factor_sets.py)
+    date: Optional[Union[int, str]] = None  # activity date or year; picks the region's factor vintage
+    sector: Optional[str] = None  # stored with the supplier for population badges
+
+# Columnar batch: one list per activity key, aligned by supplier position
+class ColumnarEmissionBatch(BaseModel):
+    activities: Dict[str, List[Optional[float]]]  # example: {"electricity_kwh": [5000, 1200]}
+    supplier_ids: Optional[List[str]] = None
+    month: Optional[str] = None
+    regions: Optional[List[Optional[str]]] = None
+    dates: Optional[List[Optional[Union[int, str]]]] = None
+    sectors: Optional[List[Optional[str]]] = None
+
+# Free text (chat message, invoice text) to extract activities from
+class ExtractionRequest(BaseModel):
+    text: str
+
+class RecommendationRequest(BaseModel):
+    query: str
+    topic: Optional[str] = None
+
+# Bulk badges for a supplier population
+class BadgeRequest(BaseModel):
+    totals: List[float]  # kg CO2e per supplier
+    sectors: Optional[List[str]] = None
+    mode: str = "fixed"  # fixed | percentile | population
+
+BADGE_MODES = ("fixed", "percentile", "population")
+
+# Per-sector quantile sketches over every supplier in the emission store
+# (used by mode="population"). Rebuilt from the rollups at most every
+# SPARKSCOPE_TIERS_REFRESH_S seconds, so all workers see the same population.
+TIERS_REFRESH_S = float(os.getenv("SPARKSCOPE_TIERS_REFRESH_S", "30"))
+_supplier_tiers: Optional[PercentileTiers] = None
+_supplier_tiers_at = 0.0
+_supplier_tiers_lock = threading.Lock()
+
+def supplier_tiers() -> PercentileTiers:
+    global _supplier_tiers, _supplier_tiers_at
+    with _supplier_tiers_lock:
+        if _supplier_tiers is None or time.monotonic() - _supplier_tiers_at > TIERS_REFRESH_S:
+            tiers = PercentileTiers()
+            tiers.update(*get_store().supplier_totals())
+            _supplier_tiers, _supplier_tiers_at = tiers, time.monotonic()
+        return _supplier_tiers
 
 # Define the root route
 @app.get("/")
 def root():
     return {"message": "SparkScope API is alive 🚀"}
 
-# Define the emissions endpoint
+# Prometheus text: endpoint and stage latency histograms, pipeline stages, pool load
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    pools = [
+        "# HELP sparkscope_pool_in_flight Jobs running or queued per worker pool.",
+        "# TYPE sparkscope_pool_in_flight gauge",
+    ] + [f'sparkscope_pool_in_flight{{pool="{name}"}} {pool.in_flight}' for name, pool in POOLS.items()]
+    return HTTP_SECONDS.render() + STAGE_SECONDS.render() + PIPELINE_METRICS.render() + "\n".join(pools) + "\n"
+
+def _check_dates(regions, dates) -> None:
+    undated = FactorEngine.undated_rows(regions, dates)
+    if undated.size:
+        raise ValueError(f"A date needs a region to pick a factor vintage (rows {undated.tolist()[:10]})")
+    unparseable = FactorEngine.unparseable_dates(dates)
+    if unparseable.size:
+        raise ValueError(
+            f"Unrecognised date; use a year, YYYY-MM or YYYY-MM-DD (rows {unparseable.tolist()[:10]})"
+        )
+
+def _estimate_one(payload: EmissionPayload, store: bool) -> dict:
+    _check_dates([payload.region], [payload.date])
+    results = estimate_emissions(payload.activities, payload.region, payload.date)
+    if store:
+        get_store().record([EstimateRecord(payload.supplier_id, results, payload.activities, payload.month, payload.sector)])
+    return results
+
+# Define the emissions endpoint; ?store=true also records it for the rollups
 @app.post("/api/estimate")
-def estimate(payload: EmissionPayload):
-    try:
-        results = estimate_emissions(payload.activities)
-        return {"status": "success", "emissions": results}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def estimate(payload: EmissionPayload, store: bool = Query(False)):
+    results = await _offload("estimate", _estimate_one, payload, store)
+    return {"status": "success", "emissions": results}
+
+# Activity extraction endpoint, same rules as the chat and PDF paths
+@app.post("/api/extract")
+async def extract(request: ExtractionRequest):
+    activities = await _offload("estimate", extract_activities, request.text)
+    return {"status": "success", "activities": activities}
+
+# PDF extraction: POST the raw PDF bytes (Content-Type: application/pdf)
+@app.post("/api/extract/pdf")
+async def extract_pdf(request: Request):
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty request body; send the PDF bytes")
+    text = await _offload("pdf", extract_text_from_pdf_bytes, data)
+    activities = await _offload("estimate", extract_activities, text)
+    return {"status": "success", "text": text, "activities": activities}
+
+# RAG recommendations; generation runs on the bounded recommend pool
+@app.post("/api/recommend")
+async def recommend(request: RecommendationRequest):
+    from backend.agents.recommender.rag_query import get_recommendations
+
+    tips = await _offload("recommend", get_recommendations, request.query, request.topic, status_code=500)
+    return {"status": "success", "recommendations": tips}
+
+
+def _estimate_batch(batch: Union[List[EmissionPayload], ColumnarEmissionBatch], store: bool = False) -> dict:
+    if isinstance(batch, ColumnarEmissionBatch):
+        lengths = {len(col) for col in batch.activities.values()}
+        if len(lengths) > 1:
+            raise ValueError("All activity columns must have the same length")
+        _check_dates(batch.regions, batch.dates)
+        results = estimate_emissions_batch(batch.activities, batch.regions, batch.dates)
+        supplier_ids = batch.supplier_ids or [None] * len(results)
+        if len(supplier_ids) != len(results):
+            raise ValueError("supplier_ids must have one entry per row")
+        months = [batch.month] * len(results)
+        payloads = [None] * len(results)
+        sectors = batch.sectors or [None] * len(results)
+        if len(sectors) != len(results):
+            raise ValueError("sectors must have one entry per row")
+    else:
+        # Only rows with a region or date need the factor-set engine
+        regional = any(p.region or p.date is not None for p in batch)
+        _check_dates([p.region for p in batch], [p.date for p in batch])
+        results = estimate_emissions_batch(
+            [p.activities for p in batch],
+            [p.region for p in batch] if regional else None,
+            [p.date for p in batch] if regional else None,
+        )
+        supplier_ids = [p.supplier_id for p in batch]
+        months = [p.month for p in batch]
+        payloads = [p.activities for p in batch]
+        sectors = [p.sector for p in batch]
+
+    if store:
+        get_store().record(
+            EstimateRecord(*row) for row in zip(supplier_ids, results, payloads, months, sectors)
+        )
+
+    totals = [emissions["total"] for emissions in results]
+    suppliers = [
+        {
+            "supplier_id": supplier_id,
+            "emissions": emissions,
+            "badge": badge,
+        }
+        for supplier_id, emissions, badge in zip(supplier_ids, results, assign_badges(totals))
+    ]
+    return {"status": "success", "count": len(suppliers), "suppliers": suppliers}
+
+# Batch emissions endpoint: a JSON array of payloads or one columnar object
+@app.post("/api/estimate/batch")
+async def estimate_batch(batch: Union[List[EmissionPayload], ColumnarEmissionBatch], store: bool = Query(False)):
+    return await _offload("estimate", _estimate_batch, batch, store)
+
+# ---------- Portfolio rollups (estimates recorded with ?store=true) ----------
+
+# kg CO2e per supplier / category / activity / total, or the monthly series
+# (by=month); for one month, a month range, or all time
+@app.get("/api/rollups/totals")
+async def rollup_totals(
+    by: str = Query("total"),
+    key: Optional[str] = None,
+    month: Optional[str] = None,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+):
+    rows = await _offload("estimate", get_store().totals, by, key, month, month_from, month_to)
+    return {"status": "success", "by": by, "totals": rows}
+
+# Top-N emitters along one dimension
+@app.get("/api/rollups/top")
+async def rollup_top(by: str = Query("supplier"), n: int = Query(10, ge=1, le=1000), month: Optional[str] = None):
+    if by not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown dimension '{by}'. Use one of {DIMENSIONS}")
+    rows = await _offload("estimate", get_store().top, by, n, month)
+    return {"status": "success", "by": by, "top": rows}
+
+
+def _badges(request: BadgeRequest) -> dict:
+    if request.sectors is not None and len(request.sectors) != len(request.totals):
+        raise ValueError("sectors must have one entry per total")
+    if request.mode == "fixed":
+        badges = assign_badges(request.totals)
+    elif request.mode == "percentile":
+        badges = percentile_badges(request.totals, request.sectors)
+    elif request.mode == "population":
+        badges = supplier_tiers().assign(request.totals, request.sectors)
+    else:
+        raise ValueError(f"Unknown mode '{request.mode}'. Use one of {BADGE_MODES}")
+    return {"status": "success", "mode": request.mode, "badges": badges.tolist()}
+
+# Badges for many suppliers at once: fixed thresholds, percentile tiers within
+# the submitted population, or tiers against every supplier in the emission store
+@app.post("/api/badges")
+async def badges(request: BadgeRequest):
+    return await _offload("estimate", _badges, request)
+
+
+async def _aiter_lines(byte_stream):
+    """Split an async stream of body chunks into text lines."""
+    buf = b""
+    async for chunk in byte_stream:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buf:
+        yield buf.decode("utf-8")
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose body generator reads the request body itself.
+    The stock one listens for disconnects on `receive` while streaming, which
+    swallows upload chunks the generator is still waiting for. Here a
+    disconnect surfaces through request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+# Streaming bulk endpoint: upload NDJSON/CSV with chunked transfer, get NDJSON back.
+# The last line is a {"summary": {...}} record with row count and rows/sec.
+@app.post("/api/estimate/stream")
+async def estimate_stream(
+    request: Request,
+    format: str = Query("ndjson"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1),
+):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of {FORMATS}")
+
+    async def results():
+        chunker = RowChunker(format, chunk_size)
+        try:
+            async for line in _aiter_lines(request.stream()):
+                chunk = chunker.feed(line)
+                if chunk:
+                    for res in await POOLS["estimate"].run(estimate_chunk, chunk, block=True):
+                        yield to_ndjson(res)
+            chunk = chunker.close()
+            if chunk:
+                for res in await POOLS["estimate"].run(estimate_chunk, chunk, block=True):
+                    yield to_ndjson(res)
+            yield json.dumps({"summary": chunker.stats.as_dict()}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield json.dumps({"error": str(e), "summary": chunker.stats.as_dict()}) + "\n"
+
+    return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
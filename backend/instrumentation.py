@@ -0,0 +1,209 @@
+# backend/instrumentation.py
+"""
+In-process metrics and profiling; nothing external to run or scrape into.
+
+    LatencyHistogram   labelled latency histogram, Prometheus text output
+    STAGE_SECONDS      per-stage timers (estimator, extractor, recommender)
+    timed / stage      decorator and context manager feeding STAGE_SECONDS
+    SamplingProfiler   one sampling thread per process; each `record()`
+                       collects the thread stacks seen while it is open as
+                       folded-stack counts ("a;b;c 42" lines) for
+                       flamegraph.pl / speedscope
+
+Set SPARKSCOPE_METRICS=0 to turn the stage timers into no-ops. Metrics are
+per process: with several API workers, each serves its own /metrics, and
+work done in process pools is only visible at the endpoint level.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from threading import Event, Lock, Thread, get_ident
+from typing import Optional, Sequence
+import bisect
+import os
+import sys
+import time
+
+METRICS_ENABLED = os.getenv("SPARKSCOPE_METRICS", "1") != "0"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram per label value (e.g. per endpoint)."""
+
+    def __init__(self, name: str, help: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = Lock()
+        self._series: dict[str, list] = {}  # label -> [bucket counts..., sum, count]
+
+    def observe(self, label: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def snapshot(self) -> dict[str, list]:
+        with self._lock:
+            return {label: list(series) for label, series in self._series.items()}
+
+    def summary(self) -> dict:
+        """{label: {count, mean_ms, p50_ms, p99_ms}}; quantiles are bucket upper bounds."""
+        out = {}
+        bounds = self.buckets + (float("inf"),)
+        for label, series in self.snapshot().items():
+            count = series[-1]
+            cumulative, quantiles = 0, {}
+            for bound, n in zip(bounds, series[:-2]):
+                cumulative += n
+                for q in (0.5, 0.99):
+                    if q not in quantiles and cumulative >= q * count:
+                        quantiles[q] = bound * 1000
+            out[label] = {
+                "count": count,
+                "mean_ms": series[-2] / count * 1000 if count else 0.0,
+                "p50_ms": quantiles.get(0.5),
+                "p99_ms": quantiles.get(0.99),
+            }
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label, series in self.snapshot().items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{self.label}="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{label}"}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{self.label}="{label}"}} {series[-1]}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = LatencyHistogram(
+    "sparkscope_stage_seconds", "Time spent in estimator, extractor and recommender stages.", "stage"
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage `name`."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(name, time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+# ---------- Sampling profiler ----------
+
+# Leaf frames in these files are idle threads (pool workers, the event loop)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "base_events.py")
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every other thread each `interval` seconds on a
+    single background thread, which only wakes while a recording is open.
+    `record()` opens a recording; its `stop()` returns the folded stacks
+    (root first, frames joined by ";") sampled meanwhile, with their counts.
+    Work runs on pool threads, so overlapping recordings share the samples
+    taken while both were open. Threads parked in a wait are skipped, so the
+    profile shows where work happened.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._recordings: set["Recording"] = set()
+        self._lock = Lock()
+        self._active = Event()
+        self._thread: Optional[Thread] = None
+        self._pid = None
+
+    def record(self) -> "Recording":
+        recording = Recording(self)
+        with self._lock:
+            # Threads don't survive fork; (re)start in whichever process records
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            self._recordings.add(recording)
+            self._active.set()
+        return recording
+
+    def _release(self, recording: "Recording") -> None:
+        with self._lock:
+            self._recordings.discard(recording)
+
+    def _run(self) -> None:
+        me = get_ident()
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._recordings:
+                    self._active.clear()
+                    continue
+            stacks = Counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks[";".join(reversed(stack))] += 1
+            with self._lock:
+                for recording in self._recordings:
+                    recording.samples.update(stacks)
+
+
+class Recording:
+    """Samples collected by a SamplingProfiler between record() and stop()."""
+
+    def __init__(self, profiler: SamplingProfiler):
+        self.samples: Counter = Counter()
+        self._profiler = profiler
+
+    def stop(self) -> Counter:
+        self._profiler._release(self)
+        return self.samples
+
+
+def write_folded(samples: Counter, path: Path) -> Path:
+    """Write folded stacks, one "stack count" line each (flamegraph.pl input)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{stack} {n}\n" for stack, n in samples.most_common()), encoding="utf-8")
+    return path
@@ -0,0 +1,84 @@
+# benchmarks/bench_ann_index.py
+"""
+Recall@10 vs. query latency vs. index memory for every index type in
+ann_index.py over synthetic clustered 384-d corpora (MiniLM's width).
+Exact flat search provides the ground truth.
+
+    python benchmarks/bench_ann_index.py                 # 10k and 100k
+    python benchmarks/bench_ann_index.py --sizes 1000000 # ~1.5 GB of vectors
+"""
+import argparse
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.recommender.ann_index import IndexConfig, apply_search_params, make_index
+
+DIM = 384
+K = 10
+QUERIES = 500
+
+# (label, config, search sweep)
+CANDIDATES = [
+    ("flat", IndexConfig(index_type="flat"), [{}]),
+    ("ivf_flat", IndexConfig(index_type="ivf_flat"), [{"nprobe": p} for p in (4, 16, 64)]),
+    ("hnsw", IndexConfig(index_type="hnsw"), [{"ef_search": e} for e in (16, 64, 256)]),
+    ("ivf_pq", IndexConfig(index_type="ivf_pq"), [{"nprobe": p} for p in (4, 16, 64)]),
+]
+
+
+def make_corpus(n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    clusters = max(16, n // 1000)
+    centroids = rng.normal(size=(clusters, DIM)).astype("float32")
+    data = centroids[rng.integers(0, clusters, n)] + rng.normal(scale=0.8, size=(n, DIM)).astype("float32")
+    queries = centroids[rng.integers(0, clusters, QUERIES)] + rng.normal(scale=0.8, size=(QUERIES, DIM)).astype("float32")
+    return data.astype("float32"), queries.astype("float32")
+
+
+def nlist_for(n: int) -> int:
+    return int(4 * np.sqrt(n))
+
+
+def run(n: int, rng: np.random.Generator) -> None:
+    data, queries = make_corpus(n, rng)
+    truth = faiss.IndexFlatL2(DIM)
+    truth.add(data)
+    _, gt = truth.search(queries, K)
+
+    train = data[rng.choice(n, size=min(n, 100_000), replace=False)]
+    for label, config, sweep in CANDIDATES:
+        config = replace(config, nlist=nlist_for(n))
+        t0 = time.perf_counter()
+        index = make_index(DIM, config, train)
+        index.add(data)
+        build_s = time.perf_counter() - t0
+        memory_mb = faiss.serialize_index(index).nbytes / 2**20
+
+        for params in sweep:
+            apply_search_params(index, replace(config, **params))
+            t0 = time.perf_counter()
+            _, ids = index.search(queries, K)
+            latency_ms = (time.perf_counter() - t0) / QUERIES * 1000
+            recall = np.mean([len(set(a) & set(b)) / K for a, b in zip(ids, gt)])
+            knob = ", ".join(f"{k}={v}" for k, v in params.items()) or "exact"
+            print(
+                f"📐 {n:>8} | {label:<8} {knob:<14} | recall@{K} {recall:.3f} | "
+                f"{latency_ms:7.3f} ms/query | {memory_mb:8.1f} MB | build {build_s:6.1f} s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        run(n, rng)
@@ -0,0 +1,33 @@
+# benchmarks/bench_batch_estimate.py
+"""
+Throughput of estimate_emissions_batch versus a Python loop over
+estimate_emissions, plus a bit-for-bit equality check between the two.
+
+    python benchmarks/bench_batch_estimate.py
+"""
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.estimator.emission_estimator import estimate_emissions, estimate_emissions_batch
+from benchmarks.synthetic import make_payloads
+
+
+if __name__ == "__main__":
+    for n in (1_000, 10_000, 100_000):
+        payloads = make_payloads(n)
+
+        t0 = time.perf_counter()
+        single = [estimate_emissions(p) for p in payloads]
+        t_single = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = estimate_emissions_batch(payloads)
+        t_batch = time.perf_counter() - t0
+
+        assert single == batch, "batch results diverge from the single-payload path"
+        print(f"📦 {n:>7} suppliers | loop {n / t_single:>10,.0f}/s | batch {n / t_batch:>10,.0f}/s")
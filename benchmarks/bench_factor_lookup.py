@@ -0,0 +1,52 @@
+# benchmarks/bench_factor_lookup.py
+"""
+Per-request cost of estimate_emissions: the old per-key DataFrame.query
+lookup versus the precompiled factor table.
+
+    python benchmarks/bench_factor_lookup.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.estimator import emission_estimator as est
+
+PAYLOAD = {
+    "electricity_kwh": 5000,
+    "road_freight_tkm": 12 * 520,
+    "natural_gas_kwh": 12000,
+    "air_freight_tkm": 2500,
+}
+
+
+def _legacy_estimate(payload: dict) -> dict:
+    """The pre-table implementation: one DataFrame.query per activity key."""
+    results, total = {}, 0.0
+    for key, amount in payload.items():
+        cat, act = est.ACTIVITY_MAP[key]
+        row = est.FACTORS.query("Category == @cat and Activity == @act")
+        co2 = amount * float(row["kgCO2e_per_unit"].iloc[0])
+        results[key] = co2
+        total += co2
+    results["total"] = total
+    return results
+
+
+def _per_call_us(fn, number: int) -> float:
+    best = min(timeit.repeat(lambda: fn(PAYLOAD), number=number, repeat=5))
+    return best / number * 1e6
+
+
+if __name__ == "__main__":
+    assert _legacy_estimate(PAYLOAD) == est.estimate_emissions(PAYLOAD)
+
+    before = _per_call_us(_legacy_estimate, number=200)
+    after = _per_call_us(est.estimate_emissions, number=20_000)
+
+    print(f"⏱️  DataFrame.query lookup : {before:10.2f} µs / request")
+    print(f"⚡ Precompiled table      : {after:10.2f} µs / request")
+    print(f"📈 Speed-up              : {before / after:10.1f}x")
@@ -0,0 +1,84 @@
+# benchmarks/bench_inference_backends.py
+"""
+Latency, peak memory and output agreement of the torch / int8 / onnx
+inference backends. Each backend runs in a fresh interpreter so memory
+numbers don't bleed into each other; agreement is measured against torch
+(mean embedding cosine similarity, exact-match rate of generated text).
+
+    python backend/agents/recommender/inference_backend.py export --backend onnx
+    python backend/agents/recommender/inference_backend.py export --backend int8
+    python benchmarks/bench_inference_backends.py
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+SENTENCES = [
+    "Install rooftop solar or join community solar programs.",
+    "Consolidate shipments to reduce freight kilometers.",
+    "Use recyclable or compostable packaging wherever possible.",
+    "Run machinery during off-peak hours to reduce grid strain.",
+] * 8
+
+PROMPTS = [
+    "Give 3 tips to reduce electricity emissions in a warehouse.",
+    "Give 3 tips to cut transport emissions for a grocery supplier.",
+    "Give 3 tips to make product packaging more sustainable.",
+    "Give 3 tips to lower natural gas use in a bakery.",
+]
+
+_PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+from backend.agents.recommender.inference_backend import load_embeddings, load_generator
+
+sentences, prompts = json.loads(sys.stdin.read())
+t0 = time.perf_counter()
+emb = load_embeddings({backend!r})
+gen = load_generator({backend!r})
+load_s = time.perf_counter() - t0
+
+emb.embed_documents(sentences[:2])
+t0 = time.perf_counter()
+vectors = emb.embed_documents(sentences)
+embed_ms = (time.perf_counter() - t0) / len(sentences) * 1000
+
+gen(prompts[:1])
+t0 = time.perf_counter()
+texts = [out["generated_text"] for out in gen(prompts)]
+generate_ms = (time.perf_counter() - t0) / len(prompts) * 1000
+
+print(json.dumps({{
+    "load_s": load_s, "embed_ms": embed_ms, "generate_ms": generate_ms,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "vectors": vectors, "texts": texts,
+}}))
+"""
+
+
+def run(backend: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(root=str(ROOT_DIR), backend=backend)],
+        input=json.dumps([SENTENCES, PROMPTS]), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    results = {backend: run(backend) for backend in ("torch", "int8", "onnx")}
+    ref = results["torch"]
+    ref_vecs = np.asarray(ref["vectors"])
+    for backend, r in results.items():
+        vecs = np.asarray(r["vectors"])
+        cosine = np.mean(np.sum(vecs * ref_vecs, axis=1) / (np.linalg.norm(vecs, axis=1) * np.linalg.norm(ref_vecs, axis=1)))
+        exact = np.mean([a == b for a, b in zip(r["texts"], ref["texts"])])
+        print(
+            f"⚙️  {backend:<5} | load {r['load_s']:6.1f} s | embed {r['embed_ms']:6.2f} ms/text | "
+            f"generate {r['generate_ms']:7.1f} ms/prompt | RSS {r['max_rss_mb']:7.0f} MB | "
+            f"cosine {cosine:.4f} | exact text {exact:.2f}"
+        )
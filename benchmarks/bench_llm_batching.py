@@ -0,0 +1,51 @@
+# benchmarks/bench_llm_batching.py
+"""
+flan-t5 generation throughput at 1, 8 and 32 concurrent requesters:
+one forward pass per request (the old path) versus the micro-batcher.
+
+    python benchmarks/bench_llm_batching.py
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.recommender import rag_query
+
+QUESTIONS = [
+    "How can I reduce electricity emissions?",
+    "How do I cut transport emissions?",
+    "What packaging changes lower our footprint?",
+    "How can a warehouse use less energy?",
+]
+REQUESTS_PER_CLIENT = 4
+
+
+def prompts(n: int) -> list[str]:
+    template = rag_query.PROMPTS[rag_query.DEFAULT_PROMPT]
+    context = "Use LED lighting. Consolidate shipments. Use recycled packaging."
+    return [template.format(context=context, question=QUESTIONS[i % len(QUESTIONS)]) for i in range(n)]
+
+
+def throughput(fn, clients: int) -> float:
+    work = prompts(clients * REQUESTS_PER_CLIENT)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(fn, work))
+    return len(work) / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    rec = rag_query.get_recommender()
+    rec.generate_batch(prompts(1))  # warm-up
+
+    for clients in (1, 8, 32):
+        single = throughput(lambda p: rec.generate_batch([p])[0], clients)
+        batched = throughput(rec.batcher, clients)
+        print(f"👥 {clients:>2} requesters | unbatched {single:6.2f} req/s | "
+              f"micro-batched {batched:6.2f} req/s | {batched / single:4.1f}x")
+    print("📦", rec.batcher.stats())
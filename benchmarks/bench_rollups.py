@@ -0,0 +1,69 @@
+# benchmarks/bench_rollups.py
+"""
+Ingest rate of EmissionStore.record and latency of its rollup queries
+as the number of stored estimate rows grows.
+
+    python benchmarks/bench_rollups.py --rows 10000000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.agents.estimator.emission_estimator import ACTIVITY_MAP
+from backend.agents.estimator.emission_store import EmissionStore, EstimateRecord
+
+BATCH = 10_000
+
+
+def make_records(n: int, suppliers: int, rng: random.Random) -> list[EstimateRecord]:
+    keys = list(ACTIVITY_MAP)
+    records = []
+    for _ in range(n):
+        emissions = {k: rng.uniform(0, 5_000) for k in rng.sample(keys, 2)}
+        emissions["total"] = sum(emissions.values())
+        month = f"2024-{rng.randint(1, 12):02d}"
+        records.append(EstimateRecord(f"S{rng.randrange(suppliers)}", emissions, None, month))
+    return records
+
+
+def time_ms(fn, repeat: int = 20) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Estimate rows (activity lines) to store")
+    parser.add_argument("--suppliers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmissionStore(Path(tmp) / "bench.sqlite3")
+        written = 0
+        t0 = time.perf_counter()
+        while written < args.rows:
+            written += store.record(make_records(BATCH // 2, args.suppliers, rng))
+        elapsed = time.perf_counter() - t0
+        print(f"ingest: {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+        queries = {
+            "top 10 suppliers, all time": lambda: store.top("supplier", 10),
+            "top 10 suppliers, one month": lambda: store.top("supplier", 10, "2024-06"),
+            "totals by category": lambda: store.totals("category"),
+            "monthly series": lambda: store.totals("month"),
+            "one supplier, all time": lambda: store.totals("supplier", key="S42"),
+            "activities, Q2 range": lambda: store.totals("activity", month_from="2024-04", month_to="2024-06"),
+        }
+        for name, fn in queries.items():
+            print(f"{name:<30} {time_ms(fn):8.3f} ms")
+        store.close()
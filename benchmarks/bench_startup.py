@@ -0,0 +1,97 @@
+# benchmarks/bench_startup.py
+"""
+Startup time and peak RSS for the estimator-only and full (warmed RAG)
+configurations. Each configuration runs in a fresh interpreter.
+
+With --workers N it also forks N workers the way `gunicorn --preload` does
+and reports each worker's private memory (Linux smaps_rollup). It compares
+loading in every worker with loading once in the master before the fork.
+Pages the workers share with the master are not counted as private.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --workers 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+_PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "max_rss_mb": rss_kb / 1024}}))
+"""
+
+_FORK_PROBE = """
+import json, os, sys
+sys.path.insert(0, {root!r})
+
+def private_mb():
+    with open("/proc/self/smaps_rollup") as f:
+        kb = sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean:", "Private_Dirty:")))
+    return kb / 1024
+
+if {preload}:
+    exec({body!r})
+r, w = os.pipe()
+pids = []
+for _ in range({workers}):
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        if not {preload}:
+            exec({body!r})
+        # The master stays alive, so pages it loaded count as shared
+        os.write(w, (json.dumps(private_mb()) + "\\n").encode())
+        os._exit(0)
+    pids.append(pid)
+os.close(w)
+with os.fdopen(r) as f:
+    sizes = [json.loads(line) for line in f]
+for pid in pids:
+    os.waitpid(pid, 0)
+print(json.dumps({{"private_mb_per_worker": sum(sizes) / len(sizes)}}))
+"""
+
+CONFIGS = {
+    "estimator only": "import backend.agents.agent_router\nimport backend.agents.estimator.emission_estimator",
+    "full (RAG warmed)": "import backend.agents.agent_router\nfrom backend.agents.recommender.rag_query import warm_up\nwarm_up()",
+}
+
+
+def _run(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(body: str) -> dict:
+    return _run(_PROBE.format(root=str(ROOT_DIR), body=body))
+
+
+def measure_workers(body: str, workers: int, preload: bool) -> dict:
+    return _run(_FORK_PROBE.format(root=str(ROOT_DIR), body=body, workers=workers, preload=preload))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=0, help="Also measure N forked workers")
+    args = parser.parse_args()
+
+    for name, body in CONFIGS.items():
+        try:
+            m = measure(body)
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️  {name:<18} | failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"🚀 {name:<18} | {m['seconds']:7.2f} s | peak RSS {m['max_rss_mb']:8.1f} MB")
+        for preload in (False, True) if args.workers else ():
+            w = measure_workers(body, args.workers, preload)
+            where = "master, then fork" if preload else "each worker"
+            print(f"   loaded in {where:<17} | {args.workers} workers | {w['private_mb_per_worker']:8.1f} MB private each")
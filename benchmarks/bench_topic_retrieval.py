@@ -0,0 +1,79 @@
+# benchmarks/bench_topic_retrieval.py
+"""
+Retrieval latency and on-topic precision@k as the corpus grows, comparing
+ - global:       one flat index over every chunk (old behaviour, topic ignored)
+ - post-filter:  global search with fetch_k = 4k, then keep the topic's hits
+ - partitioned:  one flat index per topic (what rag_build_index now writes)
+
+Synthetic 384-d vectors (MiniLM's width) are drawn around one centroid per
+topic, so no model download is needed. The topic tags used for filtering and
+partitioning are noisy: TAG_NOISE of the chunks are tagged with a random
+topic, the way filename-derived tags misfile some chunks. Every strategy is
+scored against the true topic labels, so partitioning is not 1.0 by
+construction.
+
+    python benchmarks/bench_topic_retrieval.py
+"""
+import time
+
+import faiss
+import numpy as np
+
+DIM = 384
+TOPICS = 8
+K = 5
+QUERIES = 200
+TAG_NOISE = 0.1
+SPREAD = 6.0      # per-dimension noise around each topic centroid; topics overlap
+
+
+def make_corpus(n: int, rng: np.random.Generator):
+    centroids = rng.normal(size=(TOPICS, DIM)).astype("float32")
+    labels = rng.integers(0, TOPICS, size=n)
+    vectors = centroids[labels] + rng.normal(scale=SPREAD, size=(n, DIM)).astype("float32")
+    return centroids, labels, vectors.astype("float32")
+
+
+def flat(vectors: np.ndarray) -> faiss.Index:
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    return index
+
+
+def run(n: int, rng: np.random.Generator) -> None:
+    centroids, labels, vectors = make_corpus(n, rng)
+    tags = np.where(rng.random(n) < TAG_NOISE, rng.integers(0, TOPICS, size=n), labels)
+    global_index = flat(vectors)
+    part_ids = {t: np.flatnonzero(tags == t) for t in range(TOPICS)}
+    parts = {t: flat(vectors[ids]) for t, ids in part_ids.items()}
+
+    q_topics = rng.integers(0, TOPICS, size=QUERIES)
+    queries = (centroids[q_topics] + rng.normal(scale=SPREAD, size=(QUERIES, DIM))).astype("float32")
+
+    def timed(search):
+        t0 = time.perf_counter()
+        precision = np.mean([search(q[None, :], t) for q, t in zip(queries, q_topics)])
+        return (time.perf_counter() - t0) / QUERIES * 1000, precision
+
+    def global_search(q, t):
+        _, ids = global_index.search(q, K)
+        return np.mean(labels[ids[0]] == t)
+
+    def post_filter(q, t):
+        _, ids = global_index.search(q, K * 4)
+        hits = [i for i in ids[0] if tags[i] == t][:K]
+        return np.sum(labels[hits] == t) / K
+
+    def partitioned(q, t):
+        _, ids = parts[t].search(q, K)
+        return np.mean(labels[part_ids[t][ids[0]]] == t)
+
+    for name, fn in (("global", global_search), ("post-filter", post_filter), ("partitioned", partitioned)):
+        ms, p = timed(fn)
+        print(f"🔎 {n:>7} chunks | {name:<12} | {ms:8.3f} ms/query | precision@{K} {p:.2f}")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    for n in (1_000, 10_000, 100_000):
+        run(n, rng)
@@ -0,0 +1,73 @@
+# benchmarks/load_test.py
+"""
+Closed-loop load test against a running API: N clients each send requests
+back to back for a fixed duration; reports throughput, p50/p99 latency and
+how many requests were rejected with 429.
+
+    uvicorn backend.api.main:app --workers 4 &
+    python benchmarks/load_test.py --endpoint /api/estimate --clients 1 8 32
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+BODIES = {
+    "/api/estimate": {"activities": {"electricity_kwh": 5000, "road_freight_tkm": 6240}},
+    "/api/estimate/batch": [{"activities": {"electricity_kwh": 5000 + i, "natural_gas_kwh": 1200}} for i in range(100)],
+    "/api/extract": {"text": "I used 5000 kWh and shipped 12 pallets over 520 km"},
+    "/api/recommend": {"query": "How can I reduce electricity emissions?", "topic": "electricity"},
+}
+
+
+def client(url: str, body, deadline: float, latencies: list, statuses: dict, lock: threading.Lock) -> None:
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status = session.post(url, json=body, timeout=60).status_code
+        except requests.RequestException:
+            status = "error"
+        elapsed = time.perf_counter() - t0
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+
+def run(url: str, body, clients: int, duration: float) -> None:
+    latencies, statuses, lock = [], {}, threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(url, body, deadline, latencies, statuses, lock))
+        for _ in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if len(latencies) >= 2:
+        q = statistics.quantiles(latencies, n=100)
+        p50, p99 = q[49] * 1000, q[98] * 1000
+    else:
+        p50 = p99 = float("nan")
+    print(
+        f"👥 {clients:>3} clients | {len(latencies) / duration:8.1f} req/s | "
+        f"p50 {p50:8.1f} ms | p99 {p99:8.1f} ms | 429s {statuses.get(429, 0):>5} | "
+        f"errors {sum(v for k, v in statuses.items() if k not in (200, 429)):>4}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/api/estimate", choices=sorted(BODIES))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    for n in args.clients:
+        run(args.base_url + args.endpoint, BODIES[args.endpoint], n, args.duration)
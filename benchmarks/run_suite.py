@@ -0,0 +1,248 @@
+# benchmarks/run_suite.py
+"""
+Offline benchmark suite: one command times the estimator, verification,
+regex and PDF extraction, RAG index build and retrieval on synthetic data
+(see synthetic.py; the RAG stages use hashing embeddings and a canned LLM),
+and saves the numbers as JSON. `compare` diffs two result files and exits
+non-zero when any metric got worse by more than the threshold.
+
+    python benchmarks/run_suite.py run --scale small -o bench_base.json
+    python benchmarks/run_suite.py run --scale small -o bench_new.json
+    python benchmarks/run_suite.py compare bench_base.json bench_new.json --threshold 10
+
+Benchmarks whose dependencies are missing are recorded as skipped.
+"""
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic import (
+    make_corpus,
+    make_invoice,
+    make_payloads,
+    make_pdf,
+    make_queries,
+    stub_embeddings,
+    stub_generator,
+)
+
+SCALES = {
+    "small": dict(payloads=10_000, invoices=200, pdf_pages=20, corpus_files=20, paragraphs=20, queries=50, repeat=3),
+    "medium": dict(payloads=100_000, invoices=2_000, pdf_pages=200, corpus_files=100, paragraphs=40, queries=200, repeat=3),
+    "large": dict(payloads=1_000_000, invoices=20_000, pdf_pages=1_000, corpus_files=500, paragraphs=60, queries=500, repeat=3),
+}
+
+
+def metric(value: float, unit: str, better: str) -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    """Fastest of `repeat` runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+# ---------- Benchmarks: each returns {metric name: metric(...)} ----------
+
+def bench_estimator(scale: dict, tmp: Path) -> dict:
+    from backend.agents.estimator.emission_estimator import estimate_emissions, estimate_emissions_batch, get_factor
+
+    payloads = make_payloads(scale["payloads"])
+    sample = payloads[:10_000]
+    calls = 50_000
+    t_factor = best_of(scale["repeat"], lambda: [get_factor("energy", "electricity grid average") for _ in range(calls)])
+    t_single = best_of(scale["repeat"], lambda: [estimate_emissions(p) for p in sample])
+    t_batch = best_of(scale["repeat"], estimate_emissions_batch, payloads)
+    return {
+        "estimator.get_factor_us": metric(t_factor / calls * 1e6, "µs/call", "lower"),
+        "estimator.estimate_us": metric(t_single / len(sample) * 1e6, "µs/payload", "lower"),
+        "estimator.batch_rows_per_s": metric(len(payloads) / t_batch, "rows/s", "higher"),
+    }
+
+
+def bench_verification(scale: dict, tmp: Path) -> dict:
+    from backend.agents.verification.rule_engine import verify_rows
+
+    payloads = make_payloads(scale["payloads"], seed=1)
+    t = best_of(scale["repeat"], verify_rows, payloads)
+    return {"verification.rows_per_s": metric(len(payloads) / t, "rows/s", "higher")}
+
+
+def bench_regex_extraction(scale: dict, tmp: Path) -> dict:
+    from backend.agents.document_ingestion.activity_extractor import extract_activities
+
+    rng = random.Random(0)
+    docs = [make_invoice(rng, rng.randint(20, 80)) for _ in range(scale["invoices"])]
+    size_mb = sum(len(d) for d in docs) / 2**20
+    t = best_of(scale["repeat"], lambda: [extract_activities(d) for d in docs])
+    return {"extraction.regex_mb_per_s": metric(size_mb / t, "MB/s", "higher")}
+
+
+def bench_pdf_extraction(scale: dict, tmp: Path) -> dict:
+    from backend.agents.document_ingestion.extract_text import extract_text_from_pdf
+
+    pages = scale["pdf_pages"]
+    pdf = make_pdf(tmp / "invoice.pdf", pages)
+    t = best_of(scale["repeat"], extract_text_from_pdf, pdf)
+    return {"extraction.pdf_pages_per_s": metric(pages / t, "pages/s", "higher")}
+
+
+def bench_rag(scale: dict, tmp: Path) -> dict:
+    from backend.agents.recommender import inference_backend, rag_build_index, rag_query
+
+    data_dir, index_dir = tmp / "corpus", tmp / "faiss_index"
+    make_corpus(data_dir, scale["corpus_files"], scale["paragraphs"])
+    embeddings = stub_embeddings()
+
+    with ExitStack() as stack:
+        for module in (rag_build_index, rag_query):
+            stack.enter_context(mock.patch.object(module, "INDEX_DIR", index_dir))
+            stack.enter_context(mock.patch.object(module, "TOPIC_INDEX_DIR", index_dir / "topics"))
+        stack.enter_context(mock.patch.object(rag_build_index, "DATA_DIR", data_dir))
+        stack.enter_context(mock.patch.object(rag_build_index, "MANIFEST_PATH", index_dir / "manifest.json"))
+        stack.enter_context(mock.patch.object(rag_build_index, "load_embeddings_and_backend", lambda **_: (embeddings, "torch")))
+        stack.enter_context(mock.patch.object(inference_backend, "load_embeddings", lambda **_: embeddings))
+        stack.enter_context(mock.patch.object(inference_backend, "load_generator", lambda **_: stub_generator()))
+        stack.enter_context(mock.patch.object(rag_query, "_instance", None))
+
+        t0 = time.perf_counter()
+        rag_build_index.build_faiss_index(incremental=False)
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        rag_build_index.build_faiss_index(incremental=True)
+        t_noop = time.perf_counter() - t0
+
+        rag_query.RESPONSE_CACHE.clear()
+        rag_query.get_recommendations("warm up", None)
+        totals, retrieval = [], []
+        for query, topic in make_queries(scale["queries"]):
+            timings = {}
+            t0 = time.perf_counter()
+            rag_query.get_recommendations(query, topic, timings=timings)
+            totals.append((time.perf_counter() - t0) * 1000)
+            if timings.get("cache") == "miss":
+                retrieval.append(timings["setup_ms"])
+        rag_query.RESPONSE_CACHE.clear()
+
+    return {
+        "rag.index_build_s": metric(t_build, "s", "lower"),
+        "rag.index_noop_update_s": metric(t_noop, "s", "lower"),
+        "rag.query_p50_ms": metric(statistics.median(totals), "ms", "lower"),
+        "rag.retrieve_p50_ms": metric(statistics.median(retrieval) if retrieval else float("nan"), "ms", "lower"),
+    }
+
+
+BENCHMARKS = {
+    "estimator": bench_estimator,
+    "verification": bench_verification,
+    "regex_extraction": bench_regex_extraction,
+    "pdf_extraction": bench_pdf_extraction,
+    "rag": bench_rag,
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(scale_name: str, only: list[str] = None) -> dict:
+    scale = SCALES[scale_name]
+    results, skipped = {}, {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        print(f"⏱️  {name} ...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                results.update(bench(scale, Path(tmp)))
+            except ImportError as e:
+                skipped[name] = f"missing dependency: {e.name or e}"
+                print(f"   skipped ({skipped[name]})")
+    return {
+        "meta": {
+            "scale": scale_name,
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """Print a comparison table; return the names of regressed metrics."""
+    if base["meta"].get("scale") != new["meta"].get("scale"):
+        print(f"⚠️  Comparing different scales: {base['meta'].get('scale')} vs {new['meta'].get('scale')}")
+    print(f"{'metric':<32} {'base':>12} {'new':>12} {'change':>9}  unit")
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old, cur = base["results"].get(name), new["results"].get(name)
+        if old is None or cur is None:
+            print(f"{name:<32} {'-' if old is None else format(old['value'], '.4g'):>12} "
+                  f"{'-' if cur is None else format(cur['value'], '.4g'):>12} {'n/a':>9}")
+            continue
+        change = (cur["value"] - old["value"]) / old["value"] * 100 if old["value"] else 0.0
+        worse = -change if cur["better"] == "higher" else change
+        status = ""
+        if worse > threshold:
+            status = "❌ regression"
+            regressions.append(name)
+        elif -worse > threshold:
+            status = "✅ faster"
+        print(f"{name:<32} {old['value']:>12.4g} {cur['value']:>12.4g} {change:>+8.1f}%  {cur['unit']} {status}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline SparkScope benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="Run the suite and save JSON results")
+    run_p.add_argument("--scale", choices=SCALES, default="small")
+    run_p.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run a subset of benchmarks")
+    run_p.add_argument("-o", "--output", type=Path, default=Path("bench_results.json"))
+    cmp_p = sub.add_parser("compare", help="Compare two result files")
+    cmp_p.add_argument("base", type=Path)
+    cmp_p.add_argument("new", type=Path)
+    cmp_p.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.scale, args.only)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        for name, m in report["results"].items():
+            print(f"{name:<32} {m['value']:>12.4g} {m['unit']}")
+        print(f"💾 {args.output}")
+    else:
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        regressions = compare(base, new, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold:g}%")
+            sys.exit(1)
+        print(f"✅ No regressions above {args.threshold:g}%")
@@ -0,0 +1,119 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic inputs and model stubs shared by the benchmarks:
+activity payloads, invoice text, invoice PDFs, a guidance corpus for the
+RAG index, hashing embeddings and a canned LLM. None of them need network
+access or model downloads.
+"""
+from pathlib import Path
+import random
+import zlib
+
+LINE_TEMPLATES = [
+    "Electricity usage for period: {n:,} kWh",
+    "Natural gas supplied: {n} kWh",
+    "Air freight consignment: {n} tonne-km",
+    "Shipped {p} pallets over {d} km by road",
+    "Item {n} - packaging materials - qty {p} - ref INV-{n}",
+    "Payment terms 30 days. Account {n}.",
+]
+
+PDF_LINES_PER_PAGE = 40
+
+TOPICS = ("electricity", "transport", "packaging", "heating", "waste")
+_GUIDANCE_WORDS = (
+    "reduce", "switch", "renewable", "tariff", "efficiency", "audit", "consolidate", "loads",
+    "route", "fleet", "electric", "insulation", "recycled", "pallets", "supplier", "monitor",
+    "schedule", "off-peak", "lighting", "heat", "pump", "packaging", "weight", "modal", "rail",
+)
+
+
+def make_payloads(n: int, seed: int = 0) -> list[dict]:
+    from backend.agents.estimator.emission_estimator import ACTIVITY_MAP
+
+    rng = random.Random(seed)
+    keys = list(ACTIVITY_MAP)
+    payloads = []
+    for _ in range(n):
+        chosen = rng.sample(keys, rng.randint(1, len(keys)))
+        payloads.append({k: round(rng.uniform(0, 50_000), 3) for k in chosen})
+    return payloads
+
+
+def make_invoice(rng: random.Random, lines: int) -> str:
+    return "\n".join(
+        rng.choice(LINE_TEMPLATES).format(n=rng.randint(100, 99_999), p=rng.randint(1, 40), d=rng.randint(10, 900))
+        for _ in range(lines)
+    )
+
+
+def make_pdf(path: Path, pages: int) -> Path:
+    import fitz
+
+    with fitz.open() as doc:
+        for p in range(pages):
+            page = doc.new_page()
+            body = "\n".join(
+                f"Line {i:02d}: Electricity usage {1000 + p * 7 + i} kWh, 12 pallets shipped over 520 km"
+                for i in range(PDF_LINES_PER_PAGE)
+            )
+            page.insert_text((36, 36), body, fontsize=8)
+        doc.save(path)
+    return path
+
+
+def make_corpus(directory: Path, files: int, paragraphs: int, seed: int = 0) -> list[Path]:
+    """Write `files` guidance .txt files named "<topic>_<i>.txt"."""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        topic = TOPICS[i % len(TOPICS)]
+        text = "\n\n".join(
+            f"{topic.capitalize()} tip {j}: " + " ".join(rng.choices(_GUIDANCE_WORDS, k=rng.randint(30, 60))) + "."
+            for j in range(paragraphs)
+        )
+        path = directory / f"{topic}_{i:04d}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def make_queries(n: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [
+        (f"how can I {' '.join(rng.choices(_GUIDANCE_WORDS, k=6))} ({i})", rng.choice(TOPICS))
+        for i in range(n)
+    ]
+
+
+def stub_embeddings(dim: int = 384):
+    """Hashing bag-of-words embeddings (L2-normalised), a stand-in for MiniLM."""
+    import numpy as np
+    from langchain_core.embeddings import Embeddings
+
+    class HashingEmbeddings(Embeddings):
+        def _embed(self, text: str) -> list[float]:
+            vec = np.zeros(dim, dtype="float32")
+            for token in text.lower().split():
+                h = zlib.crc32(token.encode("utf-8"))
+                vec[h % dim] += 1.0 if h & 1 else -1.0
+            norm = np.linalg.norm(vec)
+            return (vec / norm if norm else vec).tolist()
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            return [self._embed(t) for t in texts]
+
+        def embed_query(self, text: str) -> list[float]:
+            return self._embed(text)
+
+    return HashingEmbeddings()
+
+
+def stub_generator():
+    """Callable with the text2text-generation pipeline's calling convention."""
+    def generate(prompts, batch_size: int = 1, **kwargs):
+        prompts = [prompts] if isinstance(prompts, str) else prompts
+        return [[{"generated_text": "- Switch to a renewable tariff\n- Consolidate loads\n- Audit usage"}] for _ in prompts]
+
+    return generate
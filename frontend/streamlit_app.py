@@ -6,13 +6,43 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+import hashlib
+
 import streamlit as st
-import requests
-import re
 import pandas as pd
 
 from backend.agents.agent_router import get_agent
-from backend.agents.recommender.rag_query import get_recommendations
+from backend.agents.estimator.estimator_client import EstimatorError, get_estimator_client
+
+RECOMMENDATION_TOPICS = ["electricity", "transport", "packaging"]
+
+# -------------------- Cached Data Path --------------------
+# Streamlit re-runs this script on every interaction. Anything slow goes
+# through st.cache_resource (one copy per server process) or st.cache_data
+# (memoised on its arguments), so a rerun only repeats work whose inputs
+# changed.
+
+@st.cache_resource(show_spinner="🧠 Loading recommendation models...")
+def load_recommender():
+    from backend.agents.recommender.rag_query import get_recommendations, warm_up
+    warm_up()
+    return get_recommendations
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=256)
+def cached_recommendations(query: str, topic: str) -> list[str]:
+    return load_recommender()(query, topic)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def extract_pdf(digest: str, _data: bytes) -> tuple[str, dict]:
+    """Text and activity payload of an uploaded PDF, keyed on its SHA-256."""
+    from backend.agents.document_ingestion.extract_text import extract_text_from_pdf_bytes
+    text = extract_text_from_pdf_bytes(_data)
+    return text, get_agent("extract_payload")(text)
+
+# Short TTL so a reloaded factor table shows up without restarting the app
+@st.cache_data(show_spinner=False, ttl=300, max_entries=1024)
+def cached_estimate(payload: dict) -> dict:
+    return get_estimator_client().estimate(payload)
 
 # -------------------- Page Setup --------------------
 st.set_page_config(page_title="SparkScope | Emission Assistant", layout="centered")
@@ -49,6 +79,8 @@ if "show_form" not in st.session_state:
     st.session_state.show_form = False
 if "emissions" not in st.session_state:
     st.session_state.emissions = None
+if "processed_upload" not in st.session_state:
+    st.session_state.processed_upload = None
 
 # -------------------- Chat Agent --------------------
 st.divider()
@@ -61,26 +93,18 @@ if user_msg:
 
     # 🧠 Trigger Recommendations
     if any(word in user_msg.lower() for word in ["reduce", "cut", "lower"]):
-        for topic in ["electricity", "transport", "packaging"]:
+        for topic in RECOMMENDATION_TOPICS:
             if topic in user_msg.lower():
                 st.session_state.chat_history.append(("assistant", f"💡 Finding ways to reduce **{topic}** emissions..."))
-                suggestions = get_recommendations(user_msg, topic)
+                with st.spinner(f"💡 Finding ways to reduce {topic} emissions..."):
+                    suggestions = cached_recommendations(user_msg, topic)
                 for idea in suggestions:
                     st.session_state.chat_history.append(("assistant", f"• {idea}"))
                 st.rerun()
                 break
 
-    # 🧠 Regex-based Extraction
-    electricity_match = re.search(r"(\d+(?:\.\d+)?)\s*kwh", user_msg, re.I)
-    freight_match = re.search(r"(\d+)\s*pallets.*?(\d+)\s*km", user_msg, re.I)
-
-    payload = {}
-    if electricity_match:
-        payload["electricity_kwh"] = float(electricity_match.group(1))
-    if freight_match:
-        pallets = int(freight_match.group(1))
-        km = int(freight_match.group(2))
-        payload["road_freight_tkm"] = pallets * km
+    # 🧠 Rule-based Extraction (shared with the PDF path)
+    payload = get_agent("extract_payload")(user_msg)
 
     if payload:
         st.session_state.chat_history.append(("assistant", f"📦 Detected activity data:\n```json\n{payload}\n```"))
@@ -90,15 +114,12 @@ if user_msg:
             for w in warnings:
                 st.session_state.chat_history.append(("assistant", f"• {w}"))
         try:
-            res = requests.post("http://localhost:8000/api/estimate", json={"activities": payload})
-            if res.status_code == 200:
-                st.session_state.emissions = res.json()["emissions"]
-                st.session_state.show_form = False
-                st.rerun()
-            else:
-                st.session_state.chat_history.append(("assistant", f"❌ API Error: {res.text}"))
-        except Exception as e:
-            st.session_state.chat_history.append(("assistant", f"🚨 API Exception: {e}"))
+            with st.spinner("🧮 Estimating emissions..."):
+                st.session_state.emissions = cached_estimate(payload)
+            st.session_state.show_form = False
+            st.rerun()
+        except EstimatorError as e:
+            st.session_state.chat_history.append(("assistant", f"❌ Estimation Error: {e}"))
     else:
         st.session_state.chat_history.append(("assistant", "🔧 I couldn’t understand your data. Please fill the manual form below."))
         st.session_state.show_form = True
@@ -134,15 +155,12 @@ if st.session_state.show_form:
                 for w in warnings:
                     st.session_state.chat_history.append(("assistant", f"• {w}"))
             try:
-                res = requests.post("http://localhost:8000/api/estimate", json={"activities": payload})
-                if res.status_code == 200:
-                    st.session_state.emissions = res.json()["emissions"]
-                    st.session_state.show_form = False
-                    st.rerun()
-                else:
-                    st.session_state.chat_history.append(("assistant", f"❌ API Error: {res.text}"))
-            except Exception as e:
-                st.session_state.chat_history.append(("assistant", f"🚨 API Exception: {e}"))
+                with st.spinner("🧮 Estimating emissions..."):
+                    st.session_state.emissions = cached_estimate(payload)
+                st.session_state.show_form = False
+                st.rerun()
+            except EstimatorError as e:
+                st.session_state.chat_history.append(("assistant", f"❌ Estimation Error: {e}"))
 
 # -------------------- Dashboard --------------------
 if st.session_state.emissions:
@@ -150,39 +168,42 @@ if st.session_state.emissions:
     st.session_state.emissions = None
 
 # -------------------- Upload PDF --------------------
+# Uploads stay in memory and are keyed on their content hash, so concurrent
+# sessions never share a file and a PDF left in the uploader is processed once.
 st.divider()
 with st.expander("📄 Upload Invoice PDF"):
     pdf = st.file_uploader("Upload your invoice (PDF)", type=["pdf"])
     if pdf:
-        tmp_path = ROOT_DIR / "tmp_invoice.pdf"
-        with open(tmp_path, "wb") as f:
-            f.write(pdf.read())
-
-        raw_text = get_agent("extract_text")(tmp_path)
+        data = pdf.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        with st.spinner("🧾 Reading invoice..."):
+            raw_text, payload = extract_pdf(digest, data)
         st.text_area("🧾 Extracted Text", raw_text, height=200)
 
-        payload = get_agent("extract_payload")(raw_text)
         if payload:
             st.success("✅ Activity data extracted:")
             st.code(payload, language="json")
 
-            emissions = get_agent("estimate")(payload)
-            if emissions:
-                st.session_state.emissions = emissions
-                st.rerun()
-            else:
-                st.error("❌ Emission estimation failed.")
+            if st.session_state.processed_upload != digest:
+                st.session_state.processed_upload = digest
+                try:
+                    with st.spinner("🧮 Estimating emissions..."):
+                        st.session_state.emissions = cached_estimate(payload)
+                    st.rerun()
+                except EstimatorError:
+                    st.error("❌ Emission estimation failed.")
         else:
             st.warning("⚠️ No valid data found.")
 
 # -------------------- Recommendations --------------------
-st.divider()
-with st.expander("💡 Emission Reduction Tips"):
-    reduction_topic = st.selectbox("Choose a category to reduce emissions:", ["", "electricity", "transport", "packaging"])
+# A fragment re-runs on its own, so picking a topic doesn't re-run the page
+@st.experimental_fragment
+def reduction_tips():
+    reduction_topic = st.selectbox("Choose a category to reduce emissions:", [""] + RECOMMENDATION_TOPICS)
     if reduction_topic:
-        st.info(f"Asking AI for ideas to reduce **{reduction_topic}** emissions...")
         try:
-            suggestions = get_recommendations(reduction_topic, reduction_topic)
+            with st.spinner(f"Asking AI for ideas to reduce {reduction_topic} emissions..."):
+                suggestions = cached_recommendations(reduction_topic, reduction_topic)
             if suggestions:
                 st.success("Here are your tips:")
                 for idea in suggestions:
@@ -191,3 +212,7 @@ with st.expander("💡 Emission Reduction Tips"):
                 st.warning("🤖 AI didn’t return any meaningful tips. Please try again.")
         except Exception as e:
             st.error(f"⚠️ Error while fetching suggestions: {e}")
+
+st.divider()
+with st.expander("💡 Emission Reduction Tips"):
+    reduction_tips()
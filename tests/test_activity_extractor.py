@@ -0,0 +1,38 @@
+# tests/test_activity_extractor.py
+import pytest
+
+from backend.agents.document_ingestion.activity_extractor import extract_activities
+
+
+def test_invoice_lines():
+    text = "Electricity: 1.2 MWh\nNatural gas 300 kWh\nShipped 2 pallets 150 km by truck\nAir freight 40 tkm"
+    assert extract_activities(text) == {
+        "electricity_kwh": 1200.0,
+        "natural_gas_kwh": 300.0,
+        "road_freight_tkm": 300.0,
+        "air_freight_tkm": 40.0,
+    }
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Grid power used: 1,250.5 kWh", {"electricity_kwh": 1250.5}),
+    ("Heating fuel: 10 therms", {"natural_gas_kwh": pytest.approx(293.071)}),
+    ("5 tonnes flown 1000 km", {"air_freight_tkm": 5000.0}),
+    ("500 kg over 10 miles", {"road_freight_tkm": pytest.approx(8.04672)}),
+    # No keyword on the line: each dimension's default activity
+    ("Total 42 kWh and 7 tkm", {"electricity_kwh": 42.0, "road_freight_tkm": 7.0}),
+])
+def test_units_and_keywords(text, expected):
+    assert extract_activities(text) == expected
+
+
+def test_first_value_per_activity_wins():
+    assert extract_activities("Electricity 100 kWh\nElectricity 200 kWh") == {"electricity_kwh": 100.0}
+
+
+def test_keywords_do_not_cross_lines():
+    assert extract_activities("Natural gas\n80 kWh") == {"electricity_kwh": 80.0}
+
+
+def test_numbers_inside_words_and_without_units_are_ignored():
+    assert extract_activities("Invoice INV-2024 for account A12kWh, ref 300") == {}
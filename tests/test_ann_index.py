@@ -0,0 +1,53 @@
+# tests/test_ann_index.py
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from backend.agents.recommender.ann_index import (
+    IndexConfig,
+    apply_search_params,
+    index_kind,
+    make_index,
+    reconstruct,
+    supports_removal,
+)
+
+DIM = 16
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype("float32")
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw", "ivf_pq"])
+def test_make_index_builds_the_configured_type(index_type):
+    config = IndexConfig(index_type=index_type, nlist=4, pq_m=4, pq_nbits=4)
+    index = make_index(DIM, config, _vectors(500))
+    assert index_kind(index) == index_type
+    assert supports_removal(index) == (index_type == "flat")
+
+
+def test_small_corpus_falls_back_to_flat_and_says_so(capsys):
+    index = make_index(DIM, IndexConfig(index_type="ivf_pq", pq_nbits=8), _vectors(10))
+    assert index_kind(index) == "flat"
+    assert "using a flat index" in capsys.readouterr().err
+
+
+def test_search_params_are_capped_by_nlist():
+    index = make_index(DIM, IndexConfig(index_type="ivf_flat", nlist=4), _vectors(200))
+    apply_search_params(index, IndexConfig(index_type="ivf_flat", nprobe=64))
+    assert faiss.downcast_index(index).nprobe == 4
+
+
+def test_reconstruct_returns_stored_vectors():
+    x = _vectors(50)
+    index = make_index(DIM, IndexConfig(), x)
+    index.add(x)
+    np.testing.assert_allclose(reconstruct(index, [3, 7]), x[[3, 7]])
+    assert reconstruct(index, []).shape == (0, DIM)
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        IndexConfig(index_type="annoy")
@@ -0,0 +1,101 @@
+# tests/test_api.py
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.api import main
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _limiter():
+    app = main.app.middleware_stack
+    while not isinstance(app, main.ConcurrencyLimit):
+        app = app.app
+    return app
+
+
+def test_estimate(client):
+    body = client.post("/api/estimate", json={"activities": {"electricity_kwh": 5000}}).json()
+    assert body["emissions"] == estimate_emissions({"electricity_kwh": 5000})
+
+
+def test_stream_holds_a_concurrency_slot_until_the_body_ends(client, monkeypatch):
+    limiter = _limiter()
+    seen = []
+    original = main.to_ndjson
+
+    def spy(result):
+        seen.append(limiter.active)
+        return original(result)
+
+    monkeypatch.setattr(main, "to_ndjson", spy)
+    lines = "\n".join('{"electricity_kwh": %d}' % i for i in range(3))
+    response = client.post("/api/estimate/stream?chunk_size=1", content=lines)
+    assert response.status_code == 200
+    assert seen == [1, 1, 1]
+    assert limiter.active == 0
+
+
+def test_requests_over_the_cap_get_429(client, monkeypatch):
+    monkeypatch.setattr(_limiter(), "limit", 0)
+    response = client.get("/")
+    assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+
+
+def test_population_badges_come_from_the_store(client, tmp_path, monkeypatch):
+    from backend.agents.estimator import emission_store
+
+    monkeypatch.setattr(emission_store, "_store", emission_store.EmissionStore(tmp_path / "e.sqlite3"))
+    monkeypatch.setattr(main, "_supplier_tiers", None)
+    request = {"totals": [100, 700, 5000], "mode": "population"}
+    # Empty population: the fixed cut points apply
+    assert client.post("/api/badges", json=request).json()["badges"] == ["🥇 Gold", "🥈 Silver", "🟤 Bronze"]
+
+    batch = [
+        {"supplier_id": f"S{i}", "sector": "steel", "activities": {"electricity_kwh": kwh}}
+        for i, kwh in enumerate([1000, 2000, 3000])
+    ]
+    assert client.post("/api/estimate/batch?store=true", json=batch).status_code == 200
+    monkeypatch.setattr(main, "_supplier_tiers", None)
+    badges = client.post("/api/badges", json={"totals": [500, 1000, 3000], "sectors": ["steel"] * 3, "mode": "population"})
+    assert badges.json()["badges"] == ["🥇 Gold", "🥈 Silver", "🟤 Bronze"]
+
+
+def test_a_bare_year_picks_the_regional_vintage(client):
+    body = client.post("/api/estimate", json={"activities": {"electricity_kwh": 1000}, "region": "GB", "date": 2022})
+    assert body.status_code == 200
+    assert body.json()["emissions"] == estimate_emissions({"electricity_kwh": 1000}, "GB", "2022")
+
+
+def test_a_date_without_a_region_is_rejected(client):
+    response = client.post("/api/estimate/batch", json=[{"activities": {"electricity_kwh": 1}, "date": "2022"}])
+    assert response.status_code == 400 and "region" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("date", ["05/01/2023", "xx"])
+def test_an_unparseable_date_is_rejected(client, date):
+    payload = {"activities": {"electricity_kwh": 1}, "region": "GB", "date": date}
+    for path, body in (("/api/estimate", payload), ("/api/estimate/batch", [payload])):
+        response = client.post(path, json=body)
+        assert response.status_code == 400 and "Unrecognised date" in response.json()["detail"]
+
+
+def test_a_recommendation_timeout_is_a_504(client, monkeypatch):
+    def timed_out(query, topic):
+        raise TimeoutError
+
+    rag_query = types.SimpleNamespace(get_recommendations=timed_out)
+    monkeypatch.setitem(sys.modules, "backend.agents.recommender.rag_query", rag_query)
+    response = client.post("/api/recommend", json={"query": "cut transport emissions"})
+    assert response.status_code == 504 and "timed out" in response.json()["detail"].lower()
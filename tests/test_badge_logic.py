@@ -0,0 +1,61 @@
+# tests/test_badge_logic.py
+import numpy as np
+
+from backend.agents.verification.badge_logic import (
+    BADGES,
+    CUT_POINTS,
+    PercentileTiers,
+    QuantileSketch,
+    assign_badges,
+    get_supplier_badge,
+    percentile_badges,
+)
+
+GOLD, SILVER, BRONZE = BADGES
+
+
+def test_vector_and_scalar_badges_agree():
+    totals = [0.0, 499.9, 500.0, 500.1, 1000.0, 1000.1, 1e9, float("nan")]
+    assert assign_badges(totals).tolist() == [get_supplier_badge(t) for t in totals]
+
+
+def test_unknown_totals_get_the_lowest_badge_not_gold():
+    # Before badges were vectorised, `NaN > 1000` and `NaN > 500` were both
+    # False, so an unknown total fell through to Gold
+    assert get_supplier_badge(float("nan")) == BRONZE
+    assert assign_badges([float("nan")]).tolist() == [BRONZE]
+
+
+def test_percentile_badges_per_sector():
+    totals = [1, 2, 3, 100, 200, 300]
+    sectors = ["a", "a", "a", "b", "b", "b"]
+    assert percentile_badges(totals, sectors).tolist() == [GOLD, SILVER, BRONZE] * 2
+
+
+def test_percentile_badges_ignore_missing_totals():
+    assert percentile_badges([1, 2, 3, float("nan")]).tolist() == [GOLD, SILVER, BRONZE, BRONZE]
+
+
+def test_sketch_quantiles_are_within_alpha():
+    values = np.random.default_rng(0).lognormal(5, 1, 20_000)
+    sketch = QuantileSketch(alpha=0.01)
+    sketch.add(values[:10_000])
+    other = QuantileSketch(alpha=0.01)
+    other.add(values[10_000:])
+    sketch.merge(other)
+    exact = np.quantile(values, [0.1, 0.5, 0.9])
+    assert np.allclose(sketch.quantiles([0.1, 0.5, 0.9]), exact, rtol=0.03)
+
+
+def test_empty_tiers_fall_back_to_fixed_cut_points():
+    tiers = PercentileTiers()
+    assert tiers.cut_points().tolist() == list(CUT_POINTS)
+    assert tiers.assign([100, 700, 5000]).tolist() == [GOLD, SILVER, BRONZE]
+
+
+def test_unknown_sector_counts_towards_the_population_only():
+    tiers = PercentileTiers()
+    tiers.update([10, 20, 30, 1000], ["a", "a", "a", None])
+    assert tiers.stats() == {"suppliers": 4, "sectors": {"a": 3}}
+    # Sector "z" has no sketch yet, so the population cut points apply
+    assert tiers.assign([5, 5000], ["a", "z"]).tolist() == [GOLD, BRONZE]
@@ -0,0 +1,49 @@
+# tests/test_batching.py
+from concurrent.futures import TimeoutError
+from threading import Event
+
+import pytest
+
+from backend.agents.recommender.batching import MicroBatcher
+
+
+def test_each_caller_gets_its_own_result():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch=4, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [f.result(5) for f in futures] == [i * 2 for i in range(10)]
+    assert batcher.stats()["items"] == 10
+
+
+def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="returned"):
+            f.result(5)
+
+
+def test_model_errors_reach_the_caller():
+    def fail(items):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        MicroBatcher(fail)("x", timeout=5)
+
+
+def test_timeout_cancels_a_queued_item():
+    release = Event()
+    seen = []
+
+    def slow(items):
+        seen.extend(items)
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(slow, max_batch=1, max_wait_ms=0)
+    first = batcher.submit("first")
+    with pytest.raises(TimeoutError):
+        batcher("second", timeout=0.05)
+    release.set()
+    assert first.result(5) == "first"
+    assert batcher("third", timeout=5) == "third"
+    assert "second" not in seen
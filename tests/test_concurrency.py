@@ -0,0 +1,68 @@
+# tests/test_concurrency.py
+import asyncio
+import threading
+
+import pytest
+
+from backend.api.concurrency import BoundedPool, PoolSaturated
+
+
+def _blocking_pool():
+    pool = BoundedPool("test", workers=1, max_pending=0)
+    gate = threading.Event()
+    return pool, gate
+
+
+def test_full_pool_raises_without_block():
+    async def scenario():
+        pool, gate = _blocking_pool()
+        first = asyncio.create_task(pool.run(gate.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturated):
+            await pool.run(lambda: None)
+        gate.set()
+        await first
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_blocking_run_waits_for_a_free_slot():
+    async def scenario():
+        pool, gate = _blocking_pool()
+        first = asyncio.create_task(pool.run(gate.wait))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(pool.run(lambda: "done", block=True))
+        await asyncio.sleep(0.05)
+        assert not second.done() and pool.in_flight == 1
+        gate.set()
+        assert await second == "done"
+        await first
+        assert pool.in_flight == 0
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_job_ends():
+    async def scenario():
+        pool, gate = _blocking_pool()
+        first = asyncio.create_task(pool.run(gate.wait))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        try:
+            # The job is still running on the executor, so the pool is still full
+            assert pool.in_flight == 1
+            with pytest.raises(PoolSaturated):
+                await pool.run(lambda: None)
+            second = asyncio.create_task(pool.run(lambda: "done", block=True))
+        finally:
+            gate.set()
+        assert await second == "done"
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 0
+        pool.shutdown()
+
+    asyncio.run(scenario())
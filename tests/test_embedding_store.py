@@ -0,0 +1,42 @@
+# tests/test_embedding_store.py
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.embeddings import Embeddings
+
+from backend.agents.recommender.embedding_store import CachedEmbeddings, EmbeddingStore
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.encoded = []
+
+    def embed_documents(self, texts):
+        self.encoded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.encoded.append(text)
+        return [float(len(text)), 2.0]
+
+
+def test_documents_are_shared_through_disk(tmp_path):
+    inner = CountingEmbeddings()
+    first = CachedEmbeddings(inner, EmbeddingStore("m:torch", root=tmp_path))
+    assert first.embed_documents(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+
+    second = CachedEmbeddings(inner, EmbeddingStore("m:torch", root=tmp_path))
+    assert second.embed_documents(["bb", "a"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert inner.encoded == ["a", "bb", "a"]
+    assert second.stats()["documents"]["hits"] == 2
+
+
+def test_queries_stay_in_a_bounded_lru(tmp_path):
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, EmbeddingStore("m:torch", root=tmp_path), max_queries=2)
+    for text in ["q1", "q2", "q1", "q3", "q2"]:
+        cached.embed_query(text)
+    # q2 was evicted by q3 (q1 had been used more recently)
+    assert inner.encoded == ["q1", "q2", "q3", "q2"]
+    assert cached.stats()["queries"]["entries"] == 2
+    assert not (tmp_path / "m__torch" / "keys.txt").exists()
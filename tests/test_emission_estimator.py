@@ -0,0 +1,74 @@
+# tests/test_emission_estimator.py
+import math
+import random
+
+import pytest
+
+from backend.agents.estimator import emission_estimator as est
+from backend.agents.estimator.emission_estimator import (
+    ACTIVITY_MAP,
+    estimate_emissions,
+    estimate_emissions_batch,
+    get_factor,
+)
+
+
+def _random_payloads(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    keys = list(ACTIVITY_MAP)
+    return [
+        {k: rng.uniform(0, 50_000) for k in rng.sample(keys, rng.randint(0, len(keys)))}
+        for _ in range(n)
+    ]
+
+
+def test_get_factor_is_case_insensitive():
+    assert get_factor("Energy", "Electricity Grid Average") == get_factor("energy", "electricity grid average")
+    with pytest.raises(KeyError):
+        get_factor("energy", "moonlight")
+
+
+def test_batch_matches_scalar_for_rows():
+    payloads = _random_payloads(500)
+    # Bit-for-bit, including key order and totals
+    assert estimate_emissions_batch(payloads) == [estimate_emissions(p) for p in payloads]
+
+
+def test_batch_matches_scalar_for_columns():
+    payloads = _random_payloads(200, seed=1)
+    columns = {k: [p.get(k) for p in payloads] for k in ACTIVITY_MAP}
+    batch = estimate_emissions_batch(columns)
+    for result, payload in zip(batch, payloads):
+        # Columnar input has column order, so compare as dicts
+        assert result == estimate_emissions({k: payload[k] for k in ACTIVITY_MAP if k in payload})
+
+
+def test_columnar_none_and_nan_cells_are_absent():
+    batch = estimate_emissions_batch({
+        "electricity_kwh": [5000, None, float("nan")],
+        "natural_gas_kwh": [None, 100, None],
+    })
+    assert batch[0] == estimate_emissions({"electricity_kwh": 5000})
+    assert batch[1] == estimate_emissions({"natural_gas_kwh": 100})
+    assert batch[2] == {"total": 0.0}
+
+
+def test_unknown_keys_are_skipped_in_both_paths(capsys):
+    payloads = [{"electricity_kwh": 10, "unicorn_kwh": 5}, {"unicorn_kwh": 1}]
+    assert estimate_emissions_batch(payloads) == [estimate_emissions(p) for p in payloads]
+    assert estimate_emissions_batch(payloads)[1] == {"total": 0.0}
+    # Warnings stay off stdout, which the stream CLI uses for results
+    out, err = capsys.readouterr()
+    assert "unicorn_kwh" in err and not out
+
+
+def test_empty_batch():
+    assert estimate_emissions_batch([]) == []
+
+
+def test_reload_keeps_previous_set_when_csv_is_missing(tmp_path, monkeypatch):
+    before = est.get_snapshot()
+    monkeypatch.setattr(est, "DEFRA_CSV", tmp_path / "missing.csv")
+    assert est.reload_factors() is False
+    assert est.get_snapshot() is before
+    assert not math.isnan(estimate_emissions({"electricity_kwh": 1})["total"])
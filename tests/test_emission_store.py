@@ -0,0 +1,63 @@
+# tests/test_emission_store.py
+import sqlite3
+
+import pytest
+
+from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.agents.estimator.emission_store import EmissionStore, EstimateRecord
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = EmissionStore(tmp_path / "emissions.sqlite3")
+    yield s
+    s.close()
+
+
+def _record(supplier, month, **activities):
+    return EstimateRecord(supplier, estimate_emissions(activities), activities, month)
+
+
+def test_rollups_match_the_stored_rows(store):
+    store.record([
+        _record("S1", "2024-01", electricity_kwh=1000, natural_gas_kwh=500),
+        _record("S2", "2024-01", electricity_kwh=3000),
+        _record("S1", "2024-02", electricity_kwh=2000),
+    ])
+    by_supplier = {row["key"]: row["kg_co2e"] for row in store.totals("supplier")}
+    assert by_supplier["S2"] == pytest.approx(estimate_emissions({"electricity_kwh": 3000})["total"])
+    assert [row["key"] for row in store.top("supplier", n=1)] == ["S1"]
+    assert [row["key"] for row in store.totals("month")] == ["2024-01", "2024-02"]
+    assert store.totals("supplier", month_from="2024-02") == store.totals("supplier", month="2024-02")
+
+    before = [store.totals(by) for by in ("supplier", "category", "activity", "total", "month")]
+    store.rebuild_rollups()
+    assert [store.totals(by) for by in ("supplier", "category", "activity", "total", "month")] == before
+
+
+def test_anonymous_estimates_are_not_ranked_as_a_supplier(store):
+    store.record([_record(None, "2024-01", electricity_kwh=10_000), _record("S1", "2024-01", electricity_kwh=1)])
+    assert [row["key"] for row in store.top("supplier")] == ["S1"]
+    total = store.totals("total")[0]["kg_co2e"]
+    assert total == pytest.approx(estimate_emissions({"electricity_kwh": 10_001})["total"])
+    store.rebuild_rollups()
+    assert [row["key"] for row in store.top("supplier")] == ["S1"]
+
+
+def test_legacy_empty_supplier_ids_become_null(tmp_path):
+    path = tmp_path / "legacy.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE estimates (supplier_id TEXT NOT NULL, month TEXT NOT NULL, activity TEXT NOT NULL,
+                                category TEXT NOT NULL, amount REAL, kg_co2e REAL NOT NULL);
+        CREATE TABLE rollups (dimension TEXT NOT NULL, key TEXT NOT NULL, month TEXT NOT NULL,
+                              kg_co2e REAL NOT NULL, rows INTEGER NOT NULL, PRIMARY KEY (dimension, month, key)) WITHOUT ROWID;
+        INSERT INTO estimates VALUES ('', '2024-01', 'electricity_kwh', 'energy', 1.0, 5.0);
+        INSERT INTO rollups VALUES ('supplier', '', '*', 5.0, 1);
+    """)
+    conn.close()
+
+    store = EmissionStore(path)
+    assert store.top("supplier") == []
+    store.record([_record(None, "2024-01", electricity_kwh=1)])
+    store.close()
@@ -0,0 +1,63 @@
+# tests/test_estimator_client.py
+import pytest
+
+pytest.importorskip("requests")
+import requests
+
+from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.agents.estimator.estimator_client import EstimatorError, InProcessEstimator, RemoteEstimator
+
+
+class _Response:
+    def __init__(self, status_code: int = 200, body=None, text: str = ""):
+        self.status_code = status_code
+        self._body = body
+        self.text = text
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+def _remote(monkeypatch, response) -> RemoteEstimator:
+    client = RemoteEstimator("http://api.test")
+    monkeypatch.setattr(client.session, "post", lambda *a, **kw: response)
+    return client
+
+
+def test_inprocess_matches_estimator():
+    payload = {"electricity_kwh": 100}
+    assert InProcessEstimator().estimate(payload) == estimate_emissions(payload)
+
+
+def test_retries_cover_backpressure():
+    retry = RemoteEstimator("http://api.test").session.get_adapter("http://api.test").max_retries
+    assert 429 in retry.status_forcelist
+    assert retry.respect_retry_after_header
+
+
+def test_remote_unwraps_emissions(monkeypatch):
+    client = _remote(monkeypatch, _Response(body={"status": "success", "emissions": {"total": 1.0}}))
+    assert client.estimate({"electricity_kwh": 1}) == {"total": 1.0}
+
+
+@pytest.mark.parametrize("response", [
+    _Response(body=ValueError("not JSON")),
+    _Response(body={"status": "success"}),
+    _Response(status_code=500, text="boom"),
+])
+def test_remote_failures_are_estimator_errors(monkeypatch, response):
+    with pytest.raises(EstimatorError):
+        _remote(monkeypatch, response).estimate({"electricity_kwh": 1})
+
+
+def test_connection_errors_are_estimator_errors(monkeypatch):
+    client = RemoteEstimator("http://api.test")
+
+    def fail(*args, **kwargs):
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(client.session, "post", fail)
+    with pytest.raises(EstimatorError):
+        client.estimate_batch([{"electricity_kwh": 1}])
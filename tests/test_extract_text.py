@@ -0,0 +1,51 @@
+# tests/test_extract_text.py
+import pytest
+
+pytest.importorskip("fitz")
+
+from backend.agents.document_ingestion import extract_text
+from benchmarks.synthetic import make_pdf
+
+PAGES = 7
+
+
+@pytest.fixture
+def pdfs(tmp_path, monkeypatch):
+    # Small documents so the parallel paths run without a huge PDF
+    monkeypatch.setattr(extract_text, "PARALLEL_MIN_PAGES", 2)
+    return [make_pdf(tmp_path / f"invoice_{i}.pdf", PAGES + i) for i in range(3)]
+
+
+def _page_marker(page: int) -> str:
+    return f"Line 00: Electricity usage {1000 + page * 7} kWh"
+
+
+def test_pages_come_back_in_order(pdfs):
+    pages = list(extract_text.iter_page_texts(pdfs[0]))
+    assert len(pages) == PAGES
+    assert all(_page_marker(p) in text for p, text in enumerate(pages))
+    assert list(extract_text.iter_page_texts(pdfs[0], 2, 4)) == pages[2:4]
+    assert list(extract_text.iter_page_texts(pdfs[0], 5, 99)) == pages[5:]
+
+
+@pytest.mark.parametrize("workers", [2, 3, 8])
+def test_parallel_extraction_matches_serial(pdfs, workers):
+    serial = extract_text.extract_text_from_pdf(pdfs[0])
+    assert serial == "".join(extract_text.iter_page_texts(pdfs[0])).strip()
+    assert extract_text.extract_text_from_pdf(pdfs[0], workers=workers) == serial
+    positions = [serial.index(_page_marker(p)) for p in range(PAGES)]
+    assert positions == sorted(positions)
+
+
+def test_bytes_extraction_matches_the_file(pdfs):
+    assert extract_text.extract_text_from_pdf_bytes(pdfs[1].read_bytes()) == extract_text.extract_text_from_pdf(pdfs[1])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_extraction_matches_per_file(pdfs, workers):
+    expected = {path: extract_text.extract_text_from_pdf(path) for path in pdfs}
+    batch = extract_text.extract_texts_from_pdfs(reversed(pdfs), workers=workers)
+    assert list(batch) == pdfs[::-1]
+    assert batch == expected
+    from_dir = extract_text.extract_texts_from_dir(pdfs[0].parent, workers=workers)
+    assert list(from_dir) == pdfs and from_dir == expected
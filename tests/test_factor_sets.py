@@ -0,0 +1,96 @@
+# tests/test_factor_sets.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.agents.estimator import factor_sets
+from backend.agents.estimator.emission_estimator import get_snapshot
+from backend.agents.estimator.factor_sets import FactorEngine, load_engine
+
+DEFAULTS = {"electricity_kwh": 1.0, "road_freight_tkm": 2.0, "natural_gas_kwh": 3.0, "air_freight_tkm": 4.0}
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["Region", "Year", "Source", "Category", "Activity", "kgCO2e_per_unit"])
+
+
+@pytest.fixture
+def engine():
+    return FactorEngine.from_frame(DEFAULTS, _frame([
+        ("GB", 2020, "A", "Energy", "Electricity grid average", 0.20),
+        ("GB", 2020, "A", "Fuel", "Natural gas", 0.18),
+        ("GB", 2022, "A", "Energy", "Electricity grid average", 0.22),
+        ("GB", 2022, "B", "Energy", "Electricity grid average", 0.99),
+        ("US", 2021, "C", "Energy", "Electricity grid average", 0.37),
+    ]))
+
+
+def _electricity(engine, regions, dates):
+    return engine.resolve(["electricity_kwh"] * len(regions), engine.set_ids(regions, dates)).tolist()
+
+
+def test_vintage_resolution(engine):
+    regions = ["GB", "gb ", "GB", "GB", "GB", "GB", "US", "FR", None]
+    dates = ["2020-06-01", "2021", 2022, "2035-01", "1999", None, "2021", "2022", "2022"]
+    assert _electricity(engine, regions, dates) == [0.20, 0.20, 0.22, 0.22, 0.20, 0.22, 0.37, 1.0, 1.0]
+
+
+def test_first_source_wins_and_missing_activities_carry_over(engine):
+    gb_2022 = engine.set_ids(["GB"], [2022])[0]
+    assert engine.sets[gb_2022].source == "A"
+    # GB 2022 doesn't list natural gas: carried from GB 2020, freight from the defaults
+    assert engine.factor("natural_gas_kwh", "GB", 2022) == 0.18
+    assert engine.factor("road_freight_tkm", "GB", 2022) == 2.0
+    assert engine.factor("natural_gas_kwh", "US", 2021) == 3.0
+    with pytest.raises(KeyError):
+        engine.factor("coal_kg", "GB", 2022)
+
+
+def test_dates_without_a_region_are_found():
+    assert FactorEngine.undated_rows(["GB", None, "", None], [2022, 2022, "2022", None]).tolist() == [1, 2]
+    assert FactorEngine.undated_rows(None, [None, 2022]).tolist() == [1]
+    assert FactorEngine.undated_rows(["GB"], None).size == 0
+
+
+def test_unparseable_dates_are_found(engine):
+    dates = ["2022-03", 2022, None, "05/01/2023", "xx", ""]
+    assert FactorEngine.unparseable_dates(dates).tolist() == [3, 4, 5]
+    assert FactorEngine.unparseable_dates(None).size == 0
+    # set_ids resolves them like a missing date
+    assert _electricity(engine, ["GB"] * 2, ["xx", None]) == _electricity(engine, ["GB"] * 2, [None, None])
+
+
+def test_save_and_open_round_trip(engine, tmp_path):
+    path = engine.save(tmp_path / "sets.bin")
+    mapped = FactorEngine.open(path)
+    assert isinstance(mapped.factors, np.memmap) and not mapped.factors.flags.writeable
+    np.testing.assert_array_equal(mapped.factors, engine.factors)
+    np.testing.assert_array_equal(mapped.vintages, engine.vintages)
+    assert (mapped.sets, mapped.regions, mapped.first_year) == (engine.sets, engine.regions, engine.first_year)
+    regions, dates = ["GB", "US", "XX"], ["2021", None, "2022"]
+    assert _electricity(mapped, regions, dates) == _electricity(engine, regions, dates)
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"not a factor file")
+    with pytest.raises(ValueError):
+        FactorEngine.open(path)
+
+
+def test_load_engine_reuses_the_file_until_an_input_changes(tmp_path):
+    sets_csv = tmp_path / "factor_sets.csv"
+    sets_csv.write_text(factor_sets.FACTOR_SETS_CSV.read_text(encoding="utf-8"), encoding="utf-8")
+    path = tmp_path / "sets.bin"
+    snapshot = get_snapshot()
+
+    built = load_engine(snapshot, path, sets_csv)
+    assert not isinstance(built.factors, np.memmap)
+    assert isinstance(load_engine(snapshot, path, sets_csv).factors, np.memmap)
+
+    # A different default table (e.g. a hot reload) must not reuse the file
+    reloaded = snapshot._replace(activities={**snapshot.activities, "electricity_kwh": 9.0})
+    assert load_engine(reloaded, path, sets_csv).factor("electricity_kwh") == 9.0
+
+    sets_csv.write_text(sets_csv.read_text(encoding="utf-8") + "ZZ,2023,X,Energy,Electricity grid average,kWh,0.5\n")
+    assert load_engine(snapshot, path, sets_csv).factor("electricity_kwh", "ZZ") == 0.5
@@ -0,0 +1,31 @@
+# tests/test_inference_backend.py
+import pytest
+
+pytest.importorskip("langchain_core")
+from backend.agents.recommender import inference_backend
+
+
+def test_fallback_reports_the_backend_that_loaded(monkeypatch):
+    def broken():
+        raise ImportError("onnxruntime")
+
+    monkeypatch.setitem(inference_backend._LOADERS, "onnx", (broken, broken))
+    monkeypatch.setitem(inference_backend._LOADERS, "torch", (lambda: "torch-embeddings", lambda: "torch-generator"))
+    assert inference_backend.load_embeddings_and_backend("onnx") == ("torch-embeddings", "torch")
+
+
+def test_int8_cache_hit_skips_the_full_precision_weights(tmp_path, monkeypatch):
+    torch = pytest.importorskip("torch")
+    monkeypatch.setattr(inference_backend, "MODEL_CACHE_DIR", tmp_path)
+
+    def make():
+        return torch.nn.Sequential(torch.nn.Linear(4, 3))
+
+    first = inference_backend._quantized("tiny", make)
+
+    def fp32_not_allowed():
+        raise AssertionError("loaded full-precision weights on a cache hit")
+
+    second = inference_backend._quantized("tiny", fp32_not_allowed, make)
+    x = torch.randn(2, 4)
+    assert torch.equal(first(x), second(x))
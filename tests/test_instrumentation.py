@@ -0,0 +1,49 @@
+# tests/test_instrumentation.py
+import threading
+import time
+
+from backend.instrumentation import LatencyHistogram, SamplingProfiler, write_folded
+
+
+def test_histogram_summary_and_prometheus_text():
+    hist = LatencyHistogram("t_seconds", "Test.", "endpoint", buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.05, 0.05, 0.5):
+        hist.observe("GET /", seconds)
+    summary = hist.summary()["GET /"]
+    assert summary["count"] == 4 and summary["p50_ms"] == 100.0 and summary["p99_ms"] == 1000.0
+    text = hist.render()
+    assert 't_seconds_bucket{endpoint="GET /",le="0.1"} 3' in text
+    assert 't_seconds_bucket{endpoint="GET /",le="+Inf"} 4' in text
+    assert 't_seconds_count{endpoint="GET /"} 4' in text
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_recordings_share_one_sampling_thread(tmp_path):
+    profiler = SamplingProfiler(interval=0.001)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    try:
+        first = profiler.record()
+        sampler = profiler._thread
+        second = profiler.record()
+        assert profiler._thread is sampler
+        time.sleep(0.05)
+        samples = first.stop()
+        second.stop()
+    finally:
+        stop.set()
+        worker.join()
+    assert any("_busy_loop" in stack for stack in samples)
+
+    # A stopped recording no longer collects
+    count = sum(samples.values())
+    time.sleep(0.01)
+    assert sum(samples.values()) == count
+
+    path = write_folded(samples, tmp_path / "p.folded")
+    assert path.read_text().splitlines()[0].rsplit(" ", 1)[1].isdigit()
@@ -0,0 +1,79 @@
+# tests/test_pipeline.py
+import threading
+import time
+
+import pytest
+
+from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.agents.pipeline import Pipeline, Stage, StageMetrics, payload_pipeline
+
+
+def test_payload_pipeline_runs_every_stage():
+    metrics = StageMetrics()
+    pipeline = payload_pipeline(metrics=metrics)
+    try:
+        result = pipeline.run({"electricity_kwh": 100})
+    finally:
+        pipeline.shutdown()
+    assert result["emissions"] == estimate_emissions({"electricity_kwh": 100})
+    assert result["warnings"] == [] and result["badge"] == "🥇 Gold"
+    assert set(metrics.summary()) == {"warnings", "emissions", "badge"}
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(x):
+        barrier.wait()
+        return x
+
+    pipeline = Pipeline([Stage("a", meet, ("input",)), Stage("b", meet, ("input",))], metrics=StageMetrics())
+    try:
+        assert pipeline.run(1) == {"input": 1, "a": 1, "b": 1}
+    finally:
+        pipeline.shutdown()
+
+
+def test_failures_skip_downstream_stages_and_are_counted():
+    def fail(x):
+        raise ValueError("bad input")
+
+    metrics = StageMetrics()
+    pipeline = Pipeline(
+        [Stage("a", fail, ("input",)), Stage("b", lambda a: a, ("a",)), Stage("c", str, ("input",))],
+        metrics=metrics,
+    )
+    try:
+        result = pipeline.run(7)
+    finally:
+        pipeline.shutdown()
+    assert result["c"] == "7"
+    assert result["errors"] == {"a": "bad input", "b": "skipped: upstream stage failed"}
+    assert metrics.summary()["a"]["failures"] == 1
+    assert 'sparkscope_pipeline_stage_failures_total{stage="a"} 1' in metrics.render()
+
+
+def test_cycles_and_unknown_inputs_are_rejected():
+    with pytest.raises(ValueError, match="cycle or unknown"):
+        Pipeline([Stage("a", str, ("b",)), Stage("b", str, ("a",))])
+    with pytest.raises(ValueError, match="missing"):
+        Pipeline([Stage("a", str, ("missing",))])
+
+
+def test_duplicate_stage_names_are_rejected():
+    with pytest.raises(ValueError, match=r"unique: \['a'\]"):
+        Pipeline([Stage("a", str, ("input",)), Stage("a", repr, ("input",))])
+    with pytest.raises(ValueError, match="unique"):
+        Pipeline([Stage("input", str, ())])
+
+
+def test_run_stream_keeps_input_order():
+    def slow_for_small(x):
+        time.sleep(0.02 if x < 2 else 0)
+        return x * 10
+
+    pipeline = Pipeline([Stage("out", slow_for_small, ("input",))], metrics=StageMetrics(), workers=4)
+    try:
+        assert [r["out"] for r in pipeline.run_stream(range(6), max_in_flight=3)] == [0, 10, 20, 30, 40, 50]
+    finally:
+        pipeline.shutdown()
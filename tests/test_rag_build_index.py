@@ -0,0 +1,144 @@
+# tests/test_rag_build_index.py
+import json
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from backend.agents.recommender import rag_build_index
+from backend.agents.recommender.ann_index import IndexConfig, index_kind, load_vectorstore
+from benchmarks.synthetic import make_corpus, stub_embeddings
+
+CONFIGS = {
+    "flat": IndexConfig(index_type="flat"),
+    "ivf_flat": IndexConfig(index_type="ivf_flat", nlist=4, nprobe=4),
+    "hnsw": IndexConfig(index_type="hnsw", hnsw_m=8),
+    "ivf_pq": IndexConfig(index_type="ivf_pq", nlist=2, nprobe=2, pq_m=8, pq_nbits=4),
+}
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Point the builder at a tmp corpus/index and count embedded texts."""
+    data_dir, index_dir = tmp_path / "corpus", tmp_path / "faiss_index"
+    make_corpus(data_dir, files=10, paragraphs=8)
+    embeddings = stub_embeddings()
+    embedded = []
+    embed_documents = embeddings.embed_documents
+
+    def counting(texts):
+        embedded.extend(texts)
+        return embed_documents(texts)
+
+    embeddings.embed_documents = counting
+    monkeypatch.setattr(rag_build_index, "DATA_DIR", data_dir)
+    monkeypatch.setattr(rag_build_index, "INDEX_DIR", index_dir)
+    monkeypatch.setattr(rag_build_index, "TOPIC_INDEX_DIR", index_dir / "topics")
+    monkeypatch.setattr(rag_build_index, "MANIFEST_PATH", index_dir / "manifest.json")
+    monkeypatch.setattr(rag_build_index, "load_embeddings_and_backend", lambda **_: (embeddings, "torch"))
+    return data_dir, index_dir, embeddings, embedded
+
+
+def _manifest(index_dir) -> dict:
+    return json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))["files"]
+
+
+def _assert_consistent(path, embeddings, config, chunk_ids):
+    """The store holds exactly `chunk_ids`, and searching each chunk's own
+    text finds that chunk (so positions still map to the right documents)."""
+    store = load_vectorstore(path, embeddings, config, writable=True)
+    assert store.index.ntotal == len(store.index_to_docstore_id) == len(chunk_ids)
+    assert set(store.index_to_docstore_id.values()) == set(chunk_ids)
+    # PQ codes are approximate, so only ask for the chunk among the top hits
+    k = 3 if config.index_type == "ivf_pq" else 1
+    for cid in chunk_ids:
+        text = store.docstore.search(cid).page_content
+        hits = store.similarity_search(text, k=k)
+        assert text in [doc.page_content for doc in hits]
+    return store
+
+
+def _assert_index_matches_manifest(index_dir, embeddings, config):
+    files = _manifest(index_dir)
+    all_ids = [cid for entry in files.values() for cid in entry["chunks"]]
+    _assert_consistent(index_dir, embeddings, config, all_ids)
+    topics = {entry["topic"] for entry in files.values()}
+    assert {p.name for p in (index_dir / "topics").iterdir()} == topics
+    for topic in topics:
+        ids = [cid for entry in files.values() if entry["topic"] == topic for cid in entry["chunks"]]
+        _assert_consistent(index_dir / "topics" / topic, embeddings, config, ids)
+
+
+@pytest.mark.parametrize("index_type", list(CONFIGS))
+def test_incremental_updates_keep_ids_mapped_to_their_chunks(env, index_type):
+    data_dir, index_dir, embeddings, embedded = env
+    config = CONFIGS[index_type]
+
+    rag_build_index.build_faiss_index(incremental=False, config=config)
+    _assert_index_matches_manifest(index_dir, embeddings, config)
+    before = _manifest(index_dir)
+
+    # Change one file, remove another, add a new one
+    files = sorted(data_dir.glob("*.txt"))
+    changed, removed = files[0], files[1]
+    changed.write_text(changed.read_text(encoding="utf-8") + "\n\nInsulate the loft and seal draughts.", encoding="utf-8")
+    removed.unlink()
+    (data_dir / "waste_new.txt").write_text("Compost food scraps instead of landfilling them.", encoding="utf-8")
+    embedded.clear()
+    rag_build_index.build_faiss_index(incremental=True, config=config)
+
+    after = _manifest(index_dir)
+    assert removed.name not in after and "waste_new.txt" in after
+    for name in set(before) - {changed.name, removed.name}:
+        assert after[name] == before[name]
+    new_ids = set(after[changed.name]["chunks"]) - set(before[changed.name]["chunks"])
+    assert len(embedded) == len(new_ids) + len(after["waste_new.txt"]["chunks"])
+    _assert_index_matches_manifest(index_dir, embeddings, config)
+    # HNSW/IVF deletes rebuild from kept vectors, but keep the configured type
+    assert index_kind(load_vectorstore(index_dir, embeddings, config).index) == index_type
+
+    # A further add after the delete must not reuse ids still in use
+    files[2].write_text("Switch the fleet to electric vans.", encoding="utf-8")
+    rag_build_index.build_faiss_index(incremental=True, config=config)
+    _assert_index_matches_manifest(index_dir, embeddings, config)
+
+
+def test_unchanged_corpus_embeds_nothing(env):
+    _, index_dir, embeddings, embedded = env
+    rag_build_index.build_faiss_index(incremental=False)
+    mtime = (index_dir / "index.faiss").stat().st_mtime_ns
+    embedded.clear()
+    rag_build_index.build_faiss_index(incremental=True)
+    assert embedded == []
+    assert (index_dir / "index.faiss").stat().st_mtime_ns == mtime
+
+
+def test_out_of_sync_topic_partition_is_rebuilt_without_embedding(env):
+    _, index_dir, embeddings, embedded = env
+    config = CONFIGS["flat"]
+    rag_build_index.build_faiss_index(incremental=False, config=config)
+    topic_dir = index_dir / "topics" / "transport"
+    for path in topic_dir.iterdir():
+        path.unlink()
+    topic_dir.rmdir()
+
+    embedded.clear()
+    rag_build_index.build_faiss_index(incremental=True, config=config)
+    assert embedded == []
+    _assert_index_matches_manifest(index_dir, embeddings, config)
+
+
+def test_changed_index_settings_force_a_full_rebuild(env):
+    _, index_dir, embeddings, embedded = env
+    rag_build_index.build_faiss_index(incremental=False, config=CONFIGS["flat"])
+    chunks = sum(len(entry["chunks"]) for entry in _manifest(index_dir).values())
+
+    embedded.clear()
+    config = CONFIGS["hnsw"]
+    rag_build_index.build_faiss_index(incremental=True, config=config)
+    assert len(embedded) == chunks
+    settings = json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))["settings"]
+    assert settings["index"] == config.build_settings()
+    assert index_kind(load_vectorstore(index_dir, embeddings, config).index) == "hnsw"
+    _assert_index_matches_manifest(index_dir, embeddings, config)
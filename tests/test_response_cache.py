@@ -0,0 +1,48 @@
+# tests/test_response_cache.py
+from backend.agents.recommender.response_cache import SemanticCache
+
+
+def test_exact_hits_ignore_case_and_spacing():
+    cache = SemanticCache()
+    cache.put("How do I cut  electricity?", [1.0, 0.0], ["tip"])
+    assert cache.get_exact("how do i cut electricity?") == ["tip"]
+    assert cache.get_exact("how do i cut electricity?", scope="transport") is None
+
+
+def test_similar_queries_hit_within_their_scope_only():
+    cache = SemanticCache(similarity_threshold=0.9)
+    cache.put("reduce freight emissions", [1.0, 0.1], ["ship by rail"], scope="transport")
+    assert cache.get_similar([0.99, 0.12], scope="transport") == ["ship by rail"]
+    assert cache.get_similar([0.99, 0.12], scope="energy") is None
+    assert cache.get_similar([0.0, 1.0], scope="transport") is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.put("a", [1.0, 0.0], ["A"])
+    cache.put("b", [0.0, 1.0], ["B"])
+    cache.get_exact("a")
+    cache.put("c", [1.0, 1.0], ["C"])
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == ["A"] and cache.get_exact("c") == ["C"]
+
+
+def test_entries_expire(monkeypatch):
+    from backend.agents.recommender import response_cache
+
+    now = [100.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(ttl_seconds=10)
+    cache.put("q", [1.0], ["tip"])
+    now[0] += 11
+    assert cache.get_exact("q") is None and cache.get_similar([1.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_returned_values_are_copies():
+    cache = SemanticCache()
+    cache.put("q", [1.0], ["tip"])
+    cache.get_exact("q").append("mutated")
+    assert cache.get_exact("q") == ["tip"]
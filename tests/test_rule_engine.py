@@ -0,0 +1,44 @@
+# tests/test_rule_engine.py
+import numpy as np
+import pandas as pd
+
+from backend.agents.verification.rule_engine import RULES, evaluate, verify_frame, verify_rows
+
+
+def test_codes_per_row_in_row_order():
+    findings = evaluate({
+        "electricity_kwh": [5000, -1, 0, 200_000, None],
+        "road_freight_tkm": [np.nan, 20_000, 10, 10, 10],
+    })
+    pairs = list(zip(findings.row.tolist(), findings.activity.tolist(), findings.code.tolist()))
+    assert pairs == [
+        (1, "electricity_kwh", "NEGATIVE"),
+        (1, "road_freight_tkm", "ABOVE_MAX"),
+        (2, "electricity_kwh", "ZERO"),
+        (3, "electricity_kwh", "ABOVE_MAX"),
+    ]
+    assert findings.detail[-1] == RULES.activities["electricity_kwh"].max
+
+
+def test_sector_limits_apply_only_to_known_sectors():
+    findings = evaluate({"electricity_kwh": [50_000, 50_000, 50_000]}, sectors=["office", "retail", "unknown"])
+    assert findings.row.tolist() == [0] and findings.code.tolist() == ["SECTOR_LIMIT"]
+    assert findings.detail.tolist() == [RULES.sectors["office"]["electricity_kwh"]]
+
+
+def test_outliers_against_supplier_history():
+    history = pd.DataFrame({
+        "supplier_id": ["S1"] * 5 + ["S2"] * 2,
+        "electricity_kwh": [1000, 1010, 990, 1005, 995, 1000, 1000],
+    })
+    frame = pd.DataFrame({"supplier_id": ["S1", "S1", "S2", "S3"], "electricity_kwh": [1002, 5000, 5000, 5000]})
+    report = verify_frame(frame, history)
+    # S2 has too little history and S3 none, so only S1's jump is flagged
+    assert report[["row", "code", "severity"]].values.tolist() == [[1, "OUTLIER", "warning"]]
+
+
+def test_verify_rows_messages_follow_payload_key_order():
+    warnings = verify_rows([{"road_freight_tkm": -5, "electricity_kwh": 0}, {"electricity_kwh": 10}])
+    assert warnings[1] == []
+    assert [w.split()[0] for w in warnings[0]] == ["❌", "⚠️"]
+    assert "Freight" in warnings[0][0] and "Electricity" in warnings[0][1]
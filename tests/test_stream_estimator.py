@@ -0,0 +1,83 @@
+# tests/test_stream_estimator.py
+import io
+import json
+
+from backend.agents.estimator.emission_estimator import estimate_emissions
+from backend.agents.estimator.stream_estimator import RowChunker, StreamStats, iter_rows, main, stream_estimates
+
+
+def test_ndjson_rows_match_scalar_estimates():
+    lines = [
+        '{"supplier_id": "S1", "electricity_kwh": 5000, "road_freight_tkm": 6240}\n',
+        "\n",
+        '{"supplier_id": "S2", "activities": {"natural_gas_kwh": 1200}}\n',
+    ]
+    stats = StreamStats()
+    results = list(stream_estimates(lines, "ndjson", chunk_size=1, stats=stats))
+    assert [r["supplier_id"] for r in results] == ["S1", "S2"]
+    assert results[0]["emissions"] == estimate_emissions({"electricity_kwh": 5000, "road_freight_tkm": 6240})
+    assert (stats.rows, stats.chunks) == (2, 2)
+
+
+def test_bad_cells_are_reported_per_row():
+    lines = [
+        "supplier_id,electricity_kwh,notes\n",
+        "S1,5000,late\n",
+        "S2,abc,\n",
+    ]
+    results = list(stream_estimates(lines, "csv"))
+    assert results[0]["emissions"] == estimate_emissions({"electricity_kwh": 5000})
+    assert any("notes" in w for w in results[0]["warnings"])
+    assert results[1]["emissions"] == {"total": 0.0}
+    assert any("electricity_kwh" in w for w in results[1]["warnings"])
+
+
+def test_invalid_json_line_does_not_stop_the_stream():
+    results = list(stream_estimates(["{not json\n", '{"electricity_kwh": 1}\n'], "ndjson"))
+    assert len(results) == 2
+    assert results[0]["warnings"] and results[1]["emissions"]["electricity_kwh"] > 0
+
+
+def test_quoted_csv_fields_may_span_lines():
+    text = 'supplier_id,electricity_kwh\n"Acme\nLtd",100\nS2,200\n'
+    rows = list(iter_rows(io.StringIO(text, newline=""), "csv"))
+    assert [r.supplier_id for r in rows] == ["Acme\nLtd", "S2"]
+    assert [r.payload for r in rows] == [{"electricity_kwh": 100.0}, {"electricity_kwh": 200.0}]
+
+
+def test_chunker_splits_and_flushes():
+    chunker = RowChunker("ndjson", chunk_size=2)
+    chunks = [chunker.feed(f'{{"electricity_kwh": {i}}}') for i in range(5)]
+    assert [len(c) for c in chunks if c] == [2, 2]
+    assert len(chunker.close()) == 1
+    assert chunker.stats.rows == 5
+
+
+def test_cli_stdout_is_pure_ndjson(tmp_path, capsys):
+    src = tmp_path / "in.ndjson"
+    src.write_text('{"supplier_id": "S1", "electricity_kwh": 10, "unicorn_kwh": 3}\n', encoding="utf-8")
+    main([str(src)])
+    out, err = capsys.readouterr()
+    assert [json.loads(line)["supplier_id"] for line in out.splitlines()] == ["S1"]
+    assert "unicorn_kwh" in err
+
+
+def test_region_and_date_pick_the_factor_vintage():
+    csv_lines = ["supplier_id,region,date,electricity_kwh\n", "S1,GB,2022-03,1000\n", "S2,,2022,1000\n"]
+    ndjson_lines = ['{"supplier_id": "S1", "region": "gb", "date": 2022, "activities": {"electricity_kwh": 1000}}\n']
+    expected = estimate_emissions({"electricity_kwh": 1000}, "GB", "2022")
+    assert expected != estimate_emissions({"electricity_kwh": 1000})
+
+    gb, undated = stream_estimates(csv_lines, "csv")
+    assert gb["emissions"] == expected and not gb["warnings"]
+    assert undated["emissions"] == estimate_emissions({"electricity_kwh": 1000})
+    assert undated["warnings"] == ["Date ignored without a region"]
+    assert next(stream_estimates(ndjson_lines, "ndjson"))["emissions"] == expected
+
+
+def test_an_unparseable_date_uses_the_latest_vintage_with_a_warning():
+    csv_lines = ["supplier_id,region,date,electricity_kwh\n", "S1,GB,05/01/2023,1000\n", "S2,GB,,1000\n"]
+    bad, undated = stream_estimates(csv_lines, "csv")
+    assert bad["emissions"] == undated["emissions"] == estimate_emissions({"electricity_kwh": 1000}, "GB")
+    assert bad["warnings"] == ["Unrecognised date '05/01/2023', latest factor vintage used"]
+    assert not undated["warnings"]